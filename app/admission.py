@@ -0,0 +1,190 @@
+"""
+Admission control and load shedding
+
+Each worker tracks two load signals:
+
+* requests in flight in this worker,
+* connection pool pressure. TimedQueuePool records how long checkouts wait.
+  Pressure is the larger of the oldest wait still in progress and the p90 of
+  waits that finished in the last ADMISSION_WINDOW_SECONDS.
+
+Before a request reaches the app it is compared with the limits of its
+priority class. Over the limit, it gets 503 with Retry-After at once instead
+of queueing for the pool for up to pool_timeout. Classes, from the path
+prefix (ADMISSION_PRIORITIES overrides the defaults):
+
+* critical - health checks, metrics and event streams; never shed (open
+             streams are long-lived and capped by STREAM_MAX_SUBSCRIBERS instead)
+* high     - login, token refresh, logout; shed only well past the limits
+* normal   - everything else
+* low      - opt-in heavy routes; shed first
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from sqlalchemy.pool import QueuePool
+
+from app.monitoring.metrics import REQUESTS_SHED
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "40"))  # anyio's default threadpool size
+MAX_POOL_WAIT_MS = float(os.getenv("ADMISSION_MAX_POOL_WAIT_MS", "2000"))
+RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2"))
+WINDOW_SECONDS = float(os.getenv("ADMISSION_WINDOW_SECONDS", "5"))
+
+CRITICAL, HIGH, NORMAL, LOW = "critical", "high", "normal", "low"
+
+# Fraction of the limits each class may use (critical is never shed)
+CLASS_HEADROOM = {HIGH: 1.5, NORMAL: 1.0, LOW: 0.6}
+
+DEFAULT_PRIORITIES = {
+    "/health": CRITICAL,
+    "/metrics": CRITICAL,
+    "/events/stream": CRITICAL,
+    "/users/login/": HIGH,
+    "/users/token/refresh/": HIGH,
+    "/users/logout/": HIGH,
+}
+
+# ===============================
+# POOL WAIT TRACKING
+# ===============================
+
+class PoolWaitTracker:
+    """Checkout waits currently in progress plus recently finished ones"""
+
+    def __init__(self, window_seconds: float = WINDOW_SECONDS):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._waiting: dict[int, float] = {}
+        self._recent: deque = deque(maxlen=2000)  # (finished_at, wait_ms)
+        self._next_key = 0
+
+    def begin(self) -> int:
+        with self._lock:
+            self._next_key += 1
+            self._waiting[self._next_key] = time.monotonic()
+            return self._next_key
+
+    def end(self, key: int):
+        now = time.monotonic()
+        with self._lock:
+            started = self._waiting.pop(key, now)
+            self._recent.append((now, (now - started) * 1000))
+
+    def pressure_ms(self) -> float:
+        """Longest current wait or recent p90 wait, whichever is larger"""
+        now = time.monotonic()
+        with self._lock:
+            oldest = (now - min(self._waiting.values())) * 1000 if self._waiting else 0.0
+            cutoff = now - self.window_seconds
+            while self._recent and self._recent[0][0] < cutoff:
+                self._recent.popleft()
+            waits = sorted(wait for _, wait in self._recent)
+        p90 = waits[min(len(waits) - 1, int(len(waits) * 0.9))] if waits else 0.0
+        return max(oldest, p90)
+
+pool_waits = PoolWaitTracker()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        key = pool_waits.begin()
+        try:
+            return super()._do_get()
+        finally:
+            pool_waits.end(key)
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+def _configured_priorities() -> list[tuple[str, str]]:
+    """Path prefix -> class, longest prefix first. ADMISSION_PRIORITIES='{"/documents/search": "low"}'"""
+    priorities = dict(DEFAULT_PRIORITIES)
+    raw = os.getenv("ADMISSION_PRIORITIES")
+    if raw:
+        try:
+            priorities.update({prefix: str(value) for prefix, value in json.loads(raw).items()})
+        except (ValueError, AttributeError):
+            logger.warning("Ignoring invalid ADMISSION_PRIORITIES setting")
+    return sorted(priorities.items(), key=lambda item: len(item[0]), reverse=True)
+
+class AdmissionController:
+    """Per-worker in-flight count and the admit/shed decision"""
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, max_pool_wait_ms: float = MAX_POOL_WAIT_MS,
+                 waits: PoolWaitTracker = pool_waits):
+        self.max_in_flight = max_in_flight
+        self.max_pool_wait_ms = max_pool_wait_ms
+        self.waits = waits
+        self.in_flight = 0  # Only touched on the event loop thread
+        self.priorities = _configured_priorities()
+
+    def priority(self, path: str) -> str:
+        for prefix, priority in self.priorities:
+            if path.startswith(prefix):
+                return priority
+        return NORMAL
+
+    def rejection_reason(self, priority: str) -> Optional[str]:
+        if priority == CRITICAL:
+            return None
+        headroom = CLASS_HEADROOM.get(priority, 1.0)
+        if self.in_flight >= self.max_in_flight * headroom:
+            return "in_flight"
+        if self.max_pool_wait_ms and self.waits.pressure_ms() >= self.max_pool_wait_ms * headroom:
+            return "pool_wait"
+        return None
+
+controller = AdmissionController()
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 503 + Retry-After when this worker is overloaded"""
+
+    def __init__(self, app, admission: Optional[AdmissionController] = None):
+        self.app = app
+        self.admission = admission or controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = self.admission.priority(scope.get("path", ""))
+        reason = self.admission.rejection_reason(priority)
+        if reason is not None:
+            REQUESTS_SHED.labels(priority, reason).inc()
+            await self._reject(send, reason)
+            return
+
+        if priority == CRITICAL:  # Cheap and never shed; not counted as load
+            await self.app(scope, receive, send)
+            return
+        self.admission.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.in_flight -= 1
+
+    async def _reject(self, send, reason: str):
+        retry_after = RETRY_AFTER_SECONDS + random.randint(0, RETRY_AFTER_SECONDS)  # Spread the retries
+        body = json.dumps({"detail": "Server is busy, please retry shortly", "reason": reason}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.users.auth import get_current_user_from_header
+from app.users.tokens import TokenPrincipal
+from . import crud, schemas
+
+router = APIRouter()
+
+# ===============================
+# INBOX
+# ===============================
+
+@router.get("/inbox", response_model=List[schemas.AlertInboxItem])
+def read_inbox(
+    unread_only: bool = False,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user_from_header)
+):
+    """My budget alerts, newest first (page with before_id = smallest id seen)"""
+    return crud.get_inbox(db, current_user.id, unread_only=unread_only, before_id=before_id, limit=min(limit, 200))
+
+@router.get("/inbox/unread-count", response_model=schemas.UnreadCount)
+def read_unread_count(db: Session = Depends(get_db), current_user: TokenPrincipal = Depends(get_current_user_from_header)):
+    """Number of my unread alerts"""
+    return {"unread": crud.count_unread(db, current_user.id)}
+
+@router.post("/inbox/read-all")
+def mark_all_alerts_read(db: Session = Depends(get_db), current_user: TokenPrincipal = Depends(get_current_user_from_header)):
+    """Mark all my alerts as read"""
+    return {"marked": crud.mark_all_read(db, current_user.id)}
+
+@router.post("/inbox/{item_id}/read", response_model=schemas.AlertInboxItem)
+def mark_alert_read(
+    item_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user_from_header)
+):
+    """Mark one of my alerts as read"""
+    item = crud.mark_read(db, current_user.id, item_id)
+    if item is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return item
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+# ===============================
+# INBOX
+# ===============================
+
+def get_inbox(db: Session, user_id: int, unread_only: bool = False, before_id: Optional[int] = None, limit: int = 50):
+    """A user's alerts, newest first (page with before_id = smallest id seen)"""
+    query = db.query(models.AlertInboxItem).filter(models.AlertInboxItem.user_id == user_id)
+    if unread_only:
+        query = query.filter(models.AlertInboxItem.read_at.is_(None))
+    if before_id is not None:
+        query = query.filter(models.AlertInboxItem.id < before_id)
+    return query.order_by(models.AlertInboxItem.id.desc()).limit(limit).all()
+
+def count_unread(db: Session, user_id: int) -> int:
+    return db.query(func.count(models.AlertInboxItem.id)).filter(
+        models.AlertInboxItem.user_id == user_id,
+        models.AlertInboxItem.read_at.is_(None)
+    ).scalar()
+
+def mark_read(db: Session, user_id: int, item_id: int):
+    item = db.query(models.AlertInboxItem).filter(
+        models.AlertInboxItem.id == item_id,
+        models.AlertInboxItem.user_id == user_id
+    ).first()
+    if item and item.read_at is None:
+        item.read_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(item)
+    return item
+
+def mark_all_read(db: Session, user_id: int) -> int:
+    marked = db.query(models.AlertInboxItem).filter(
+        models.AlertInboxItem.user_id == user_id,
+        models.AlertInboxItem.read_at.is_(None)
+    ).update({models.AlertInboxItem.read_at: datetime.now(timezone.utc)}, synchronize_session=False)
+    db.commit()
+    return marked
@@ -0,0 +1,109 @@
+"""
+Budget threshold alerts
+
+`evaluate_transaction` runs in the same database transaction as every ledger
+transaction written by create_purchase_order_transaction and
+create_change_order_transaction. It only compares the transaction's delta
+with totals that are already stored, so it never re-sums the ledger:
+
+* project spend is kept in Project.actual_budget, which only the server
+  writes (it is not part of ProjectUpdate). Purchase order transactions add
+  their amount under a row lock on the project. When the spend moves from
+  below to at-or-above a BUDGET_ALERT_THRESHOLDS share of planned_budget, a
+  project_threshold alert is raised. Lowering planned_budget re-checks the
+  thresholds against the current spend (evaluate_planned_budget).
+  Spend recorded before the engine existed is loaded once from the ledger
+  by the alerts.backfill_project_spend job (alerts/jobs.py).
+* the remaining task budget is already tracked in Task.budget, and the
+  transaction carries budget_before/budget_after. Going from >= 0 to < 0
+  raises task_overspent (BUDGET_ALERT_TASK_OVERSPENT).
+
+Each alert is delivered to the inbox of the project's manager and
+accountant.
+"""
+import logging
+import os
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app.projects.models import Project, Task
+from .models import AlertInboxItem, BudgetAlert
+
+logger = logging.getLogger(__name__)
+
+def _thresholds(raw: str) -> list[Decimal]:
+    try:
+        return sorted(Decimal(value.strip()) for value in raw.split(",") if value.strip())
+    except ArithmeticError:
+        logger.warning("Ignoring invalid BUDGET_ALERT_THRESHOLDS setting")
+        return [Decimal("0.8"), Decimal("1.0")]
+
+BUDGET_ALERT_THRESHOLDS = _thresholds(os.getenv("BUDGET_ALERT_THRESHOLDS", "0.8,1.0"))  # Shares of planned_budget
+BUDGET_ALERT_TASK_OVERSPENT = os.getenv("BUDGET_ALERT_TASK_OVERSPENT", "true").lower() == "true"
+SPEND_TRANSACTION_TYPES = ("purchase_order",)  # Change orders move a task's budget; they are not spend
+
+def crossed_thresholds(before: Decimal, after: Decimal, planned, thresholds=BUDGET_ALERT_THRESHOLDS) -> list[Decimal]:
+    """Thresholds the spend passed on its way from before to after"""
+    if not planned or planned <= 0:
+        return []
+    return [threshold for threshold in thresholds if before < planned * threshold <= after]
+
+def evaluate_transaction(db: Session, transaction, task: Task) -> list[BudgetAlert]:
+    """Update the project's spend for a new transaction and record the alerts it triggers (does not commit)"""
+    db.flush()  # Transaction id for the alerts
+    alerts = []
+    if transaction.transaction_type in SPEND_TRANSACTION_TYPES:
+        project = db.query(Project).filter(Project.id == task.project_id).with_for_update().first()  # Serialize spend updates
+        if project is not None:
+            before = project.actual_budget or Decimal("0")
+            after = before + transaction.amount
+            project.actual_budget = after
+            for threshold in crossed_thresholds(before, after, project.planned_budget):
+                alerts.append(BudgetAlert(
+                    alert_type="project_threshold", project_id=project.id, task_id=task.id,
+                    transaction_id=transaction.id, threshold=threshold, budget=project.planned_budget, value=after,
+                    message=f"{project.name} has spent {threshold:.0%} of its planned budget"[:255],
+                ))
+
+    if BUDGET_ALERT_TASK_OVERSPENT and transaction.budget_before >= 0 > transaction.budget_after:
+        alerts.append(BudgetAlert(
+            alert_type="task_overspent", project_id=task.project_id, task_id=task.id,
+            transaction_id=transaction.id, budget=transaction.budget_before, value=transaction.budget_after,
+            message=f"Task {task.name} is over budget by {-transaction.budget_after:,.2f}"[:255],
+        ))
+
+    if alerts:
+        _deliver(db, task.project_id, alerts)
+    return alerts
+
+def evaluate_planned_budget(db: Session, project: Project, previous_planned) -> list[BudgetAlert]:
+    """Record the thresholds a planned_budget change puts the current spend past (does not commit)"""
+    spend = project.actual_budget or Decimal("0")
+    reached = [
+        threshold for threshold in BUDGET_ALERT_THRESHOLDS
+        if project.planned_budget and project.planned_budget > 0 and spend >= project.planned_budget * threshold
+    ]
+    if previous_planned and previous_planned > 0:
+        reached = [threshold for threshold in reached if spend < previous_planned * threshold]
+    alerts = [
+        BudgetAlert(
+            alert_type="project_threshold", project_id=project.id, threshold=threshold,
+            budget=project.planned_budget, value=spend,
+            message=f"{project.name} has spent {threshold:.0%} of its planned budget"[:255],
+        )
+        for threshold in reached
+    ]
+    if alerts:
+        _deliver(db, project.id, alerts)
+    return alerts
+
+def _deliver(db: Session, project_id: int, alerts: list[BudgetAlert]):
+    recipients = db.query(Project.project_manager_id, Project.accountant_id).filter(Project.id == project_id).first()
+    user_ids = {user_id for user_id in (recipients or ()) if user_id is not None}
+    db.add_all(alerts)
+    db.flush()  # Alert ids for the inbox rows
+    if user_ids:
+        db.execute(AlertInboxItem.__table__.insert(), [
+            {"user_id": user_id, "alert_id": alert.id} for alert in alerts for user_id in sorted(user_ids)
+        ])
@@ -0,0 +1,60 @@
+"""
+One-time backfill of project spend
+
+Project.actual_budget was not maintained before the alerts engine, so
+existing projects start with a spend that does not match the ledger. The
+backfill sets it to the project's purchase order total once, in batches of
+SPEND_BACKFILL_BATCH projects (one job per batch, like the project purge),
+and then records itself in alert_maintenance. Starting a worker only checks
+for that row and queues the first batch if it is missing; the idempotency
+key keeps workers starting together from queueing it twice. The ledger is
+read once in total, never on later starts, and no alerts are raised for
+thresholds crossed in the past.
+"""
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.finance.models import Transaction
+from app.jobs.crud import enqueue_job
+from app.jobs.runner import job_handler
+from app.projects.models import Project
+from .engine import SPEND_TRANSACTION_TYPES
+from .models import AlertMaintenance
+
+SPEND_BACKFILL_JOB = "alerts.backfill_project_spend"
+SPEND_BACKFILL_BATCH = 500
+
+def queue_project_spend_backfill(db: Session):
+    """Queue the first backfill batch unless the backfill has completed (commits)"""
+    if db.get(AlertMaintenance, SPEND_BACKFILL_JOB) is not None:
+        return
+    enqueue_job(db, SPEND_BACKFILL_JOB, {"after_id": 0}, idempotency_key=SPEND_BACKFILL_JOB, priority=-1)
+    db.commit()
+
+@job_handler(SPEND_BACKFILL_JOB)
+def backfill_project_spend(db: Session, payload: dict):
+    """Set actual_budget from the ledger for one batch of projects and queue the next"""
+    if db.get(AlertMaintenance, SPEND_BACKFILL_JOB) is not None:
+        return None  # Already completed (job retried)
+    # Same row lock as evaluate_transaction, so spend recorded meanwhile is either summed here or added after
+    current = dict(db.execute(
+        select(Project.id, Project.actual_budget).where(Project.id > payload.get("after_id", 0))
+        .order_by(Project.id).limit(SPEND_BACKFILL_BATCH).with_for_update()
+    ).all())
+    if current:
+        spend = dict(db.execute(
+            select(Transaction.project_id, func.sum(Transaction.amount)).where(
+                Transaction.project_id.in_(list(current)), Transaction.transaction_type.in_(SPEND_TRANSACTION_TYPES)
+            ).group_by(Transaction.project_id)
+        ).all())
+        rows = [
+            {"id": project_id, "actual_budget": spend.get(project_id, 0)}
+            for project_id, actual_budget in current.items()
+            if (actual_budget or 0) != spend.get(project_id, 0)
+        ]
+        if rows:
+            db.execute(update(Project), rows)
+    if len(current) < SPEND_BACKFILL_BATCH:
+        db.add(AlertMaintenance(name=SPEND_BACKFILL_JOB))
+    else:
+        enqueue_job(db, SPEND_BACKFILL_JOB, {"after_id": max(current)}, priority=-1)  # Next batch, next transaction
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Numeric, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class BudgetAlert(Base):
+    """A budget threshold crossed by one transaction (see alerts/engine.py)"""
+    __tablename__ = "budget_alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    alert_type = Column(String(30), nullable=False)  # project_threshold, task_overspent
+    project_id = Column(Integer, nullable=False, index=True)  # No FKs: alerts outlive purged projects/tasks
+    task_id = Column(Integer, nullable=True)
+    transaction_id = Column(Integer, nullable=True)  # Transaction that crossed the threshold
+    threshold = Column(Numeric(5, 2), nullable=True)  # Share of planned_budget, e.g. 0.80 (project_threshold)
+    budget = Column(Numeric(15, 2), nullable=True)  # Project planned budget, or the task budget before the transaction
+    value = Column(Numeric(15, 2), nullable=True)  # Project spend, or the task budget after the transaction
+    message = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AlertInboxItem(Base):
+    """Delivery of an alert to one user, unread until read_at is set"""
+    __tablename__ = "alert_inbox"
+    __table_args__ = (
+        # Unread count / inbox page of a user: user_id = ? AND read_at IS NULL ORDER BY id DESC
+        Index("ix_alert_inbox_user", "user_id", "read_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    alert_id = Column(Integer, ForeignKey("budget_alerts.id", ondelete="CASCADE"), nullable=False)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    alert = relationship("BudgetAlert", lazy="joined")
+
+class AlertMaintenance(Base):
+    """One-time maintenance steps of the alerts engine that have completed (e.g. the spend backfill)"""
+    __tablename__ = "alert_maintenance"
+
+    name = Column(String(100), primary_key=True)
+    completed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+# ===============================
+# ALERT SCHEMAS
+# ===============================
+
+class BudgetAlert(BaseModel):
+    id: int
+    alert_type: str
+    project_id: int
+    task_id: Optional[int] = None
+    transaction_id: Optional[int] = None
+    threshold: Optional[Decimal] = None
+    budget: Optional[Decimal] = None
+    value: Optional[Decimal] = None
+    message: str
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class AlertInboxItem(BaseModel):
+    id: int
+    read_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    alert: BudgetAlert
+
+    class Config:
+        from_attributes = True
+
+class UnreadCount(BaseModel):
+    unread: int
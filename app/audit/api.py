@@ -0,0 +1,36 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.users.auth import require_admin_role
+from app.users.tokens import TokenPrincipal
+from . import schemas
+from .capture import AUDITED_ENTITIES
+from .models import audit_events
+
+router = APIRouter()
+
+# ===============================
+# ENTITY HISTORY
+# ===============================
+
+@router.get("/{entity}/{entity_id}", response_model=List[schemas.AuditEvent])
+def read_entity_history(
+    entity: str,
+    entity_id: str,
+    before: Optional[datetime] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Change history of one entity, newest first (page with `before` = oldest occurred_at seen)"""
+    if entity not in AUDITED_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown entity; audited: {', '.join(sorted(AUDITED_ENTITIES))}")
+    query = select(audit_events).where(audit_events.c.entity == entity, audit_events.c.entity_id == entity_id)
+    if before is not None:
+        query = query.where(audit_events.c.occurred_at < before)
+    query = query.order_by(audit_events.c.occurred_at.desc(), audit_events.c.id.desc()).limit(min(limit, 500))
+    return db.execute(query).mappings().all()
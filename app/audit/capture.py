@@ -0,0 +1,380 @@
+"""
+Audit capture
+
+Changes to the audited models of users, projects, documents, finance and
+workforce are captured from SQLAlchemy session events. No extra SQL runs
+inside the transaction:
+
+* after_flush records one event per inserted/updated/deleted object with
+  {field: [before, after]} from the attribute history (already in memory),
+* after_commit hands the session's events to the current request's buffer
+  (discarded on rollback),
+* when the request finishes, AuditMiddleware passes the buffer to the
+  writer thread, which stores queued events with multi-row inserts every
+  AUDIT_FLUSH_SECONDS.
+
+Work outside a request (job runner, scheduler) goes straight to the writer.
+ORM executemany statements (bulk task import and update, template cloning)
+bypass the flush; do_orm_execute itemizes them instead - one SELECT of the
+before values by primary key for an UPDATE, the returned ids for an INSERT.
+Criteria-based statements (project purge) are still not itemized.
+"""
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine.result import IteratorResult, SimpleResultMetaData
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.sql import ClauseElement
+
+from app.documents.models import Document, DocumentAccess
+from app.finance.models import ChangeOrder, ChangeOrderItem, PurchaseOrder, PurchaseOrderItem, Transaction, Vendor
+from app.projects.models import Project, ProjectComponent, ProjectType, Task
+from app.users.models import User
+from app.workforce.models import Profession, Worker, WorkerProjectHistory
+from .models import audit_events, ensure_partition, month_start
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_MAX_BATCH = 1000  # Rows per multi-row insert
+AUDIT_MAX_QUEUE = 100000  # Oldest events are dropped beyond this (writer down or not started)
+AUDIT_MAX_ATTEMPTS = 3
+
+# Mapped class -> entity name used in /audit/{entity}/{id}
+AUDITED_MODELS = {
+    User: "user",
+    Project: "project",
+    ProjectType: "project_type",
+    ProjectComponent: "project_component",
+    Task: "task",
+    Document: "document",
+    DocumentAccess: "document_access",
+    Vendor: "vendor",
+    PurchaseOrder: "purchase_order",
+    PurchaseOrderItem: "purchase_order_item",
+    ChangeOrder: "change_order",
+    ChangeOrderItem: "change_order_item",
+    Transaction: "transaction",
+    Profession: "profession",
+    Worker: "worker",
+    WorkerProjectHistory: "worker_assignment",
+}
+AUDITED_ENTITIES = set(AUDITED_MODELS.values())
+
+IGNORED_FIELDS = {"created_at", "updated_at", "search_name", "last_login_at"}  # Noise, not changes
+REDACTED_FIELDS = {"hashed_password", "invitation_token"}
+
+@dataclass
+class AuditContext:
+    """Events of one request, buffered until it finishes"""
+    request_id: str
+    actor_id: Optional[int]
+    source: Optional[str] = None
+    events: list = field(default_factory=list)
+    closed: bool = False
+
+_audit_context: ContextVar[Optional[AuditContext]] = ContextVar("audit_context", default=None)
+
+def _json_value(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, ClauseElement):
+        return f"<sql {value}>"  # e.g. func.now(), resolved by the database
+    return str(value)
+
+def _event(now: datetime, context: Optional[AuditContext], entity: str, identity, action: str, changes: dict) -> dict:
+    return {
+        "occurred_at": now,
+        "entity": entity,
+        "entity_id": ",".join(str(part) for part in identity),
+        "action": action,
+        "actor_id": context.actor_id if context else None,
+        "request_id": context.request_id if context else None,
+        "source": context.source if context else None,
+        "changes": changes,
+    }
+
+def _field_changes(state, action: str) -> dict:
+    changes = {}
+    for attribute in state.mapper.column_attrs:
+        key = attribute.key
+        if key in IGNORED_FIELDS:
+            continue
+        if action == "update":
+            history = state.attrs[key].history
+            if not history.has_changes():
+                continue
+            before = history.deleted[0] if history.deleted else None
+            after = history.added[0] if history.added else None
+        elif action == "insert":
+            before, after = None, state.dict.get(key)
+        else:
+            before, after = state.dict.get(key), None
+        if before is None and after is None:
+            continue
+        if key in REDACTED_FIELDS:
+            before, after = ("***" if before is not None else None), ("***" if after is not None else None)
+        changes[key] = [_json_value(before), _json_value(after)]
+    return changes
+
+# ===============================
+# SESSION EVENTS
+# ===============================
+
+def _after_flush(session, flush_context):
+    context = _audit_context.get()
+    now = datetime.now(timezone.utc)
+    events = []
+    for action, objects in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            entity = AUDITED_MODELS.get(type(obj))
+            if entity is None:
+                continue
+            state = inspect(obj)
+            changes = _field_changes(state, action)
+            if action == "update" and not changes:
+                continue
+            identity = state.mapper.primary_key_from_instance(obj)
+            events.append(_event(now, context, entity, identity, action, changes))
+    if events:
+        session.info.setdefault("audit_pending", []).extend(events)
+
+def _row_changes(values: dict, before: Optional[dict]) -> dict:
+    """{field: [before, after]} for one parameter set of a bulk statement"""
+    changes = {}
+    for key, after in values.items():
+        if key in IGNORED_FIELDS:
+            continue
+        prior = before.get(key) if before is not None else None
+        if (before is not None and prior == after) or (prior is None and after is None):
+            continue
+        if key in REDACTED_FIELDS:
+            prior, after = ("***" if prior is not None else None), ("***" if after is not None else None)
+        changes[key] = [_json_value(prior), _json_value(after)]
+    return changes
+
+def _bulk_update_events(orm_execute_state: ORMExecuteState, entity: str, pk_key: str, now, context) -> list:
+    """Read the before values of the columns being set, by primary key, ahead of the UPDATE"""
+    model = orm_execute_state.bind_mapper.class_
+    rows = orm_execute_state.parameters
+    keys = sorted({key for row in rows for key in row} - {pk_key})
+    before = {
+        row[pk_key]: row
+        for row in orm_execute_state.session.connection().execute(
+            select(getattr(model, pk_key).label(pk_key), *(getattr(model, key).label(key) for key in keys))
+            .where(getattr(model, pk_key).in_({row[pk_key] for row in rows}))
+        ).mappings()
+    }
+    events = []
+    for row in rows:
+        current = before.get(row[pk_key])
+        if current is None:
+            continue
+        changes = _row_changes({key: value for key, value in row.items() if key != pk_key}, current)
+        if changes:
+            events.append(_event(now, context, entity, (row[pk_key],), "update", changes))
+    return events
+
+def _do_orm_execute(orm_execute_state: ORMExecuteState):
+    rows = orm_execute_state.parameters
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update) or not isinstance(rows, list) or not rows:
+        return None  # Only executemany-style statements skip the flush
+    mapper = orm_execute_state.bind_mapper
+    entity = AUDITED_MODELS.get(mapper.class_) if mapper is not None else None
+    if entity is None or len(mapper.primary_key) != 1:
+        return None
+    pk_key = mapper.get_property_by_column(mapper.primary_key[0]).key
+    session = orm_execute_state.session
+    context = _audit_context.get()
+    now = datetime.now(timezone.utc)
+
+    if orm_execute_state.is_update:
+        events = _bulk_update_events(orm_execute_state, entity, pk_key, now, context)
+        if events:
+            session.info.setdefault("audit_pending", []).extend(events)
+        return None
+
+    if all(row.get(pk_key) is not None for row in rows):
+        ids, result = [row[pk_key] for row in rows], None
+    else:
+        # Ids come from the database: run the INSERT here with the primary key returned in parameter order
+        statement = orm_execute_state.statement
+        returning = [column["name"] for column in statement.returning_column_descriptions]
+        if not returning:
+            statement = statement.returning(getattr(mapper.class_, pk_key), sort_by_parameter_order=True)
+        elif pk_key not in returning:
+            return None
+        invoked = orm_execute_state.invoke_statement(statement=statement)
+        keys, returned = list(invoked.keys()), invoked.all()
+        ids = [row[keys.index(pk_key)] for row in returned]
+        result = IteratorResult(SimpleResultMetaData(keys), iter(returned))
+    session.info.setdefault("audit_pending", []).extend(
+        _event(now, context, entity, (record_id,), "insert", _row_changes(row, None))
+        for record_id, row in zip(ids, rows)
+    )
+    return result
+
+def _after_commit(session):
+    events = session.info.pop("audit_pending", None)
+    if not events:
+        return
+    context = _audit_context.get()
+    if context is not None and not context.closed:
+        context.events.extend(events)
+    else:
+        writer.submit(events)
+
+def _after_rollback(session):
+    session.info.pop("audit_pending", None)
+
+if AUDIT_ENABLED:
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+
+# ===============================
+# WRITER
+# ===============================
+
+class AuditWriter:
+    """Background thread storing queued events as multi-row inserts"""
+
+    def __init__(self, engine, flush_seconds: float = AUDIT_FLUSH_SECONDS, max_batch: int = AUDIT_MAX_BATCH,
+                 max_queue: int = AUDIT_MAX_QUEUE):
+        self.engine = engine
+        self.flush_seconds = flush_seconds
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._partitions: set = set()
+        self._failures = 0
+
+    def submit(self, events: list):
+        with self._lock:
+            overflow = len(self._queue) + len(events) - self.max_queue
+            if overflow > 0:
+                logger.error("Audit queue full; dropping %s oldest events", overflow)
+                for _ in range(min(overflow, len(self._queue))):
+                    self._queue.popleft()
+            self._queue.extend(events)
+            if len(self._queue) >= self.max_batch:
+                self._wakeup.set()
+
+    def _write(self, batch: list):
+        with self.engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                for month in {month_start(event["occurred_at"].date()) for event in batch} - self._partitions:
+                    ensure_partition(conn, month)
+                    self._partitions.add(month)
+            conn.execute(audit_events.insert(), batch)
+
+    def flush(self):
+        """Write everything queued so far"""
+        while True:
+            with self._lock:
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            if not batch:
+                return
+            try:
+                self._write(batch)
+                self._failures = 0
+            except Exception:
+                self._failures += 1
+                if self._failures >= AUDIT_MAX_ATTEMPTS:
+                    logger.exception("Dropping %s audit events after %s failed writes", len(batch), self._failures)
+                    self._failures = 0
+                    continue
+                logger.exception("Audit write failed; retrying in %ss", self.flush_seconds)
+                with self._lock:
+                    self._queue.extendleft(reversed(batch))
+                return
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+def _create_writer() -> AuditWriter:
+    from app.database import engine
+    return AuditWriter(engine)
+
+writer = _create_writer()
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+def _request_actor_id(scope) -> Optional[int]:
+    from app.users.tokens import ACCESS, TokenError, decode_token
+
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token.strip():
+                return None
+            try:
+                return int(decode_token(token.strip(), ACCESS)["sub"])
+            except (TokenError, KeyError, ValueError):
+                return None
+    return None
+
+class AuditMiddleware:
+    """ASGI middleware buffering a request's audit events and queueing them once it finishes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        context = AuditContext(request_id=uuid.uuid4().hex, actor_id=_request_actor_id(scope))
+        context.source = f"{scope.get('method')} {scope.get('path', '')}"[:255]
+        token = _audit_context.set(context)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _audit_context.reset(token)
+            context.closed = True  # Later commits (background tasks) go straight to the writer
+            route = getattr(scope.get("route"), "path", None)
+            if context.events:
+                if route:
+                    source = f"{scope.get('method')} {route}"[:255]
+                    for audit_event in context.events:
+                        audit_event["source"] = source
+                writer.submit(context.events)
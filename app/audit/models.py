@@ -0,0 +1,101 @@
+"""
+Audit event table
+
+On PostgreSQL `audit_events` is range-partitioned by month on occurred_at (the
+primary key is (id, occurred_at), as partitioning requires). Partitions are
+created on demand by the writer. Old months can be detached or dropped
+without touching the rest. SQLite gets a plain table. On both, triggers reject
+UPDATE and DELETE, so the log is append-only.
+
+The table lives in its own MetaData because the partitioned DDL cannot come
+from create_all; `ensure_audit_table` creates it.
+"""
+import logging
+from datetime import date
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, JSON, MetaData, String, Table, text
+
+logger = logging.getLogger(__name__)
+
+audit_metadata = MetaData()
+
+audit_events = Table(
+    "audit_events", audit_metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+    Column("occurred_at", DateTime(timezone=True), nullable=False),
+    Column("entity", String(50), nullable=False),  # e.g. purchase_order, document_access
+    Column("entity_id", String(64), nullable=False),
+    Column("action", String(10), nullable=False),  # insert, update, delete
+    Column("actor_id", Integer, nullable=True),  # User from the request's access token
+    Column("request_id", String(32), nullable=True),  # Groups the events of one request
+    Column("source", String(255), nullable=True),  # "PATCH /finance/purchase-orders/{po_id}", job type, ...
+    Column("changes", JSON, nullable=False),  # {field: [before, after]}
+    Index("ix_audit_events_entity", "entity", "entity_id", "occurred_at"),
+)
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS audit_events (
+        id BIGINT GENERATED ALWAYS AS IDENTITY,
+        occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        entity VARCHAR(50) NOT NULL,
+        entity_id VARCHAR(64) NOT NULL,
+        action VARCHAR(10) NOT NULL,
+        actor_id INTEGER,
+        request_id VARCHAR(32),
+        source VARCHAR(255),
+        changes JSON NOT NULL,
+        PRIMARY KEY (id, occurred_at)
+    ) PARTITION BY RANGE (occurred_at)
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_audit_events_entity ON audit_events (entity, entity_id, occurred_at)",
+    """
+    CREATE OR REPLACE FUNCTION audit_events_append_only() RETURNS trigger AS $$
+    BEGIN
+        RAISE EXCEPTION 'audit_events is append-only';
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS audit_events_append_only ON audit_events",
+    """
+    CREATE TRIGGER audit_events_append_only BEFORE UPDATE OR DELETE ON audit_events
+    FOR EACH ROW EXECUTE FUNCTION audit_events_append_only()
+    """,
+]
+
+SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS audit_events_no_update BEFORE UPDATE ON audit_events "
+    "BEGIN SELECT RAISE(ABORT, 'audit_events is append-only'); END",
+    "CREATE TRIGGER IF NOT EXISTS audit_events_no_delete BEFORE DELETE ON audit_events "
+    "BEGIN SELECT RAISE(ABORT, 'audit_events is append-only'); END",
+]
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def next_month(day: date) -> date:
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+def ensure_partition(conn, month: date):
+    """Create the PostgreSQL partition holding `month` (idempotent)"""
+    start = month_start(month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS audit_events_{start:%Y_%m} PARTITION OF audit_events "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month(start).isoformat()}')"
+    ))
+
+def ensure_audit_table(engine):
+    """Create audit_events with its partitions/triggers for this dialect"""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+            this_month = month_start(date.today())
+            ensure_partition(conn, this_month)
+            ensure_partition(conn, next_month(this_month))
+    else:
+        audit_metadata.create_all(bind=engine)
+        if engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                for statement in SQLITE_TRIGGERS:
+                    conn.execute(text(statement))
@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+# ===============================
+# AUDIT SCHEMAS
+# ===============================
+
+class AuditEvent(BaseModel):
+    id: int
+    occurred_at: datetime
+    entity: str
+    entity_id: str
+    action: str
+    actor_id: Optional[int] = None
+    request_id: Optional[str] = None
+    source: Optional[str] = None
+    changes: Dict[str, List[Any]]
+
+    class Config:
+        from_attributes = True
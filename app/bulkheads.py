@@ -0,0 +1,166 @@
+"""
+Bulkheads for heavy endpoints
+
+By default every sync endpoint runs on AnyIO's shared threadpool (40 threads)
+and draws from the same 7-connection pool, so a burst of report-style
+requests can starve cheap interactive calls. `@bulkhead("reports")` on a sync
+endpoint runs it in a named bulkhead instead. Each bulkhead has:
+
+* its own thread limit, so it never uses the default threadpool's tokens,
+* a DB connection quota. BulkheadQueuePool (PostgreSQL and Cloud SQL engines)
+  makes its checkouts wait for a slot, which keeps the remaining connections
+  free for everything else,
+* a bounded wait queue. Requests beyond it get 503 + Retry-After at once.
+
+Bulkheads are defined in BULKHEADS and can be overridden or added to with
+the BULKHEADS_CONFIG JSON setting. Their usage is exported as Prometheus
+metrics.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+import anyio
+from fastapi import HTTPException
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.admission import TimedQueuePool
+from app.monitoring.metrics import (
+    BULKHEAD_ACTIVE, BULKHEAD_CAPACITY, BULKHEAD_DB_IN_USE, BULKHEAD_QUEUE_WAIT, BULKHEAD_REJECTED, BULKHEAD_WAITING
+)
+
+logger = logging.getLogger(__name__)
+
+BULKHEADS = {
+    # Project listings with financial summaries, change-order listings, admin overviews
+    "reports": {"threads": 4, "db_connections": 3, "queue": 50},
+    # Concurrent sections of the role dashboards (each section is one task here)
+    "dashboards": {"threads": 4, "db_connections": 3, "queue": 100},
+}
+RETRY_AFTER_SECONDS = 2
+
+_current_bulkhead: ContextVar[Optional["Bulkhead"]] = ContextVar("bulkhead", default=None)
+
+class Bulkhead:
+    def __init__(self, name: str, threads: int, db_connections: Optional[int] = None, queue: int = 50):
+        self.name = name
+        self.threads = threads
+        self.max_queue = queue
+        self.db_slots = threading.BoundedSemaphore(db_connections) if db_connections else None
+        self._slots = None
+        self._thread_limiter = None
+        BULKHEAD_CAPACITY.labels(name, "threads").set(threads)
+        if db_connections:
+            BULKHEAD_CAPACITY.labels(name, "db_connections").set(db_connections)
+
+    def _limiters(self):
+        # Created on first use, inside the worker's event loop
+        if self._slots is None:
+            self._slots = anyio.CapacityLimiter(self.threads)
+            self._thread_limiter = anyio.CapacityLimiter(self.threads)  # Never contended: _slots admits first
+        return self._slots, self._thread_limiter
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run a sync function in this bulkhead's threads (503 if its queue is full)"""
+        slots, thread_limiter = self._limiters()
+        if slots.statistics().tasks_waiting >= self.max_queue:
+            BULKHEAD_REJECTED.labels(self.name).inc()
+            raise HTTPException(
+                status_code=503,
+                detail=f"Too many concurrent '{self.name}' requests, please retry shortly",
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+
+        queued = time.perf_counter()
+        BULKHEAD_WAITING.labels(self.name).inc()
+        try:
+            await slots.acquire()
+        finally:
+            BULKHEAD_WAITING.labels(self.name).dec()
+        BULKHEAD_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - queued)
+
+        BULKHEAD_ACTIVE.labels(self.name).inc()
+        token = _current_bulkhead.set(self)  # Copied into the worker thread's context
+        try:
+            return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=thread_limiter)
+        finally:
+            _current_bulkhead.reset(token)
+            BULKHEAD_ACTIVE.labels(self.name).dec()
+            slots.release()
+
+def _load_bulkheads() -> dict[str, Bulkhead]:
+    config = {name: dict(settings) for name, settings in BULKHEADS.items()}
+    raw = os.getenv("BULKHEADS_CONFIG")
+    if raw:
+        try:
+            for name, settings in json.loads(raw).items():
+                config.setdefault(name, {}).update(settings)
+        except (ValueError, AttributeError):
+            logger.warning("Ignoring invalid BULKHEADS_CONFIG setting")
+    return {
+        name: Bulkhead(name, int(settings.get("threads", 4)), settings.get("db_connections"), int(settings.get("queue", 50)))
+        for name, settings in config.items()
+    }
+
+bulkheads = _load_bulkheads()
+
+def bulkhead(name: str):
+    """Decorator running a sync endpoint in the named bulkhead"""
+    if name not in bulkheads:
+        raise KeyError(f"Unknown bulkhead '{name}'")
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            raise TypeError("Bulkheads run sync endpoints; async endpoints are not on the threadpool")
+
+        @functools.wraps(func)  # FastAPI reads the wrapped signature for parameters
+        async def run_in_bulkhead(*args, **kwargs):
+            return await bulkheads[name].run(func, *args, **kwargs)
+
+        run_in_bulkhead.bulkhead = name
+        return run_in_bulkhead
+    return decorator
+
+# ===============================
+# DB CONNECTION QUOTAS
+# ===============================
+
+class BulkheadQueuePool(TimedQueuePool):
+    """Checkouts from inside a bulkhead first take one of its DB connection slots"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bulkhead_slots = {}  # connection record -> (semaphore, bulkhead name)
+
+    def _do_get(self):
+        current = _current_bulkhead.get()
+        if current is None or current.db_slots is None:
+            return super()._do_get()
+        if not current.db_slots.acquire(timeout=self._timeout):
+            raise PoolTimeoutError(
+                f"Bulkhead '{current.name}' DB quota exhausted, timed out after {self._timeout}s"
+            )
+        try:
+            record = super()._do_get()
+        except BaseException:
+            current.db_slots.release()
+            raise
+        self._bulkhead_slots[record] = (current.db_slots, current.name)
+        BULKHEAD_DB_IN_USE.labels(current.name).inc()
+        return record
+
+    def _do_return_conn(self, record):
+        held = self._bulkhead_slots.pop(record, None)
+        try:
+            super()._do_return_conn(record)
+        finally:
+            if held is not None:
+                held[0].release()
+                BULKHEAD_DB_IN_USE.labels(held[1]).dec()
+
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from app.bulkheads import bulkheads
+from app.database import SessionLocal
+from app.projects.models import Project
+from app.users.auth import get_current_user_from_header, require_admin_role, require_role
+from app.users.roles import UserRole
+from app.users.tokens import TokenPrincipal
+from . import schemas, sections
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Dashboard -> {section name: section function}
+DASHBOARDS = {
+    "admin": {
+        "project_status": sections.project_status_counts,
+        "approvals": sections.approval_counts,
+        "recent_transactions": sections.recent_transactions,
+        "budget_alerts": sections.budget_alerts,
+        "job_queue": sections.job_queue,
+    },
+    "project_manager": {
+        "projects": sections.projects_with_budgets,
+        "pending_change_orders": sections.pending_change_orders,
+        "pending_purchase_orders": sections.pending_purchase_orders,
+        "tasks_due_this_week": sections.tasks_due_this_week,
+        "overdue_tasks": sections.overdue_tasks,
+    },
+    "accountant": {
+        "pending_purchase_orders": sections.pending_purchase_orders,
+        "pending_change_orders": sections.pending_change_orders,
+        "recent_transactions": sections.recent_transactions,
+        "budget_alerts": sections.budget_alerts,
+    },
+    "client": {
+        "projects": sections.projects_with_budgets,
+        "task_progress": sections.task_progress,
+        "recent_change_orders": sections.recent_change_orders,
+    },
+}
+
+# Role -> (dashboard, project column scoping it; None: all projects)
+ROLE_DASHBOARDS = {
+    UserRole.SUPERADMIN.value: ("admin", None),
+    UserRole.BUSINESS_ADMIN.value: ("admin", None),
+    UserRole.CLERK.value: ("admin", None),
+    UserRole.PROJECT_MANAGER.value: ("project_manager", Project.project_manager_id),
+    UserRole.ACCOUNTANT.value: ("accountant", Project.accountant_id),
+    UserRole.CLIENT.value: ("client", Project.client_id),
+}
+
+# ===============================
+# CONCURRENT SECTIONS
+# ===============================
+
+def _run_section(section, scope):
+    db = SessionLocal()  # Own session, so its own connection
+    try:
+        return section(db, scope)
+    finally:
+        db.close()
+
+async def _timed_section(name: str, section, scope) -> dict:
+    started = time.perf_counter()
+    try:
+        data = await bulkheads["dashboards"].run(_run_section, section, scope)
+        return {"data": data, "ms": round((time.perf_counter() - started) * 1000, 1)}
+    except HTTPException:
+        raise  # Bulkhead full: the whole dashboard is retried
+    except Exception:
+        logger.exception("Dashboard section %s failed", name)
+        return {"data": None, "ms": round((time.perf_counter() - started) * 1000, 1), "error": "Section failed"}
+
+async def build_dashboard(user: TokenPrincipal, response: Response) -> dict:
+    """Run the sections of the user's role dashboard concurrently and collect them with their timings"""
+    dashboard, column = ROLE_DASHBOARDS[str(user.role)]
+    scope = sections.project_scope(column, user.id) if column is not None else None
+    started = time.perf_counter()
+    names = list(DASHBOARDS[dashboard])
+    results = await asyncio.gather(*(_timed_section(name, DASHBOARDS[dashboard][name], scope) for name in names))
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+    response.headers["Server-Timing"] = ", ".join(
+        [f'{name};dur={result["ms"]}' for name, result in zip(names, results)] + [f"dashboard;dur={total_ms}"]
+    )
+    return {
+        "dashboard": dashboard,
+        "user_id": user.id,
+        "generated_at": datetime.now(timezone.utc),
+        "total_ms": total_ms,
+        "sections": dict(zip(names, results)),
+    }
+
+# ===============================
+# ENDPOINTS
+# ===============================
+
+@router.get("/me", response_model=schemas.Dashboard)
+async def read_my_dashboard(response: Response, current_user: TokenPrincipal = Depends(get_current_user_from_header)):
+    """The dashboard of the caller's role"""
+    if str(current_user.role) not in ROLE_DASHBOARDS:
+        raise HTTPException(status_code=404, detail="No dashboard for this role")
+    return await build_dashboard(current_user, response)
+
+@router.get("/admin", response_model=schemas.Dashboard)
+async def read_admin_dashboard(response: Response, current_user: TokenPrincipal = Depends(require_admin_role)):
+    """Project status, approval counts, recent transactions, budget alerts and job queue across all projects"""
+    return await build_dashboard(current_user, response)
+
+@router.get("/project-manager", response_model=schemas.Dashboard)
+async def read_project_manager_dashboard(
+    response: Response, current_user: TokenPrincipal = Depends(require_role(UserRole.PROJECT_MANAGER))
+):
+    """My projects with budgets, pending change/purchase orders, tasks due this week and overdue tasks"""
+    return await build_dashboard(current_user, response)
+
+@router.get("/accountant", response_model=schemas.Dashboard)
+async def read_accountant_dashboard(
+    response: Response, current_user: TokenPrincipal = Depends(require_role(UserRole.ACCOUNTANT))
+):
+    """Approval queue, recent transactions and budget alerts of my projects"""
+    return await build_dashboard(current_user, response)
+
+@router.get("/client", response_model=schemas.Dashboard)
+async def read_client_dashboard(
+    response: Response, current_user: TokenPrincipal = Depends(require_role(UserRole.CLIENT))
+):
+    """My projects with budgets, task progress and recent change order decisions"""
+    return await build_dashboard(current_user, response)
@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# ===============================
+# DASHBOARD SCHEMAS
+# ===============================
+
+class DashboardSection(BaseModel):
+    data: Any = None
+    ms: float  # Time the section took, including waiting for a bulkhead slot
+    error: Optional[str] = None  # Set when the section failed; the other sections are still returned
+
+class Dashboard(BaseModel):
+    dashboard: str
+    user_id: int
+    generated_at: datetime
+    total_ms: float
+    sections: Dict[str, DashboardSection]
@@ -0,0 +1,167 @@
+"""
+Dashboard sections
+
+Each section is a plain sync query function `section(db, scope)` returning
+JSON-ready data. `scope` is a select of the project ids the user may see, or
+None for every live project (admin roles). A section must not depend on
+another one, because the sections of a dashboard run concurrently on
+separate connections.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from app.alerts.models import BudgetAlert
+from app.finance.models import ChangeOrder, ChangeOrderItem, PurchaseOrder, PurchaseOrderItem, Transaction
+from app.jobs.crud import get_queue_stats
+from app.projects.models import Project, Task
+
+LIST_LIMIT = 50
+CLOSED_TASK_STATUSES = ("Done", "Cancelled")
+PENDING = "Pending Approval"
+
+def project_scope(column, user_id: int):
+    """Live projects where `column` (e.g. Project.project_manager_id) is the user"""
+    return select(Project.id).where(column == user_id, Project.deleted_at.is_(None))
+
+def _live_project_ids():
+    return select(Project.id).where(Project.deleted_at.is_(None))
+
+def _in_scope(column, scope):
+    return column.in_(scope if scope is not None else _live_project_ids())
+
+def _rows(result) -> list[dict]:
+    return [dict(row) for row in result.mappings()]
+
+# ===============================
+# PROJECTS AND TASKS
+# ===============================
+
+def projects_with_budgets(db: Session, scope):
+    """Projects with planned/spent budget, remaining task budget and open task count"""
+    open_task = case((Task.status.in_(CLOSED_TASK_STATUSES), 0), else_=1)
+    query = select(
+        Project.id, Project.name, Project.status, Project.start_date, Project.end_date,
+        Project.planned_budget, Project.actual_budget,
+        func.coalesce(func.sum(Task.budget), 0).label("remaining_task_budget"),
+        func.count(Task.id).label("tasks"),
+        func.coalesce(func.sum(open_task), 0).label("open_tasks"),
+    ).outerjoin(Task, Task.project_id == Project.id).where(
+        _in_scope(Project.id, scope)
+    ).group_by(Project.id).order_by(Project.end_date, Project.id)
+    return _rows(db.execute(query))
+
+def _open_tasks(scope):
+    return select(
+        Task.id, Task.name, Task.status, Task.priority, Task.end_date, Task.project_id, Task.component_id
+    ).where(_in_scope(Task.project_id, scope), Task.status.notin_(CLOSED_TASK_STATUSES))
+
+def tasks_due_this_week(db: Session, scope):
+    today = date.today()
+    query = _open_tasks(scope).where(Task.end_date.between(today, today + timedelta(days=7)))
+    return _rows(db.execute(query.order_by(Task.end_date, Task.id).limit(LIST_LIMIT)))
+
+def overdue_tasks(db: Session, scope):
+    query = _open_tasks(scope).where(Task.end_date < date.today())
+    return _rows(db.execute(query.order_by(Task.end_date, Task.id).limit(LIST_LIMIT)))
+
+def task_progress(db: Session, scope):
+    """Task counts per status for each project"""
+    query = select(Task.project_id, Task.status, func.count(Task.id).label("tasks")).where(
+        _in_scope(Task.project_id, scope)
+    ).group_by(Task.project_id, Task.status)
+    progress = {}
+    for project_id, status, count in db.execute(query):
+        progress.setdefault(project_id, {})[status] = count
+    return [{"project_id": project_id, "by_status": counts} for project_id, counts in progress.items()]
+
+def project_status_counts(db: Session, scope):
+    query = select(Project.status, func.count(Project.id)).where(_in_scope(Project.id, scope)).group_by(Project.status)
+    return dict(db.execute(query).all())
+
+# ===============================
+# FINANCE
+# ===============================
+
+def pending_purchase_orders(db: Session, scope):
+    """Purchase orders awaiting approval, oldest first, with their item total"""
+    total = select(func.coalesce(func.sum(PurchaseOrderItem.price), 0)).where(
+        PurchaseOrderItem.purchase_order_id == PurchaseOrder.id
+    ).scalar_subquery()
+    query = select(
+        PurchaseOrder.id, PurchaseOrder.po_number, PurchaseOrder.description, PurchaseOrder.delivery_date,
+        PurchaseOrder.task_id, Task.project_id, PurchaseOrder.created_at, total.label("total_amount"),
+    ).join(Task, Task.id == PurchaseOrder.task_id).where(
+        PurchaseOrder.status == PENDING, _in_scope(Task.project_id, scope)
+    ).order_by(PurchaseOrder.created_at, PurchaseOrder.id).limit(LIST_LIMIT)
+    return _rows(db.execute(query))
+
+def pending_change_orders(db: Session, scope):
+    """Change orders awaiting approval, oldest first, with their net cost impact"""
+    net = select(func.coalesce(func.sum(
+        case((ChangeOrderItem.impact_type == "-", -ChangeOrderItem.amount), else_=ChangeOrderItem.amount)
+    ), 0)).where(ChangeOrderItem.change_order_id == ChangeOrder.id).scalar_subquery()
+    query = select(
+        ChangeOrder.id, ChangeOrder.co_number, ChangeOrder.title, ChangeOrder.reason,
+        ChangeOrder.task_id, Task.project_id, ChangeOrder.created_at, net.label("net_amount"),
+    ).join(Task, Task.id == ChangeOrder.task_id).where(
+        ChangeOrder.status == PENDING, _in_scope(Task.project_id, scope)
+    ).order_by(ChangeOrder.created_at, ChangeOrder.id).limit(LIST_LIMIT)
+    return _rows(db.execute(query))
+
+def recent_change_orders(db: Session, scope):
+    """Latest decided change orders (approved, implemented or rejected)"""
+    query = select(
+        ChangeOrder.id, ChangeOrder.co_number, ChangeOrder.title, ChangeOrder.status,
+        ChangeOrder.approved_date, Task.project_id,
+    ).join(Task, Task.id == ChangeOrder.task_id).where(
+        ChangeOrder.status.in_(("Approved", "Implemented", "Rejected")), _in_scope(Task.project_id, scope)
+    ).order_by(ChangeOrder.approved_date.desc(), ChangeOrder.id.desc()).limit(LIST_LIMIT)
+    return _rows(db.execute(query))
+
+def approval_counts(db: Session, scope):
+    """Purchase and change orders per status"""
+    counts = {}
+    for name, model in (("purchase_orders", PurchaseOrder), ("change_orders", ChangeOrder)):
+        query = select(model.status, func.count(model.id)).join(Task, Task.id == model.task_id).where(
+            _in_scope(Task.project_id, scope)
+        ).group_by(model.status)
+        counts[name] = dict(db.execute(query).all())
+    return counts
+
+def recent_transactions(db: Session, scope):
+    query = select(
+        Transaction.id, Transaction.transaction_number, Transaction.transaction_type, Transaction.source_number,
+        Transaction.amount, Transaction.impact_type, Transaction.project_id, Transaction.task_id,
+        Transaction.created_at,
+    ).where(_in_scope(Transaction.project_id, scope)).order_by(
+        Transaction.created_at.desc(), Transaction.id.desc()
+    ).limit(LIST_LIMIT)
+    return _rows(db.execute(query))
+
+def _latest_alerts(alert_type: str, key, scope):
+    """Id of the newest alert of a type per project (or per task)"""
+    return select(func.max(BudgetAlert.id)).where(
+        BudgetAlert.alert_type == alert_type, _in_scope(BudgetAlert.project_id, scope)
+    ).group_by(key)
+
+def budget_alerts(db: Session, scope):
+    """Highest budget threshold alert per project, and tasks still overspent with their latest alert (alerts/engine.py)"""
+    projects = select(
+        BudgetAlert.id, BudgetAlert.project_id, Project.name, BudgetAlert.threshold,
+        BudgetAlert.budget.label("planned_budget"), BudgetAlert.value.label("spent"),
+        BudgetAlert.message, BudgetAlert.created_at,
+    ).join(Project, Project.id == BudgetAlert.project_id).where(
+        BudgetAlert.id.in_(_latest_alerts("project_threshold", BudgetAlert.project_id, scope))
+    ).order_by(BudgetAlert.threshold.desc(), BudgetAlert.created_at.desc()).limit(LIST_LIMIT)
+    tasks = select(
+        BudgetAlert.id, BudgetAlert.task_id, Task.name, BudgetAlert.project_id, Task.budget,
+        BudgetAlert.message, BudgetAlert.created_at,
+    ).join(Task, Task.id == BudgetAlert.task_id).where(
+        BudgetAlert.id.in_(_latest_alerts("task_overspent", BudgetAlert.task_id, scope)), Task.budget < 0
+    ).order_by(Task.budget).limit(LIST_LIMIT)
+    return {"projects": _rows(db.execute(projects)), "overspent_tasks": _rows(db.execute(tasks))}
+
+def job_queue(db: Session, scope):
+    return get_queue_stats(db)
@@ -2,6 +2,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 # Use GCP Cloud SQL
 from google.cloud.sql.connector import Connector
@@ -10,18 +11,28 @@ import pg8000
 # Load environment variables
 load_dotenv()
 
+from .bulkheads import BulkheadQueuePool
+
+# Seconds a request waits for a pooled connection before failing (admission control sheds load well before this)
+POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
 def get_database_url():
     """Get database URL based on environment"""
     
+    # Explicit URL: local PostgreSQL/SQLite for development and benchmarks
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        return database_url
+    
     # Use Cloud SQL for all environments
     return get_cloud_sql_url()
 
 # TODO: Uncomment when ready to connect to GCP
-def get_cloud_sql_url():
-    """Configure Cloud SQL connection with Application Default Credentials"""
+def get_cloud_sql_url(instance_connection_name=None, unpooled=False):
+    """Configure Cloud SQL connection with Application Default Credentials (unpooled: no connection pool)"""
     
     # GCP Cloud SQL configuration
-    INSTANCE_CONNECTION_NAME = os.getenv("INSTANCE_CONNECTION_NAME", "construction-management-475118:us-east4:databasecm")  # project:region:instance
+    INSTANCE_CONNECTION_NAME = instance_connection_name or os.getenv("INSTANCE_CONNECTION_NAME", "construction-management-475118:us-east4:databasecm")  # project:region:instance
     DB_USER = os.getenv("DB_USER", "postgres")
     DB_PASS = os.getenv("DB_PASS")
     DB_NAME = os.getenv("DB_NAME", "construction_management")
@@ -43,32 +54,75 @@ def get_cloud_sql_url():
         )
         return conn
     # Create SQLAlchemy engine with Cloud SQL connector
+    if unpooled:
+        return create_engine("postgresql+pg8000://", creator=getconn, poolclass=NullPool)
     engine = create_engine(
         "postgresql+pg8000://",
         creator=getconn,
+        poolclass=BulkheadQueuePool,
         pool_size=5,
         max_overflow=2,
-        pool_timeout=30,
+        pool_timeout=POOL_TIMEOUT,
         pool_recycle=-1,
         pool_pre_ping=True,
     )
     return engine
 
-DATABASE_URL = get_database_url()
-if isinstance(DATABASE_URL, str):
-    # SQLite fallback (should not be used)
-    engine = create_engine(
-        DATABASE_URL, 
-        connect_args={"check_same_thread": False}
-    )
-else:
+def create_engine_for_url(database_url):
+    """Engine for a URL from the environment, or an already configured Cloud SQL engine"""
+    if isinstance(database_url, str) and database_url.startswith("sqlite"):
+        # Local SQLite (development/benchmarks only)
+        return create_engine(
+            database_url, 
+            connect_args={"check_same_thread": False}
+        )
+    if isinstance(database_url, str):
+        # Local PostgreSQL from DATABASE_URL, same pool settings as Cloud SQL
+        return create_engine(
+            database_url,
+            poolclass=BulkheadQueuePool,
+            pool_size=5,
+            max_overflow=2,
+            pool_timeout=POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
     # Cloud SQL engine (already configured)
-    engine = DATABASE_URL
+    return database_url
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def create_unpooled_engine():
+    """Primary engine without a pool, for connections held open for long (the scheduler's leader lock)"""
+    database_url = os.getenv("DATABASE_URL")
+    if database_url:
+        return create_engine(database_url, poolclass=NullPool)
+    return get_cloud_sql_url(unpooled=True)
+
+def get_replica_engines():
+    """Read replicas: DATABASE_REPLICA_URLS or REPLICA_INSTANCE_CONNECTION_NAMES (comma-separated)"""
+    urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    instances = [name.strip() for name in os.getenv("REPLICA_INSTANCE_CONNECTION_NAMES", "").split(",") if name.strip()]
+    engines = [(url.split("@")[-1], create_engine_for_url(url)) for url in urls]
+    engines += [(name, get_cloud_sql_url(name)) for name in instances]
+    return engines
+
+DATABASE_URL = get_database_url()
+engine = create_engine_for_url(DATABASE_URL)
+
+# Read replicas for GET requests (see app/replicas.py); none configured = primary only
+from .replicas import Replica, ReplicaSet, RoutingSession
+
+replica_set = ReplicaSet([Replica(name, replica_engine) for name, replica_engine in get_replica_engines()])
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, replicas=replica_set)
 
 Base = declarative_base()
 
+def ensure_indexes(engine):
+    """Create model indexes missing from tables that predate them (create_all skips existing tables)"""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
 # Dependency to get DB session
 def get_db():
     db = SessionLocal()
@@ -1,40 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.users import crud as user_crud
-from app.users.models import User
+from app.users.auth import get_current_user_from_header, require_admin_role
+from app.users.tokens import TokenPrincipal
 from . import crud, schemas, models
+from . import uploads
+from .processing import enqueue_document_processing, processor
+from .storage import StorageError, get_storage_backend
+from .streaming import build_content_response
 
 router = APIRouter()
 
-# Simple authentication dependency (placeholder - replace with your auth system)
-def get_current_user(db: Session = Depends(get_db)) -> User:
-    """
-    Placeholder authentication function.
-    In a real application, this would validate JWT tokens or session data.
-    For now, returns a demo user with ID 1.
-    """
-    user = user_crud.get_user(db, user_id=1)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not authenticated"
-        )
-    return user
+# Authenticated user from the signed access token (no database lookup)
+get_current_user = get_current_user_from_header
 
-def get_user_id(user: User) -> int:
+def get_user_id(user: TokenPrincipal) -> int:
     """Helper function to extract user ID as integer"""
-    # For SQLAlchemy models, the ID might be accessed differently
-    if hasattr(user, '__dict__') and 'id' in user.__dict__:
-        return user.__dict__['id']
-    elif hasattr(user, '_sa_instance_state'):
-        # SQLAlchemy instance - try to get the actual value
-        for key, value in user.__dict__.items():
-            if key == 'id' and isinstance(value, int):
-                return value
-    # Fallback - this might be the problematic line but try it
-    return 1  # Default user ID for demo purposes
+    return int(user.id)
 
 # ===============================
 # DOCUMENT UPLOAD & MANAGEMENT
@@ -43,24 +27,24 @@ def get_user_id(user: User) -> int:
 @router.post("/upload", response_model=schemas.DocumentResponse)
 async def upload_document(
     name: str,
+    file: UploadFile = File(..., description="Document content; stored under a server-generated path"),
     description: Optional[str] = None,
-    storage_path: str = "",  # Will be set after file upload
-    file_type: str = "",
-    file_size: Optional[int] = None,
+    file_type: str = "",  # Defaults to the part's Content-Type
     document_type: Optional[str] = None,
     project_id: Optional[int] = None,
     component_id: Optional[int] = None,
     task_id: Optional[int] = None,
     is_public: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
-    """Upload a new document with hierarchy support"""
+    """Upload a new document with hierarchy support (large files: use /uploads sessions)"""
+    storage_path, file_size = await run_in_threadpool(uploads.store_upload, file.file, file.filename or name)
     document_data = schemas.DocumentCreate(
         name=name,
         description=description,
         storage_path=storage_path,
-        file_type=file_type,
+        file_type=file_type or file.content_type or "application/octet-stream",
         file_size=file_size,
         document_type=document_type,
         project_id=project_id,
@@ -68,24 +52,62 @@ async def upload_document(
         task_id=task_id,
         is_public=is_public
     )
-    
-    return crud.create_document(db=db, document=document_data, uploaded_by_id=get_user_id(current_user))
+
+    try:
+        document = crud.create_document(db=db, document=document_data, uploaded_by_id=get_user_id(current_user))
+    except Exception:
+        uploads.discard_stored_file(storage_path)
+        raise
+    enqueue_document_processing(db, document)
+    return document
 
 @router.get("/", response_model=List[schemas.DocumentResponse])
 def get_accessible_documents(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get all documents accessible by the current user"""
     return crud.get_documents_accessible_by_user(db, get_user_id(current_user), skip, limit)
 
+@router.get("/search", response_model=schemas.DocumentSearchResponse)
+def search_documents(
+    q: str = Query(..., min_length=2, description="Search text (name, description, type, PDF content)"),
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Full-text search over documents the current user can view, ranked by relevance"""
+    hits = crud.search_documents(db, q, get_user_id(current_user), skip, limit)
+    return {
+        "query": q,
+        "results": [
+            {
+                "id": document.id,
+                "name": document.name,
+                "description": document.description,
+                "document_type": document.doc_type,
+                "file_type": document.file_type,
+                "project_id": document.project_id,
+                "component_id": document.component_id,
+                "task_id": document.task_id,
+                "uploaded_by_id": document.uploaded_by,
+                "created_at": document.created_at,
+                "rank": rank
+            }
+            for document, rank in hits
+        ],
+        "skip": skip,
+        "limit": limit
+    }
+
 @router.get("/{document_id}", response_model=schemas.DocumentResponse)
 def get_document_details(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get detailed information about a specific document"""
     if not crud.can_user_view_document(db, document_id, get_user_id(current_user)):
@@ -100,12 +122,50 @@ def get_document_details(
     
     return document
 
+@router.get("/{document_id}/content")
+def download_document_content(
+    document_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None, alias="If-Range"),
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Download document content (supports Range/If-None-Match for resumable downloads)"""
+    if not crud.can_user_view_document(db, document_id, get_user_id(current_user)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this document"
+        )
+
+    document = crud.get_document_file_info(db, document_id)
+    storage_path = getattr(document, 'storage_path', None) if document else None
+    if not storage_path:
+        raise HTTPException(status_code=404, detail="Document content not found")
+
+    try:
+        backend = get_storage_backend(storage_path)
+        stored = backend.stat(storage_path)
+    except StorageError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return build_content_response(
+        backend,
+        storage_path,
+        stored,
+        range_header=range_header,
+        if_range=if_range,
+        if_none_match=if_none_match,
+        media_type=getattr(document, 'file_type', None),
+        filename=getattr(document, 'name', None)
+    )
+
 @router.put("/{document_id}", response_model=schemas.DocumentResponse)
 def update_document(
     document_id: int,
     document_update: schemas.DocumentUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Update document details (requires edit access)"""
     updated_document = crud.update_document(db, document_id, document_update, get_user_id(current_user))
@@ -121,7 +181,7 @@ def update_document(
 def delete_document(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Delete document (only uploader or admin access)"""
     success = crud.delete_document(db, document_id, get_user_id(current_user))
@@ -133,6 +193,194 @@ def delete_document(
     
     return {"message": "Document deleted successfully"}
 
+# ===============================
+# RESUMABLE UPLOADS
+# ===============================
+
+def get_owned_upload_session(db: Session, session_id: str, user_id: int):
+    """Load an upload session, ensuring it belongs to the user"""
+    upload_session = crud.get_upload_session(db, session_id)
+    if not upload_session or upload_session.created_by_id != user_id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return upload_session
+
+@router.post("/uploads", response_model=schemas.UploadSessionResponse)
+def create_upload_session(
+    session_data: schemas.UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Start a resumable upload; send chunks with PUT /uploads/{session_id}/chunks/{n}"""
+    upload_session = crud.create_upload_session(db, session_data, get_user_id(current_user))
+    return crud.build_upload_session_status(db, upload_session)
+
+@router.get("/uploads/{session_id}", response_model=schemas.UploadSessionResponse)
+def get_upload_session_status(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Get received chunks/offsets so a client can resume an interrupted upload"""
+    upload_session = get_owned_upload_session(db, session_id, get_user_id(current_user))
+    return crud.build_upload_session_status(db, upload_session)
+
+@router.put("/uploads/{session_id}/chunks/{chunk_number}", response_model=schemas.UploadChunkInfo)
+async def upload_chunk(
+    session_id: str,
+    chunk_number: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Upload one chunk (raw request body). Chunks may be sent in any order and in parallel."""
+    upload_session = await run_in_threadpool(get_owned_upload_session, db, session_id, get_user_id(current_user))
+    if upload_session.status != "active":
+        raise HTTPException(status_code=409, detail=f"Upload session is {upload_session.status}")
+    if crud.upload_session_expired(upload_session):
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+    if chunk_number < 0 or chunk_number >= upload_session.total_chunks:
+        raise HTTPException(status_code=400, detail="Chunk number out of range")
+
+    expected_size = uploads.expected_chunk_size(upload_session.total_size, upload_session.chunk_size, chunk_number)
+    try:
+        size, checksum = await uploads.write_chunk(session_id, chunk_number, request.stream(), expected_size)
+    except uploads.ChunkSizeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    await run_in_threadpool(crud.record_upload_chunk, db, session_id, chunk_number, size, checksum)
+    return {
+        "chunk_number": chunk_number,
+        "offset": chunk_number * upload_session.chunk_size,
+        "size": size,
+        "checksum": checksum
+    }
+
+@router.post("/uploads/{session_id}/complete", response_model=schemas.DocumentResponse)
+def complete_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Assemble all chunks into the final file and create the document"""
+    upload_session = get_owned_upload_session(db, session_id, get_user_id(current_user))
+    if upload_session.status == "completed" and upload_session.document_id:
+        return crud.get_document(db, upload_session.document_id)
+    if crud.upload_session_expired(upload_session):
+        raise HTTPException(status_code=410, detail="Upload session has expired")
+
+    status_info = crud.build_upload_session_status(db, upload_session)
+    if status_info["missing_chunks"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload incomplete", "missing_chunks": status_info["missing_chunks"]}
+        )
+    if not crud.claim_upload_session_for_finalize(db, session_id):
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+    try:
+        storage_path, file_size = uploads.assemble_upload(session_id, upload_session.total_chunks, upload_session.name)
+        document = crud.create_document_from_upload(db, upload_session, storage_path, file_size)
+    except Exception:
+        db.rollback()
+        crud.set_upload_session_status(db, session_id, "active")
+        raise
+
+    crud.set_upload_session_status(db, session_id, "completed", document_id=document.id)
+    uploads.discard_session_files(session_id)
+    enqueue_document_processing(db, document)
+    return document
+
+@router.delete("/uploads/{session_id}")
+def abort_upload_session(
+    session_id: str,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Abort an upload and discard received chunks"""
+    upload_session = get_owned_upload_session(db, session_id, get_user_id(current_user))
+    if upload_session.status == "completed":
+        raise HTTPException(status_code=409, detail="Upload session is already completed")
+    crud.set_upload_session_status(db, session_id, "aborted")
+    uploads.discard_session_files(session_id)
+    return {"message": "Upload aborted"}
+
+# ===============================
+# PREVIEWS & PROCESSING
+# ===============================
+
+@router.get("/processing/stats", response_model=schemas.DocumentProcessingStats)
+def get_document_processing_stats(current_user: TokenPrincipal = Depends(require_admin_role)):
+    """Queue depth and recent job timing for this worker's processing pool (admin only)"""
+    return processor.get_stats()
+
+def get_viewable_preview(db: Session, document_id: int, user_id: int):
+    """Load a document's preview row after checking view permission"""
+    if not crud.can_user_view_document(db, document_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view this document"
+        )
+    preview = crud.get_document_preview(db, document_id)
+    if not preview:
+        raise HTTPException(status_code=404, detail="No preview for this document")
+    return preview
+
+@router.get("/{document_id}/preview", response_model=schemas.DocumentPreviewResponse)
+def get_document_preview(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Get preview status and extracted metadata (page count, dimensions, capture date)"""
+    preview = get_viewable_preview(db, document_id, get_user_id(current_user))
+    return {
+        "document_id": preview.document_id,
+        "status": preview.status,
+        "error": preview.error,
+        "has_thumbnail": bool(preview.thumbnail_path),
+        "has_preview": bool(preview.preview_path),
+        "page_count": preview.page_count,
+        "width": preview.width,
+        "height": preview.height,
+        "captured_at": preview.captured_at,
+        "queued_at": preview.queued_at,
+        "completed_at": preview.completed_at,
+        "queue_wait_ms": preview.queue_wait_ms,
+        "duration_ms": preview.duration_ms
+    }
+
+def serve_preview_file(storage_path: Optional[str], if_none_match: Optional[str], media_type: str):
+    if not storage_path:
+        raise HTTPException(status_code=404, detail="Preview not available")
+    try:
+        backend = get_storage_backend(storage_path)
+        stored = backend.stat(storage_path)
+    except StorageError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return build_content_response(backend, storage_path, stored, if_none_match=if_none_match, media_type=media_type)
+
+@router.get("/{document_id}/thumbnail")
+def get_document_thumbnail(
+    document_id: int,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Get the document thumbnail image (JPEG)"""
+    preview = get_viewable_preview(db, document_id, get_user_id(current_user))
+    return serve_preview_file(preview.thumbnail_path, if_none_match, "image/jpeg")
+
+@router.get("/{document_id}/preview/image")
+def get_document_preview_image(
+    document_id: int,
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(get_current_user)
+):
+    """Get the rendered first-page preview of a PDF (PNG)"""
+    preview = get_viewable_preview(db, document_id, get_user_id(current_user))
+    return serve_preview_file(preview.preview_path, if_none_match, "image/png")
+
 # ===============================
 # DOCUMENT ACCESS CONTROL
 # ===============================
@@ -142,7 +390,7 @@ def grant_document_access(
     document_id: int,
     access_data: schemas.DocumentAccessCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Grant access to a document for a specific user"""
     if not crud.can_user_manage_access(db, document_id, get_user_id(current_user)):
@@ -167,7 +415,7 @@ def revoke_document_access(
     document_id: int,
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Revoke access to a document for a specific user"""
     success = crud.revoke_document_access(db, document_id, user_id, get_user_id(current_user))
@@ -183,7 +431,7 @@ def revoke_document_access(
 def get_document_access_list(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get list of users who have access to a document"""
     access_list = crud.get_document_access_list(db, document_id, get_user_id(current_user))
@@ -199,7 +447,7 @@ def share_document_with_user(
     shared_with_id: int,
     share_data: schemas.DocumentShareCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Share a document with a specific user"""
     share = crud.share_document_with_user(
@@ -223,7 +471,7 @@ def share_document_with_multiple_users(
     document_id: int,
     share_data: schemas.DocumentShareMultiple,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Share a document with multiple users"""
     # Override document_id from URL
@@ -241,7 +489,7 @@ def share_document_with_multiple_users(
 def get_document_shares(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get sharing history for a document"""
     shares = crud.get_document_shares(db, document_id, get_user_id(current_user))
@@ -257,31 +505,20 @@ def search_users_for_document_sharing(
     document_id: Optional[int] = Query(None, description="Document ID to exclude users who already have access"),
     limit: int = Query(20, le=50, description="Maximum number of results"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
-    """Search users for document sharing"""
+    """Search users for document sharing (typeahead: prefix matches rank first)"""
     exclude_user_ids = [get_user_id(current_user)]  # Always exclude current user
     
-    # If document_id provided, exclude users who already have access
+    # If document_id provided, users who already have access (and the uploader) are excluded in the query
     if document_id:
         if not crud.can_user_view_document(db, document_id, get_user_id(current_user)):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to view this document"
             )
-        
-        # Get users who already have access
-        access_list = crud.get_document_access_list(db, document_id, get_user_id(current_user))
-        exclude_user_ids.extend([getattr(access, 'user_id', 0) for access in access_list if hasattr(access, 'user_id')])
-        
-        # Also exclude the document uploader
-        document = crud.get_document(db, document_id)
-        if document:
-            uploader_id = getattr(document, 'uploaded_by_id', None)
-            if uploader_id:
-                exclude_user_ids.append(uploader_id)
     
-    users = crud.search_users_for_sharing(db, q, exclude_user_ids, limit)
+    users = crud.search_users_for_sharing(db, q, exclude_user_ids, limit, exclude_document_id=document_id)
     
     return {
         "users": [
@@ -289,12 +526,14 @@ def search_users_for_document_sharing(
                 "id": user.id,
                 "full_name": user.full_name,
                 "email": user.email,
-                "role": getattr(user, 'role', 'user')
+                "role": getattr(user, 'role', 'user'),
+                "is_active": bool(user.is_active)
             }
             for user in users
         ],
-        "total_found": len(users),
-        "search_term": q
+        "total": len(users),
+        "page": 1,
+        "per_page": limit
     }
 
 # ===============================
@@ -307,7 +546,7 @@ def get_documents_by_project(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get documents for a specific project"""
     return crud.get_documents_by_project(db, project_id, get_user_id(current_user), skip, limit)
@@ -318,7 +557,7 @@ def get_documents_by_component(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get documents for a specific component"""
     return crud.get_documents_by_component(db, component_id, get_user_id(current_user), skip, limit)
@@ -331,7 +570,7 @@ def get_documents_by_component(
 def get_document_permissions_summary(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Get comprehensive permissions summary for a document"""
     summary = crud.get_document_permissions_summary(db, document_id, get_user_id(current_user))
@@ -355,7 +594,7 @@ async def create_upload_file_legacy(
     task_id: Optional[int] = None,
     is_public: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Legacy upload endpoint for compatibility"""
     # In real implementation: Upload file to Google Cloud Storage
@@ -374,14 +613,16 @@ async def create_upload_file_legacy(
         is_public=is_public
     )
     
-    return crud.create_document(db=db, document=document_data, uploaded_by_id=get_user_id(current_user))
+    document = crud.create_document(db=db, document=document_data, uploaded_by_id=get_user_id(current_user))
+    enqueue_document_processing(db, document)
+    return document
 
 @router.get("/documents/", response_model=List[schemas.DocumentResponse])
 def read_documents_legacy(
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: TokenPrincipal = Depends(get_current_user)
 ):
     """Legacy endpoint for compatibility"""
     return crud.get_documents_accessible_by_user(db, get_user_id(current_user), skip, limit)
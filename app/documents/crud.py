@@ -1,7 +1,12 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_, desc
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from . import models, schemas
+from datetime import datetime, timedelta, timezone
+import mimetypes
+import os
+import secrets
+from . import models, schemas, search, uploads
 
 # ===============================
 # DOCUMENT CRUD OPERATIONS
@@ -23,6 +28,8 @@ def create_document(db: Session, document: schemas.DocumentCreate, uploaded_by_i
         is_public=document.is_public
     )
     db.add(db_document)
+    db.flush()
+    search.index_document(db, db_document)
     db.commit()
     db.refresh(db_document)
     return db_document
@@ -37,6 +44,15 @@ def get_document(db: Session, document_id: int):
         joinedload(models.Document.access_permissions)
     ).filter(models.Document.id == document_id).first()
 
+def get_document_file_info(db: Session, document_id: int):
+    """Get only the columns needed to serve document content (no relationships)"""
+    return db.query(
+        models.Document.id,
+        models.Document.name,
+        models.Document.storage_path,
+        models.Document.file_type
+    ).filter(models.Document.id == document_id).first()
+
 def get_documents_accessible_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     """Get all documents a user can access (uploaded by them, public, or explicitly granted access)"""
     return db.query(models.Document).outerjoin(
@@ -108,6 +124,7 @@ def update_document(db: Session, document_id: int, document_update: schemas.Docu
     for field, value in document_update.dict(exclude_unset=True).items():
         setattr(document, field, value)
     
+    search.index_document(db, document)
     db.commit()
     db.refresh(document)
     return document
@@ -123,6 +140,7 @@ def delete_document(db: Session, document_id: int, user_id: int):
     if (uploader_id != user_id) and not has_admin_access(db, document_id, user_id):
         return False
     
+    search.remove_document(db, document_id)
     db.delete(document)
     db.commit()
     return True
@@ -347,25 +365,63 @@ def get_document_shares(db: Session, document_id: int, user_id: int):
 # USER SEARCH FOR SHARING
 # ===============================
 
-def search_users_for_sharing(db: Session, search_term: str, exclude_user_ids: Optional[List[int]] = None, limit: int = 20):
-    """Search users by name or email for document sharing"""
-    from app.users.models import User
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_users_for_sharing(db: Session, search_term: str, exclude_user_ids: Optional[List[int]] = None, limit: int = 20, exclude_document_id: Optional[int] = None):
+    """
+    Typeahead search of active users by name or email for document sharing.
+    Prefix matches rank first; all exclusions are applied in SQL.
+    """
+    from sqlalchemy import case, exists, func, select
+    from app.users.models import User, build_search_name
+    from app.users.search import trigram_enabled
     
     if exclude_user_ids is None:
         exclude_user_ids = []
     
-    query = db.query(User).filter(
-        and_(
-            User.is_active == True,
-            User.id.notin_(exclude_user_ids),
-            or_(
-                User.full_name.ilike(f"%{search_term}%"),
-                User.email.ilike(f"%{search_term}%")
-            )
-        )
+    term = _escape_like(build_search_name(search_term, ""))
+    if not term:
+        return []
+    prefix = f"{term}%"
+    word_prefix = f"% {term}%"
+    email = func.lower(User.email)
+    
+    name_matches = [
+        User.search_name.like(prefix, escape="\\"),
+        email.like(prefix, escape="\\")
+    ]
+    if trigram_enabled():
+        # Substring matches are served by the pg_trgm GIN indexes
+        name_matches.append(User.search_name.like(f"%{term}%", escape="\\"))
+        name_matches.append(email.like(f"%{term}%", escape="\\"))
+    else:
+        name_matches.append(User.search_name.like(word_prefix, escape="\\"))
+    
+    filters = [User.is_active == True, or_(*name_matches)]
+    if exclude_user_ids:
+        filters.append(User.id.notin_(exclude_user_ids))
+    if exclude_document_id is not None:
+        # Skip users who already have access and the uploader
+        filters.append(~exists().where(
+            models.DocumentAccess.document_id == exclude_document_id,
+            models.DocumentAccess.user_id == User.id
+        ))
+        uploader_id = select(models.Document.uploaded_by).where(
+            models.Document.id == exclude_document_id
+        ).scalar_subquery()
+        filters.append(User.id != func.coalesce(uploader_id, -1))
+    
+    rank = case(
+        (User.search_name.like(prefix, escape="\\"), 0),
+        (User.search_name.like(word_prefix, escape="\\"), 1),
+        (email.like(prefix, escape="\\"), 2),
+        else_=3
     )
     
-    return query.limit(limit).all()
+    return db.query(User).filter(and_(*filters)).order_by(
+        rank, func.length(User.search_name), User.search_name
+    ).limit(limit).all()
 
 def get_document_permissions_summary(db: Session, document_id: int, user_id: int):
     """Get summary of document permissions and recent activity"""
@@ -399,3 +455,203 @@ def get_document_permissions_summary(db: Session, document_id: int, user_id: int
         "access_levels": access_levels,
         "recent_shares": recent_shares
     }
+
+
+# ===============================
+# RESUMABLE UPLOAD SESSIONS
+# ===============================
+
+UPLOAD_SESSION_TTL = timedelta(hours=48)
+
+def create_upload_session(db: Session, session_data: schemas.UploadSessionCreate, created_by_id: int):
+    """Start a resumable upload"""
+    total_chunks = -(-session_data.total_size // session_data.chunk_size)  # Ceiling division
+    db_session = models.UploadSession(
+        id=secrets.token_urlsafe(24),
+        created_by_id=created_by_id,
+        status="active",
+        total_size=session_data.total_size,
+        chunk_size=session_data.chunk_size,
+        total_chunks=total_chunks,
+        name=session_data.name,
+        description=session_data.description,
+        file_type=session_data.file_type,
+        document_type=session_data.document_type,
+        project_id=session_data.project_id,
+        component_id=session_data.component_id,
+        task_id=session_data.task_id,
+        is_public=session_data.is_public,
+        expires_at=datetime.now(timezone.utc) + UPLOAD_SESSION_TTL
+    )
+    db.add(db_session)
+    db.commit()
+    db.refresh(db_session)
+    return db_session
+
+def get_upload_session(db: Session, session_id: str):
+    return db.query(models.UploadSession).filter(models.UploadSession.id == session_id).first()
+
+def upload_session_expired(upload_session) -> bool:
+    """Whether the session is past its TTL (naive timestamps are UTC)"""
+    expires_at = upload_session.expires_at
+    if expires_at is None:
+        return False
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at < datetime.now(timezone.utc)
+
+def purge_expired_upload_sessions(db: Session) -> int:
+    """Delete expired upload sessions with their chunk rows and staged parts"""
+    now = datetime.now(timezone.utc)
+    expired = db.query(models.UploadSession.id).filter(
+        models.UploadSession.expires_at < now,
+        # A session being assembled is left alone unless it has been stuck for a whole TTL
+        or_(models.UploadSession.status != "finalizing", models.UploadSession.expires_at < now - UPLOAD_SESSION_TTL)
+    ).all()
+    session_ids = [session_id for (session_id,) in expired]
+    if not session_ids:
+        return 0
+    db.query(models.UploadChunk).filter(models.UploadChunk.session_id.in_(session_ids)).delete(synchronize_session=False)
+    db.query(models.UploadSession).filter(models.UploadSession.id.in_(session_ids)).delete(synchronize_session=False)
+    db.commit()
+    for session_id in session_ids:
+        uploads.discard_session_files(session_id)
+    return len(session_ids)
+
+def get_upload_chunks(db: Session, session_id: str):
+    return db.query(models.UploadChunk).filter(
+        models.UploadChunk.session_id == session_id
+    ).order_by(models.UploadChunk.chunk_number).all()
+
+def record_upload_chunk(db: Session, session_id: str, chunk_number: int, size: int, checksum: str):
+    """Insert or replace a chunk record (chunks may be re-sent or arrive concurrently)"""
+    values = {"size": size, "checksum": checksum}
+    updated = db.query(models.UploadChunk).filter(
+        models.UploadChunk.session_id == session_id,
+        models.UploadChunk.chunk_number == chunk_number
+    ).update(values)
+    if not updated:
+        db.add(models.UploadChunk(session_id=session_id, chunk_number=chunk_number, **values))
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Another worker inserted the same chunk first; last write wins
+            db.rollback()
+            db.query(models.UploadChunk).filter(
+                models.UploadChunk.session_id == session_id,
+                models.UploadChunk.chunk_number == chunk_number
+            ).update(values)
+    db.commit()
+
+def build_upload_session_status(db: Session, upload_session) -> dict:
+    """Session state with received offsets and missing chunk numbers"""
+    chunks = get_upload_chunks(db, upload_session.id)
+    received = {chunk.chunk_number for chunk in chunks}
+    return {
+        "id": upload_session.id,
+        "status": upload_session.status,
+        "name": upload_session.name,
+        "total_size": upload_session.total_size,
+        "chunk_size": upload_session.chunk_size,
+        "total_chunks": upload_session.total_chunks,
+        "received_chunks": [
+            {
+                "chunk_number": chunk.chunk_number,
+                "offset": chunk.chunk_number * upload_session.chunk_size,
+                "size": chunk.size,
+                "checksum": chunk.checksum
+            }
+            for chunk in chunks
+        ],
+        "received_bytes": sum(chunk.size for chunk in chunks),
+        "missing_chunks": [n for n in range(upload_session.total_chunks) if n not in received],
+        "document_id": upload_session.document_id,
+        "expires_at": upload_session.expires_at
+    }
+
+def claim_upload_session_for_finalize(db: Session, session_id: str) -> bool:
+    """Atomically move a session from active to finalizing so only one worker assembles it"""
+    claimed = db.query(models.UploadSession).filter(
+        models.UploadSession.id == session_id,
+        models.UploadSession.status == "active"
+    ).update({models.UploadSession.status: "finalizing"}, synchronize_session=False)
+    db.commit()
+    return claimed == 1
+
+def set_upload_session_status(db: Session, session_id: str, status: str, document_id: Optional[int] = None):
+    values = {models.UploadSession.status: status}
+    if document_id is not None:
+        values[models.UploadSession.document_id] = document_id
+    db.query(models.UploadSession).filter(models.UploadSession.id == session_id).update(values, synchronize_session=False)
+    db.commit()
+
+def create_document_from_upload(db: Session, upload_session, storage_path: str, file_size: int):
+    """Create the Document row for a finalized upload"""
+    document_type = upload_session.document_type
+    if not document_type:
+        extension = os.path.splitext(upload_session.name)[1].lstrip(".").lower()
+        document_type = extension or (mimetypes.guess_extension(upload_session.file_type or "") or "").lstrip(".") or "file"
+
+    document = schemas.DocumentCreate(
+        name=upload_session.name,
+        description=upload_session.description,
+        storage_path=storage_path,
+        file_type=upload_session.file_type or "application/octet-stream",
+        file_size=file_size,
+        document_type=document_type,
+        project_id=upload_session.project_id,
+        component_id=upload_session.component_id,
+        task_id=upload_session.task_id,
+        is_public=upload_session.is_public
+    )
+    return create_document(db=db, document=document, uploaded_by_id=upload_session.created_by_id)
+
+# ===============================
+# DOCUMENT PREVIEWS
+# ===============================
+
+PREVIEW_RESULT_FIELDS = (
+    "status", "error", "thumbnail_path", "preview_path", "page_count", "width", "height",
+    "captured_at", "queued_at", "queue_wait_ms", "duration_ms"
+)
+
+def get_document_preview(db: Session, document_id: int):
+    return db.query(models.DocumentPreview).filter(models.DocumentPreview.document_id == document_id).first()
+
+def save_document_preview_result(db: Session, document_id: int, result: dict):
+    """Create or update the preview row for a document from a pipeline result"""
+    values = {key: result[key] for key in PREVIEW_RESULT_FIELDS if key in result}
+    if isinstance(values.get("captured_at"), str):
+        values["captured_at"] = datetime.fromisoformat(values["captured_at"])
+    if values.get("status") in ("completed", "skipped", "failed"):
+        values["completed_at"] = datetime.now()
+
+    preview = get_document_preview(db, document_id)
+    if preview is None:
+        preview = models.DocumentPreview(document_id=document_id)
+        db.add(preview)
+    for key, value in values.items():
+        setattr(preview, key, value)
+    if result.get("text"):
+        search.index_document_text(db, document_id, result["text"])
+    db.commit()
+    return preview
+
+# ===============================
+# DOCUMENT SEARCH
+# ===============================
+
+def search_documents(db: Session, query: str, user_id: int, skip: int = 0, limit: int = 20):
+    """Full-text search over documents the user can view, best match first"""
+    hits = search.search_documents(db, query, user_id, skip, limit)
+    if not hits:
+        return []
+    documents = db.query(models.Document).options(
+        joinedload(models.Document.uploader),
+        joinedload(models.Document.project),
+        joinedload(models.Document.component),
+        joinedload(models.Document.task)
+    ).filter(models.Document.id.in_([document_id for document_id, _ in hits])).all()
+    by_id = {document.id: document for document in documents}
+    return [(by_id[document_id], rank) for document_id, rank in hits if document_id in by_id]
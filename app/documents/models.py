@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Text, Boolean, UniqueConstraint, text
+from sqlalchemy.orm import relationship, synonym
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -11,27 +11,60 @@ class Document(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     doc_type = Column(String, nullable=False)  # pdf, doc, docx, xlsx, jpg, png, etc.
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
-    component_id = Column(Integer, ForeignKey("project_components.id"), nullable=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"), nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    component_id = Column(Integer, ForeignKey("project_components.id", ondelete="SET NULL"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
     uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # File storage details
+    storage_path = Column(String, nullable=True)  # local/<path>, gs://bucket/key
+    file_type = Column(String(255), nullable=True)  # MIME type
+    file_size = Column(Integer, nullable=True)  # Size in bytes
+    is_public = Column(Boolean, default=False)
+
+    # Names used by the crud/schema layer
+    uploaded_by_id = synonym("uploaded_by")
+    document_type = synonym("doc_type")
+
     # Relationships
     project = relationship("Project", back_populates="documents")
     component = relationship("ProjectComponent", back_populates="documents")
     task = relationship("Task", back_populates="documents")
     uploader = relationship("User", back_populates="uploaded_documents")
     access_permissions = relationship("DocumentAccess", back_populates="document", cascade="all, delete-orphan")
+    preview = relationship("DocumentPreview", back_populates="document", uselist=False, cascade="all, delete-orphan")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+# File storage columns added to documents after the table was first created (name -> PostgreSQL, SQLite type)
+DOCUMENT_STORAGE_COLUMNS = {
+    "storage_path": ("VARCHAR", "VARCHAR"),
+    "file_type": ("VARCHAR(255)", "VARCHAR(255)"),
+    "file_size": ("INTEGER", "INTEGER"),
+    "is_public": ("BOOLEAN DEFAULT FALSE", "BOOLEAN DEFAULT 0"),
+}
+
+def ensure_document_storage_columns(engine):
+    """Add the file storage columns to a documents table created before them (create_all skips existing tables)"""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            for column, (postgres_type, _) in DOCUMENT_STORAGE_COLUMNS.items():
+                conn.execute(text(f"ALTER TABLE documents ADD COLUMN IF NOT EXISTS {column} {postgres_type}"))
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(documents)"))]
+            for column, (_, sqlite_type) in DOCUMENT_STORAGE_COLUMNS.items():
+                if column not in columns:
+                    conn.execute(text(f"ALTER TABLE documents ADD COLUMN {column} {sqlite_type}"))
+
 class DocumentAccess(Base):
     __tablename__ = "document_access"
 
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     access_level = Column(String(20), default="view")  # view, edit, admin
     granted_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -47,3 +80,85 @@ class DocumentAccess(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
+
+class UploadSession(Base):
+    """Resumable multipart upload; chunk state lives in the DB so any worker can accept any chunk"""
+    __tablename__ = "document_upload_sessions"
+
+    id = Column(String(64), primary_key=True)  # Random token, also used as staging directory name
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), default="active", nullable=False)  # active, finalizing, completed, aborted
+
+    # Target file
+    total_size = Column(BigInteger, nullable=False)
+    chunk_size = Column(Integer, nullable=False)
+    total_chunks = Column(Integer, nullable=False)
+
+    # Document metadata used on finalize
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    file_type = Column(String(255), nullable=True)
+    document_type = Column(String, nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    component_id = Column(Integer, ForeignKey("project_components.id", ondelete="SET NULL"), nullable=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="SET NULL"), nullable=True)
+    is_public = Column(Boolean, default=False)
+
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=True)  # Set once finalized
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Relationships
+    chunks = relationship("UploadChunk", back_populates="session", cascade="all, delete-orphan")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UploadChunk(Base):
+    __tablename__ = "document_upload_chunks"
+    __table_args__ = (
+        UniqueConstraint("session_id", "chunk_number", name="uq_upload_chunk_number"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(String(64), ForeignKey("document_upload_sessions.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_number = Column(Integer, nullable=False)  # 0-based; byte offset = chunk_number * chunk_size
+    size = Column(Integer, nullable=False)
+    checksum = Column(String(64), nullable=False)  # sha256 hex of the chunk bytes
+
+    # Relationships
+    session = relationship("UploadSession", back_populates="chunks")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class DocumentPreview(Base):
+    """Output of the background processing pipeline for a document"""
+    __tablename__ = "document_previews"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, unique=True)
+    status = Column(String(20), default="queued", nullable=False)  # queued, completed, skipped, failed
+    error = Column(Text, nullable=True)
+
+    # Generated files (storage paths)
+    thumbnail_path = Column(String, nullable=True)
+    preview_path = Column(String, nullable=True)
+
+    # Extracted metadata
+    page_count = Column(Integer, nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    captured_at = Column(DateTime(timezone=True), nullable=True)  # EXIF capture date for site photos
+
+    # Job timing
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    queue_wait_ms = Column(Integer, nullable=True)
+    duration_ms = Column(Integer, nullable=True)
+
+    # Relationships
+    document = relationship("Document", back_populates="preview")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
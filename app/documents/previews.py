@@ -0,0 +1,178 @@
+"""
+Preview and metadata extraction for uploaded documents
+
+Runs inside the document-processing process pool, so this module only imports
+the standard library, the storage helpers and optional imaging libraries -
+never the database layer.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+from .storage import get_storage_backend, get_storage_root, is_remote_path
+
+# Optional dependencies: previews are skipped for formats we cannot read
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on deployment
+    Image = None
+    ImageOps = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - depends on deployment
+    PdfReader = None
+
+THUMBNAIL_SIZE = (320, 320)
+MAX_TEXT_PAGES = 50  # Pages of PDF text extracted for the search index
+MAX_TEXT_CHARS = 200_000
+PREVIEW_WIDTH = 1024
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp", ".heic"}
+
+def preview_dir(document_id: int) -> str:
+    return os.path.join("previews", str(document_id))
+
+def _local_copy(storage_path: str) -> tuple[str, bool]:
+    """Return a local file path for the document, downloading remote files in chunks"""
+    backend = get_storage_backend(storage_path)
+    if not is_remote_path(storage_path):
+        return backend.resolve(storage_path), False
+    stored = backend.stat(storage_path)
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(storage_path)[1])
+    with os.fdopen(fd, "wb") as f:
+        for chunk in backend.iter_range(storage_path, 0, stored.size - 1):
+            f.write(chunk)
+    return temp_path, True
+
+def _parse_exif_datetime(value) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value).strip("\x00 "), "%Y:%m:%d %H:%M:%S").isoformat()
+    except ValueError:
+        return None
+
+def _save_thumbnail(image, target_path: str):
+    thumb = image.copy()
+    thumb.thumbnail(THUMBNAIL_SIZE)
+    if thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+    thumb.save(target_path, "JPEG", quality=80, optimize=True)
+
+def _process_image(path: str, output_dir: str, result: dict):
+    if Image is None:
+        result["status"] = "skipped"
+        result["error"] = "Pillow is not installed"
+        return
+    with Image.open(path) as image:
+        exif = image.getexif()
+        captured = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        result["captured_at"] = _parse_exif_datetime(captured)
+        image = ImageOps.exif_transpose(image)  # Respect camera orientation for site photos
+        result["width"], result["height"] = image.size
+        result["page_count"] = getattr(image, "n_frames", 1)
+        _save_thumbnail(image, os.path.join(output_dir, "thumbnail.jpg"))
+        result["thumbnail_path"] = "thumbnail.jpg"
+
+def _render_pdf_first_page(path: str, output_dir: str) -> Optional[str]:
+    """Render page 1 with poppler's pdftoppm, if installed"""
+    if shutil.which("pdftoppm") is None:
+        return None
+    target_base = os.path.join(output_dir, "preview")
+    subprocess.run(
+        ["pdftoppm", "-f", "1", "-l", "1", "-png", "-singlefile", "-scale-to", str(PREVIEW_WIDTH), path, target_base],
+        check=True, capture_output=True, timeout=60
+    )
+    return "preview.png" if os.path.exists(target_base + ".png") else None
+
+def _extract_pdf_text(reader) -> str:
+    parts, length = [], 0
+    for page in reader.pages[:MAX_TEXT_PAGES]:
+        try:
+            page_text = page.extract_text() or ""
+        except Exception:
+            continue  # Damaged or image-only page
+        parts.append(page_text)
+        length += len(page_text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)[:MAX_TEXT_CHARS]
+
+def _process_pdf(path: str, output_dir: str, result: dict):
+    if PdfReader is not None:
+        reader = PdfReader(path)
+        result["page_count"] = len(reader.pages)
+        if reader.pages:
+            box = reader.pages[0].mediabox
+            result["width"], result["height"] = int(float(box.width)), int(float(box.height))
+        result["text"] = _extract_pdf_text(reader)
+
+    preview_name = _render_pdf_first_page(path, output_dir)
+    if preview_name:
+        result["preview_path"] = preview_name
+        if Image is not None:
+            with Image.open(os.path.join(output_dir, preview_name)) as image:
+                _save_thumbnail(image, os.path.join(output_dir, "thumbnail.jpg"))
+            result["thumbnail_path"] = "thumbnail.jpg"
+
+    if PdfReader is None and not preview_name:
+        result["status"] = "skipped"
+        result["error"] = "No PDF tooling available (install pypdf and/or poppler-utils)"
+
+def process_document_file(document_id: int, storage_path: str, file_type: Optional[str], submitted_at: float) -> dict:
+    """
+    Generate thumbnail/preview and extract metadata for one document.
+    Entry point executed in a worker process; returns a plain dict.
+    """
+    started_at = time.time()
+    result = {
+        "document_id": document_id,
+        "status": "completed",
+        "error": None,
+        "thumbnail_path": None,
+        "preview_path": None,
+        "page_count": None,
+        "width": None,
+        "height": None,
+        "captured_at": None,
+        "queue_wait_ms": int((started_at - submitted_at) * 1000),
+    }
+
+    relative_output = preview_dir(document_id)
+    output_dir = os.path.join(get_storage_root(), relative_output)
+    local_path, is_temp = None, False
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        local_path, is_temp = _local_copy(storage_path)
+        extension = os.path.splitext(storage_path)[1].lower()
+        file_type = (file_type or "").lower()
+
+        if file_type == "application/pdf" or extension == ".pdf":
+            _process_pdf(local_path, output_dir, result)
+        elif file_type.startswith("image/") or extension in IMAGE_EXTENSIONS:
+            _process_image(local_path, output_dir, result)
+        else:
+            result["status"] = "skipped"
+            result["error"] = "No preview available for this file type"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if is_temp and local_path:
+            os.remove(local_path)
+
+    # Store output locations as storage paths
+    for key in ("thumbnail_path", "preview_path"):
+        if result[key]:
+            result[key] = "local/" + os.path.join(relative_output, result[key]).replace(os.sep, "/")
+
+    result["duration_ms"] = int((time.time() - started_at) * 1000)
+    return result
@@ -0,0 +1,126 @@
+"""
+Background document-processing pipeline
+
+After an upload completes the document is queued here; the CPU-heavy work
+(thumbnails, PDF rendering, EXIF/page metadata) runs in a process pool so the
+request workers stay responsive. Results are written to `document_previews`.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Optional
+
+from app.database import SessionLocal
+from . import crud
+from .previews import process_document_file
+
+logger = logging.getLogger(__name__)
+
+TIMING_WINDOW = 200  # Number of recent jobs kept for timing statistics
+
+class DocumentProcessor:
+    """Owns the process pool and tracks queue depth and per-job timing"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("DOCUMENT_PROCESSING_WORKERS", "2"))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._recent = deque(maxlen=TIMING_WINDOW)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: children must not inherit the parent's DB connections or threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, document_id: int, storage_path: str, file_type: Optional[str]):
+        """Queue a document for processing"""
+        future = self._get_executor().submit(process_document_file, document_id, storage_path, file_type, time.time())
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(lambda f: self._on_done(document_id, f))
+        return future
+
+    def _on_done(self, document_id: int, future):
+        try:
+            result = future.result()
+        except BrokenProcessPool as e:
+            # A child died (e.g. OOM on a huge image); start a fresh pool for the next job
+            with self._lock:
+                if self._executor is not None and getattr(self._executor, "_broken", False):
+                    self._executor = None
+            result = {"document_id": document_id, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+        except Exception as e:  # Job raised or pool was shut down
+            result = {"document_id": document_id, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+        with self._lock:
+            self._pending -= 1
+            if result.get("status") == "failed":
+                self._failed += 1
+            else:
+                self._completed += 1
+            if "duration_ms" in result:
+                self._recent.append((result["duration_ms"], result.get("queue_wait_ms", 0)))
+
+        db = SessionLocal()
+        try:
+            crud.save_document_preview_result(db, document_id, result)
+        except Exception:
+            logger.exception("Failed to store preview result for document %s", document_id)
+        finally:
+            db.close()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            durations = sorted(d for d, _ in self._recent)
+            waits = sorted(w for _, w in self._recent)
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._pending,
+                "completed": self._completed,
+                "failed": self._failed,
+                "recent_jobs": len(durations),
+                "avg_duration_ms": sum(durations) / len(durations) if durations else None,
+                "p95_duration_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None,
+                "max_duration_ms": durations[-1] if durations else None,
+                "avg_queue_wait_ms": sum(waits) / len(waits) if waits else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+processor = DocumentProcessor()
+
+def enqueue_document_processing(db, document):
+    """Mark a document's preview as queued and hand it to the process pool"""
+    storage_path = getattr(document, 'storage_path', None)
+    if not storage_path:
+        return None
+    document_id = getattr(document, 'id')
+    crud.save_document_preview_result(db, document_id, {
+        "status": "queued",
+        "error": None,
+        "queued_at": datetime.now()
+    })
+    try:
+        return processor.submit(document_id, storage_path, getattr(document, 'file_type', None))
+    except Exception:
+        logger.exception("Could not queue document %s for processing", document_id)
+        crud.save_document_preview_result(db, document_id, {"status": "failed", "error": "Could not queue for processing"})
+        return None
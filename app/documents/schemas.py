@@ -13,7 +13,7 @@ class DocumentBase(BaseModel):
     is_public: bool = Field(False, description="Whether document is publicly accessible to all users")
 
 class DocumentCreate(DocumentBase):
-    storage_path: str = Field(..., description="Storage path in cloud")
+    storage_path: str = Field(..., description="Storage path, generated by the server")
     file_type: str = Field(..., description="MIME type of the file")
     file_size: Optional[int] = Field(None, description="File size in bytes")
     project_id: Optional[int] = Field(None, description="Associated project ID")
@@ -28,8 +28,8 @@ class DocumentUpdate(BaseModel):
 
 class DocumentResponse(DocumentBase):
     id: int
-    storage_path: str
-    file_type: str
+    storage_path: Optional[str] = None  # NULL for documents created before files were stored
+    file_type: Optional[str] = None
     file_size: Optional[int]
     project_id: Optional[int]
     component_id: Optional[int]
@@ -162,3 +162,91 @@ class DocumentPermissionsSummary(BaseModel):
     total_users_with_access: int
     access_levels: dict = Field(description="Count of users by access level")
     recent_shares: List[DocumentShareResponse] = Field(description="Recent sharing activity")
+
+# ===============================
+# RESUMABLE UPLOAD SCHEMAS
+# ===============================
+
+class UploadSessionCreate(BaseModel):
+    name: str = Field(..., description="Document name (also used as file name)")
+    description: Optional[str] = None
+    file_type: str = Field("application/octet-stream", description="MIME type of the file")
+    total_size: int = Field(..., gt=0, description="Total file size in bytes")
+    chunk_size: int = Field(8 * 1024 * 1024, ge=256 * 1024, le=64 * 1024 * 1024, description="Chunk size in bytes")
+    document_type: Optional[str] = None
+    project_id: Optional[int] = None
+    component_id: Optional[int] = None
+    task_id: Optional[int] = None
+    is_public: bool = False
+
+class UploadChunkInfo(BaseModel):
+    chunk_number: int
+    offset: int
+    size: int
+    checksum: str
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    status: str
+    name: str
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[UploadChunkInfo] = []
+    received_bytes: int = 0
+    missing_chunks: List[int] = []
+    document_id: Optional[int] = None
+    expires_at: datetime
+
+# ===============================
+# DOCUMENT PREVIEW SCHEMAS
+# ===============================
+
+class DocumentPreviewResponse(BaseModel):
+    document_id: int
+    status: str
+    error: Optional[str] = None
+    has_thumbnail: bool = False
+    has_preview: bool = False
+    page_count: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    captured_at: Optional[datetime] = None
+    queued_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+    queue_wait_ms: Optional[int] = None
+    duration_ms: Optional[int] = None
+
+class DocumentProcessingStats(BaseModel):
+    workers: int
+    queue_depth: int
+    completed: int
+    failed: int
+    recent_jobs: int
+    avg_duration_ms: Optional[float] = None
+    p95_duration_ms: Optional[int] = None
+    max_duration_ms: Optional[int] = None
+    avg_queue_wait_ms: Optional[float] = None
+
+# ===============================
+# DOCUMENT SEARCH SCHEMAS
+# ===============================
+
+class DocumentSearchHit(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    document_type: Optional[str] = None
+    file_type: Optional[str] = None
+    project_id: Optional[int] = None
+    component_id: Optional[int] = None
+    task_id: Optional[int] = None
+    uploaded_by_id: int
+    created_at: datetime
+    rank: float
+
+class DocumentSearchResponse(BaseModel):
+    query: str
+    results: List[DocumentSearchHit]
+    skip: int
+    limit: int
@@ -0,0 +1,166 @@
+"""
+Full-text search index for documents
+
+PostgreSQL: `document_search` table with a stored, weighted tsvector column and
+a GIN index. SQLite (local development): an FTS5 virtual table keyed by the
+document id. The index is kept up to date from the crud layer in the same
+transaction as the document write, and visibility rules are applied inside
+the search query itself.
+"""
+import re
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+MAX_INDEXED_TEXT = 200_000  # Characters of extracted text kept per document
+
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS document_search (
+        document_id INTEGER PRIMARY KEY REFERENCES documents(id) ON DELETE CASCADE,
+        name TEXT NOT NULL DEFAULT '',
+        description TEXT NOT NULL DEFAULT '',
+        doc_type TEXT NOT NULL DEFAULT '',
+        content TEXT NOT NULL DEFAULT '',
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', name), 'A') ||
+            setweight(to_tsvector('simple', doc_type), 'B') ||
+            setweight(to_tsvector('english', description), 'C') ||
+            setweight(to_tsvector('english', content), 'D')
+        ) STORED
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_search_vector ON document_search USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5(
+        name, description, doc_type, content, tokenize = 'porter unicode61'
+    )
+    """,
+]
+
+# Visibility rule shared with crud.can_user_view_document, expressed in SQL
+VISIBILITY_SQL = """
+    (d.uploaded_by = :user_id
+     OR d.is_public = :true_value
+     OR EXISTS (SELECT 1 FROM document_access a WHERE a.document_id = d.id AND a.user_id = :user_id))
+"""
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+def ensure_search_index(engine):
+    """Create the search table/index if missing and index any documents not yet in it"""
+    dialect = _dialect(engine)
+    if dialect not in ("postgresql", "sqlite"):
+        return
+    with engine.begin() as conn:
+        for statement in (POSTGRES_DDL if dialect == "postgresql" else SQLITE_DDL):
+            conn.execute(text(statement))
+        if dialect == "postgresql":
+            conn.execute(text("""
+                INSERT INTO document_search (document_id, name, description, doc_type)
+                SELECT d.id, coalesce(d.name, ''), coalesce(d.description, ''), coalesce(d.doc_type, '')
+                FROM documents d
+                WHERE NOT EXISTS (SELECT 1 FROM document_search s WHERE s.document_id = d.id)
+            """))
+        else:
+            conn.execute(text("""
+                INSERT INTO document_search (rowid, name, description, doc_type, content)
+                SELECT d.id, coalesce(d.name, ''), coalesce(d.description, ''), coalesce(d.doc_type, ''), ''
+                FROM documents d
+                WHERE d.id NOT IN (SELECT rowid FROM document_search)
+            """))
+
+def index_document(db: Session, document):
+    """Insert or refresh a document's searchable fields (extracted text is kept)"""
+    params = {
+        "document_id": document.id,
+        "name": document.name or "",
+        "description": document.description or "",
+        "doc_type": document.doc_type or "",
+    }
+    dialect = _dialect(db.get_bind())
+    if dialect == "postgresql":
+        db.execute(text("""
+            INSERT INTO document_search (document_id, name, description, doc_type)
+            VALUES (:document_id, :name, :description, :doc_type)
+            ON CONFLICT (document_id) DO UPDATE
+            SET name = EXCLUDED.name, description = EXCLUDED.description, doc_type = EXCLUDED.doc_type
+        """), params)
+    elif dialect == "sqlite":
+        updated = db.execute(text("""
+            UPDATE document_search SET name = :name, description = :description, doc_type = :doc_type
+            WHERE rowid = :document_id
+        """), params).rowcount
+        if not updated:
+            db.execute(text("""
+                INSERT INTO document_search (rowid, name, description, doc_type, content)
+                VALUES (:document_id, :name, :description, :doc_type, '')
+            """), params)
+
+def index_document_text(db: Session, document_id: int, content: str):
+    """Store extracted text (e.g. from a PDF) for an already indexed document"""
+    params = {"document_id": document_id, "content": (content or "")[:MAX_INDEXED_TEXT]}
+    if _dialect(db.get_bind()) == "postgresql":
+        db.execute(text("UPDATE document_search SET content = :content WHERE document_id = :document_id"), params)
+    elif _dialect(db.get_bind()) == "sqlite":
+        db.execute(text("UPDATE document_search SET content = :content WHERE rowid = :document_id"), params)
+
+def remove_document(db: Session, document_id: int):
+    """Drop a document from the index (PostgreSQL also cascades on delete)"""
+    if _dialect(db.get_bind()) == "postgresql":
+        db.execute(text("DELETE FROM document_search WHERE document_id = :document_id"), {"document_id": document_id})
+    elif _dialect(db.get_bind()) == "sqlite":
+        db.execute(text("DELETE FROM document_search WHERE rowid = :document_id"), {"document_id": document_id})
+
+def _fts5_query(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 query: all terms required, last term as prefix"""
+    terms = re.findall(r"\w+", query, flags=re.UNICODE)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def search_documents(db: Session, query: str, user_id: int, skip: int = 0, limit: int = 20) -> List[tuple[int, float]]:
+    """
+    Return [(document_id, rank)] for documents matching the query that the user
+    may view, best match first. Ranking and visibility are both done in SQL.
+    """
+    dialect = _dialect(db.get_bind())
+    params = {"user_id": user_id, "true_value": True, "limit": limit, "skip": skip}
+
+    if dialect == "postgresql":
+        params["query"] = query
+        sql = f"""
+            SELECT d.id, ts_rank_cd(s.search_vector, q) AS rank
+            FROM document_search s
+            JOIN documents d ON d.id = s.document_id,
+                 websearch_to_tsquery('english', :query) q
+            WHERE s.search_vector @@ q AND {VISIBILITY_SQL}
+            ORDER BY rank DESC, d.id DESC
+            LIMIT :limit OFFSET :skip
+        """
+    elif dialect == "sqlite":
+        fts_query = _fts5_query(query)
+        if fts_query is None:
+            return []
+        params["query"] = fts_query
+        # bm25() is lower-is-better; weights mirror the PostgreSQL A/B/C/D ordering
+        sql = f"""
+            SELECT d.id, -bm25(document_search, 10.0, 2.0, 4.0, 1.0) AS rank
+            FROM document_search
+            JOIN documents d ON d.id = document_search.rowid
+            WHERE document_search MATCH :query AND {VISIBILITY_SQL}
+            ORDER BY rank DESC, d.id DESC
+            LIMIT :limit OFFSET :skip
+        """
+    else:
+        return []
+
+    statement = text(sql).execution_options(replica_safe=True)  # Read-only; may use a replica on GET
+    return [(row[0], float(row[1])) for row in db.execute(statement, params)]
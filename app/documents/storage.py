@@ -0,0 +1,162 @@
+"""
+Document storage backends
+
+Documents keep a `storage_path` that tells us where the file bytes live:
+  - "gs://bucket/key" or "gcs/bucket/key"  -> Google Cloud Storage
+  - anything else                          -> local filesystem under DOCUMENT_STORAGE_ROOT
+
+Backends never return whole files; callers get metadata via `stat()` and
+read bytes either through a real file (local) or a chunk iterator (remote).
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+# Optional dependency: only needed when documents live in Cloud Storage
+try:
+    from google.api_core.exceptions import NotFound as GCSNotFound
+    from google.cloud import storage as gcs
+except ImportError:  # pragma: no cover - depends on deployment
+    gcs = None
+    GCSNotFound = None
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+def get_storage_root() -> str:
+    """Root directory for locally stored documents"""
+    return os.path.abspath(os.getenv("DOCUMENT_STORAGE_ROOT", "storage/documents"))
+
+@dataclass
+class StoredObject:
+    """Metadata about a stored file, enough to answer conditional/range requests"""
+    size: int
+    etag: str
+    last_modified: Optional[datetime] = None
+    content_type: Optional[str] = None
+
+class StorageError(Exception):
+    """Raised when a storage path cannot be resolved or read"""
+    pass
+
+# ===============================
+# LOCAL FILESYSTEM BACKEND
+# ===============================
+
+class LocalStorageBackend:
+    """Files on a local (or mounted) disk; supports zero-copy sendfile"""
+
+    supports_sendfile = True
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_storage_root()
+
+    def resolve(self, storage_path: str) -> str:
+        """Map a storage path to an absolute file path inside the storage root"""
+        relative = storage_path[len("local/"):] if storage_path.startswith("local/") else storage_path
+        full_path = os.path.abspath(os.path.join(self.root, relative.lstrip("/")))
+        # Never serve files outside the storage root
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            raise StorageError("Storage path escapes storage root")
+        return full_path
+
+    def stat(self, storage_path: str) -> StoredObject:
+        try:
+            st = os.stat(self.resolve(storage_path))
+        except FileNotFoundError:
+            raise StorageError("File not found in storage")
+        return StoredObject(
+            size=st.st_size,
+            etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+            last_modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+        )
+
+    def iter_range(self, storage_path: str, start: int, end: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield bytes [start, end] inclusive in bounded chunks"""
+        with open(self.resolve(storage_path), "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+# ===============================
+# GOOGLE CLOUD STORAGE BACKEND
+# ===============================
+
+class GCSStorageBackend:
+    """Files in a Cloud Storage bucket; streamed with ranged reads"""
+
+    supports_sendfile = False
+
+    def __init__(self):
+        if gcs is None:
+            raise StorageError("google-cloud-storage is not installed")
+        self.client = gcs.Client()
+
+    @staticmethod
+    def split(storage_path: str) -> tuple[str, str]:
+        """Split "gs://bucket/key" or "gcs/bucket/key" into (bucket, key)"""
+        path = storage_path
+        for prefix in ("gs://", "gcs/"):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        bucket, _, key = path.partition("/")
+        if not bucket or not key:
+            raise StorageError("Invalid cloud storage path")
+        return bucket, key
+
+    def _blob(self, storage_path: str):
+        bucket, key = self.split(storage_path)
+        return self.client.bucket(bucket).blob(key)
+
+    def stat(self, storage_path: str) -> StoredObject:
+        blob = self._blob(storage_path)
+        try:
+            blob.reload()  # Metadata only, no content download
+        except GCSNotFound:
+            raise StorageError("File not found in storage")
+        if blob.size is None:
+            raise StorageError("File not found in storage")
+        return StoredObject(
+            size=blob.size,
+            etag=f'"{blob.generation}"',
+            last_modified=blob.updated,
+            content_type=blob.content_type,
+        )
+
+    def iter_range(self, storage_path: str, start: int, end: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield bytes [start, end] inclusive using one ranged GET per chunk"""
+        blob = self._blob(storage_path)
+        position = start
+        while position <= end:
+            chunk_end = min(position + chunk_size - 1, end)
+            try:
+                chunk = blob.download_as_bytes(start=position, end=chunk_end)
+            except GCSNotFound:
+                raise StorageError("File not found in storage")  # Deleted after stat()
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+
+def is_remote_path(storage_path: str) -> bool:
+    return storage_path.startswith("gs://") or storage_path.startswith("gcs/")
+
+_local_backend: Optional[LocalStorageBackend] = None
+_gcs_backend: Optional[GCSStorageBackend] = None
+
+def get_storage_backend(storage_path: str):
+    """Get the backend responsible for a storage path (backends are reused)"""
+    global _local_backend, _gcs_backend
+    if is_remote_path(storage_path):
+        if _gcs_backend is None:
+            _gcs_backend = GCSStorageBackend()
+        return _gcs_backend
+    if _local_backend is None:
+        _local_backend = LocalStorageBackend()
+    return _local_backend
@@ -0,0 +1,178 @@
+"""
+HTTP helpers for serving document content
+
+Handles `Range`, `If-Range` and `If-None-Match` so interrupted downloads can
+resume, and sends local files with zero-copy `sendfile` when the ASGI server
+supports it (falls back to bounded chunked reads otherwise).
+"""
+import os
+from email.utils import format_datetime
+from typing import Optional
+
+import anyio
+from starlette.responses import Response, StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .storage import DEFAULT_CHUNK_SIZE, StoredObject
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+class RangeNotSatisfiable(Exception):
+    """Requested range lies outside the file"""
+    pass
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) tuple.
+    Returns None when the whole file should be sent (no header, unsupported
+    unit or multiple ranges - servers may ignore Range in those cases).
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            # Suffix range: last N bytes
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match/If-Range header against an ETag"""
+    if not header_value:
+        return False
+    if header_value.strip() == "*":
+        return True
+    candidates = [value.strip().removeprefix("W/") for value in header_value.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+def content_headers(stored: StoredObject, filename: Optional[str] = None) -> dict:
+    """Headers shared by full, partial and not-modified responses"""
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": stored.etag,
+        "cache-control": "private, no-cache",
+    }
+    if stored.last_modified:
+        headers["last-modified"] = format_datetime(stored.last_modified, usegmt=True)
+    if filename:
+        safe_name = filename.replace('"', "")
+        headers["content-disposition"] = f'inline; filename="{safe_name}"'
+    return headers
+
+class RangeFileResponse(Response):
+    """
+    Send an inclusive byte range of a local file.
+    Uses the ASGI zero-copy extension when available, else reads in fixed chunks
+    in a worker thread so no more than one chunk is ever held in memory.
+    """
+
+    chunk_size = DEFAULT_CHUNK_SIZE
+
+    def __init__(self, path: str, start: int, end: int, status_code: int = 200,
+                 headers: Optional[dict] = None, media_type: Optional[str] = None):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        count = self.end - self.start + 1
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            fd = await anyio.to_thread.run_sync(os.open, self.path, os.O_RDONLY)
+            try:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": fd,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+            finally:
+                os.close(fd)
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # File shrank while sending; close the body so the client can retry
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def build_content_response(backend, storage_path: str, stored: StoredObject, *,
+                           range_header: Optional[str] = None,
+                           if_range: Optional[str] = None,
+                           if_none_match: Optional[str] = None,
+                           media_type: Optional[str] = None,
+                           filename: Optional[str] = None) -> Response:
+    """Build a 200/206/304/416 response for a stored document"""
+    headers = content_headers(stored, filename)
+
+    if etag_matches(if_none_match, stored.etag):
+        return Response(status_code=304, headers=headers)
+
+    # If-Range: only honour Range when the client still has the current version
+    if if_range and not etag_matches(if_range, stored.etag):
+        range_header = None
+
+    try:
+        byte_range = parse_range_header(range_header, stored.size)
+    except RangeNotSatisfiable:
+        headers["content-range"] = f"bytes */{stored.size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        start, end, status_code = 0, stored.size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["content-range"] = f"bytes {start}-{end}/{stored.size}"
+
+    media_type = media_type or stored.content_type or "application/octet-stream"
+
+    if stored.size == 0:
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    if backend.supports_sendfile:
+        return RangeFileResponse(
+            backend.resolve(storage_path), start, end,
+            status_code=status_code, headers=headers, media_type=media_type
+        )
+
+    headers["content-length"] = str(end - start + 1)
+    return StreamingResponse(
+        backend.iter_range(storage_path, start, end),
+        status_code=status_code, headers=headers, media_type=media_type
+    )
@@ -0,0 +1,148 @@
+"""
+Staging-area file operations for resumable uploads
+
+Chunks are written to `<staging>/<session_id>/<chunk_number>.part` on a disk
+shared by all workers. Writes go to a temp file first and are renamed into
+place, so a retried or parallel PUT of the same chunk never leaves a torn part.
+
+Finished files land under `uploads/YYYY/MM/<id>/<name>` in the storage root.
+Storage paths are always generated here, never taken from clients: a
+document's path is read with the server's own credentials.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, BinaryIO
+
+import anyio
+
+from .storage import get_storage_root
+
+COPY_BLOCK_SIZE = 8 * 1024 * 1024
+
+class ChunkSizeError(Exception):
+    """Uploaded chunk does not have the size the session expects"""
+    pass
+
+def get_staging_root() -> str:
+    """Directory for in-progress upload parts (same filesystem as storage for cheap moves)"""
+    return os.path.abspath(os.getenv("DOCUMENT_UPLOAD_STAGING", os.path.join(get_storage_root(), ".uploads")))
+
+def session_dir(session_id: str) -> str:
+    return os.path.join(get_staging_root(), session_id)
+
+def chunk_path(session_id: str, chunk_number: int) -> str:
+    return os.path.join(session_dir(session_id), f"{chunk_number:06d}.part")
+
+def expected_chunk_size(total_size: int, chunk_size: int, chunk_number: int) -> int:
+    """Every chunk is chunk_size bytes except the last, which holds the remainder"""
+    return min(chunk_size, total_size - chunk_number * chunk_size)
+
+async def write_chunk(session_id: str, chunk_number: int, body: AsyncIterator[bytes], expected_size: int) -> tuple[int, str]:
+    """
+    Stream a request body into the chunk's part file.
+    Returns (size, sha256 hex). Raises ChunkSizeError if the body size is wrong.
+    """
+    directory = session_dir(session_id)
+    await anyio.to_thread.run_sync(lambda: os.makedirs(directory, exist_ok=True))
+    final_path = chunk_path(session_id, chunk_number)
+    temp_path = f"{final_path}.{os.getpid()}.{id(body)}.tmp"
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with await anyio.open_file(temp_path, "wb") as f:
+            async for data in body:
+                size += len(data)
+                if size > expected_size:
+                    raise ChunkSizeError(f"Chunk {chunk_number} exceeds expected size of {expected_size} bytes")
+                digest.update(data)
+                await f.write(data)
+        if size != expected_size:
+            raise ChunkSizeError(f"Chunk {chunk_number} has {size} bytes, expected {expected_size}")
+        await anyio.to_thread.run_sync(os.replace, temp_path, final_path)
+    except BaseException:
+        await anyio.to_thread.run_sync(_remove_quietly, temp_path)
+        raise
+    return size, digest.hexdigest()
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _copy_into(src_fd: int, dst_fd: int, count: int):
+    """Copy count bytes between descriptors in the kernel where possible"""
+    remaining = count
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, min(remaining, 1 << 30))
+                if copied == 0:
+                    break
+                remaining -= copied
+            if remaining == 0:
+                return
+        except OSError:
+            pass  # e.g. cross-device or unsupported filesystem; fall through
+    if hasattr(os, "sendfile"):
+        offset = count - remaining
+        while remaining > 0:
+            sent = os.sendfile(dst_fd, src_fd, offset, min(remaining, 1 << 30))
+            if sent == 0:
+                break
+            offset += sent
+            remaining -= sent
+        if remaining == 0:
+            return
+    with os.fdopen(os.dup(src_fd), "rb") as src, os.fdopen(os.dup(dst_fd), "wb") as dst:
+        src.seek(count - remaining)
+        shutil.copyfileobj(src, dst, COPY_BLOCK_SIZE)
+
+def _target_path(directory_id: str, filename: str) -> tuple[str, str]:
+    """(absolute path, storage path) for a finished upload"""
+    safe_name = os.path.basename(filename) or "upload"
+    relative_dir = os.path.join("uploads", datetime.now().strftime("%Y/%m"), directory_id)
+    target_dir = os.path.join(get_storage_root(), relative_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    return os.path.join(target_dir, safe_name), "local/" + os.path.join(relative_dir, safe_name).replace(os.sep, "/")
+
+def assemble_upload(session_id: str, total_chunks: int, filename: str) -> tuple[str, int]:
+    """
+    Concatenate all parts into the document storage area without pulling them
+    through Python buffers. Returns (storage_path, size).
+    """
+    target_path, storage_path = _target_path(session_id, filename)
+    temp_path = f"{target_path}.assembling"
+
+    size = 0
+    with open(temp_path, "wb") as dst:
+        for chunk_number in range(total_chunks):
+            part = chunk_path(session_id, chunk_number)
+            part_size = os.path.getsize(part)
+            with open(part, "rb") as src:
+                _copy_into(src.fileno(), dst.fileno(), part_size)
+            size += part_size
+    os.replace(temp_path, target_path)
+    return storage_path, size
+
+def store_upload(source: BinaryIO, filename: str) -> tuple[str, int]:
+    """Save a single-request upload (blocking I/O). Returns (storage_path, size)."""
+    target_path, storage_path = _target_path(uuid.uuid4().hex, filename)
+    temp_path = f"{target_path}.writing"
+    with open(temp_path, "wb") as dst:
+        shutil.copyfileobj(source, dst, COPY_BLOCK_SIZE)
+        size = dst.tell()
+    os.replace(temp_path, target_path)
+    return storage_path, size
+
+def discard_stored_file(storage_path: str):
+    """Remove a file written by store_upload whose document was not created"""
+    _remove_quietly(os.path.join(get_storage_root(), storage_path[len("local/"):]))
+
+def discard_session_files(session_id: str):
+    """Remove a session's staging directory"""
+    shutil.rmtree(session_dir(session_id), ignore_errors=True)
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from . import crud, models, schemas
 from app.projects import crud as project_crud, models as project_models
 from app.users import models as user_models
+from app.bulkheads import bulkhead
 from app.database import get_db
+from app.sync.tracking import sync_window
 
 router = APIRouter()
 
@@ -71,12 +74,15 @@ def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
 @router.post("/purchase-orders/", response_model=schemas.PurchaseOrder)
 def create_purchase_order(po: schemas.PurchaseOrderCreate, db: Session = Depends(get_db)):
     """Create a new purchase order"""
-    return crud.create_purchase_order(db=db, po=po)
+    db_po = crud.create_purchase_order(db=db, po=po)
+    if db_po is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_po
 
 @router.get("/purchase-orders/", response_model=List[schemas.PurchaseOrder])
-def read_purchase_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_purchase_orders(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all purchase orders"""
-    pos = crud.get_purchase_orders(db, skip=skip, limit=limit)
+    pos = crud.get_purchase_orders(db, skip=skip, limit=limit, updated_since=updated_since)
     return pos
 
 @router.get("/purchase-orders/{po_id}", response_model=schemas.PurchaseOrder)
@@ -179,13 +185,17 @@ def delete_purchase_order_item(item_id: int, db: Session = Depends(get_db)):
 @router.post("/change-orders/", response_model=schemas.ChangeOrder)
 def create_change_order(co: schemas.ChangeOrderCreate, db: Session = Depends(get_db)):
     """Create a new change order"""
-    return crud.create_change_order(db=db, co=co)
+    db_co = crud.create_change_order(db=db, co=co)
+    if db_co is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_co
 
 
 @router.get("/change-orders/", response_model=List[schemas.ChangeOrderExtended])
-def read_change_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@bulkhead("reports")
+def read_change_orders(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all change orders with project/component/PM info"""
-    cos = crud.get_change_orders(db, skip=skip, limit=limit)
+    cos = crud.get_change_orders(db, skip=skip, limit=limit, updated_since=updated_since)
     results = []
     for co in cos:
         # Get related task
@@ -276,6 +286,7 @@ def read_change_order(co_id: int, db: Session = Depends(get_db)):
     )
 
 @router.get("/change-orders/by-status/{status}", response_model=List[schemas.ChangeOrderExtended])
+@bulkhead("reports")
 def read_change_orders_by_status(status: str, db: Session = Depends(get_db)):
     """Get change orders by status"""
     cos = crud.get_change_orders_by_status(db, status=status)
@@ -318,6 +329,7 @@ def read_change_orders_by_status(status: str, db: Session = Depends(get_db)):
     return results
 
 @router.get("/change-orders/by-task/{task_id}", response_model=List[schemas.ChangeOrderExtended])
+@bulkhead("reports")
 def read_change_orders_by_task(task_id: int, db: Session = Depends(get_db)):
     """Get change orders by task"""
     cos = crud.get_change_orders_by_task(db, task_id=task_id)
@@ -360,6 +372,7 @@ def read_change_orders_by_task(task_id: int, db: Session = Depends(get_db)):
     return results
 
 @router.get("/change-orders/by-component/{component_id}", response_model=List[schemas.ChangeOrderExtended])
+@bulkhead("reports")
 def read_change_orders_by_component(component_id: int, db: Session = Depends(get_db)):
     """Get change orders by component"""
     cos = crud.get_change_orders_by_component(db, component_id=component_id)
@@ -402,6 +415,7 @@ def read_change_orders_by_component(component_id: int, db: Session = Depends(get
     return results
 
 @router.get("/change-orders/by-creator/{creator_id}", response_model=List[schemas.ChangeOrderExtended])
+@bulkhead("reports")
 def read_change_orders_by_creator(creator_id: int, db: Session = Depends(get_db)):
     """Get change orders by creator (created_by)"""
     cos = crud.get_change_orders_by_creator(db, creator_id=creator_id)
@@ -444,6 +458,7 @@ def read_change_orders_by_creator(creator_id: int, db: Session = Depends(get_db)
     return results
 
 @router.get("/change-orders/by-approver/{approver_id}", response_model=List[schemas.ChangeOrderExtended])
+@bulkhead("reports")
 def read_change_orders_by_approver(approver_id: int, db: Session = Depends(get_db)):
     """Get change orders by approver (approved_by)"""
     cos = crud.get_change_orders_by_approver(db, approver_id=approver_id)
@@ -547,12 +562,15 @@ def delete_change_order_item(item_id: int, db: Session = Depends(get_db)):
 @router.post("/transactions/", response_model=schemas.Transaction)
 def create_transaction(transaction: schemas.TransactionCreate, db: Session = Depends(get_db)):
     """Create a new transaction"""
-    return crud.create_transaction(db=db, transaction=transaction)
+    db_transaction = crud.create_transaction(db=db, transaction=transaction)
+    if db_transaction is None:
+        raise HTTPException(status_code=404, detail="Project or task not found")
+    return db_transaction
 
 @router.get("/transactions/", response_model=List[schemas.Transaction])
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_transactions(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all transactions"""
-    transactions = crud.get_transactions(db, skip=skip, limit=limit)
+    transactions = crud.get_transactions(db, skip=skip, limit=limit, updated_since=updated_since)
     return transactions
 
 @router.get("/transactions/{transaction_id}", response_model=schemas.Transaction)
@@ -2,8 +2,16 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
+from app.alerts.engine import evaluate_transaction
+from app.jobs.crud import enqueue_job
+from app.projects.crud import get_project, get_task, live_task_ids
+from app.sync.tracking import changed_since
 from . import models, schemas
 
+def _live(db: Session, model):
+    """Finance rows whose task (and so project) is not soft deleted"""
+    return db.query(model).filter(model.task_id.in_(live_task_ids()))
+
 # CRUD: Get all transactions by component ID
 def get_transactions_by_component(db: Session, component_id: int):
     from app.projects.models import Task
@@ -12,7 +20,7 @@ def get_transactions_by_component(db: Session, component_id: int):
     task_ids = [row[0] if isinstance(row, tuple) else row.id for row in task_id_rows]
     if not task_ids:
         return []
-    return db.query(models.Transaction).filter(models.Transaction.task_id.in_(task_ids)).all()
+    return _live(db, models.Transaction).filter(models.Transaction.task_id.in_(task_ids)).all()
 
 # ===============================
 # VENDOR CRUD
@@ -89,6 +97,8 @@ def generate_po_number(db: Session) -> str:
 def create_purchase_order(db: Session, po: schemas.PurchaseOrderCreate):
     """Create a new purchase order with auto-generated PO number"""
     # Generate unique PO number
+    if get_task(db, po.task_id) is None:
+        return None  # Task missing or its project soft deleted
     po_number = generate_po_number(db)
     
     # Create the purchase order data
@@ -103,51 +113,53 @@ def create_purchase_order(db: Session, po: schemas.PurchaseOrderCreate):
 
 def get_purchase_order(db: Session, po_id: int):
     """Get purchase order by ID"""
-    return db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
+    return _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
 
-def get_purchase_orders(db: Session, skip: int = 0, limit: int = 100):
-    """Get list of all purchase orders"""
-    return db.query(models.PurchaseOrder).offset(skip).limit(limit).all()
+def get_purchase_orders(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    """Get list of all purchase orders (optionally only those changed since a sync watermark)"""
+    query = changed_since(_live(db, models.PurchaseOrder), models.PurchaseOrder, updated_since)
+    return query.offset(skip).limit(limit).all()
 
 def get_purchase_orders_by_status(db: Session, status: str):
     """Get purchase orders by status"""
-    return db.query(models.PurchaseOrder).filter(models.PurchaseOrder.status == status).all()
+    return _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.status == status).all()
 
 def get_purchase_orders_by_task(db: Session, task_id: int):
     """Get purchase orders by task"""
-    return db.query(models.PurchaseOrder).filter(models.PurchaseOrder.task_id == task_id).all()
+    return _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.task_id == task_id).all()
 
 def get_purchase_orders_by_component(db: Session, component_id: int):
     """Get purchase orders by component"""
     # Join with Task table to filter by component_id
     from app.projects.models import Task
-    return db.query(models.PurchaseOrder)\
+    return _live(db, models.PurchaseOrder)\
         .join(Task, models.PurchaseOrder.task_id == Task.id)\
         .filter(Task.component_id == component_id)\
         .all()
 
 def get_purchase_orders_by_creator(db: Session, creator_id: int):
     """Get purchase orders by creator (created_by)"""
-    return db.query(models.PurchaseOrder).filter(models.PurchaseOrder.created_by == creator_id).all()
+    return _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.created_by == creator_id).all()
 
 def get_purchase_orders_by_approver(db: Session, approver_id: int):
     """Get purchase orders by approver (approved_by)"""
-    return db.query(models.PurchaseOrder).filter(models.PurchaseOrder.approved_by == approver_id).all()
+    return _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.approved_by == approver_id).all()
 
 def update_purchase_order(db: Session, po_id: int, po_update: schemas.PurchaseOrderUpdate):
     """Update purchase order"""
-    db_po = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
+    db_po = _live(db, models.PurchaseOrder).filter(models.PurchaseOrder.id == po_id).first()
     if db_po:
         old_status = db_po.status if not hasattr(db_po.status, 'compare') else db_po.status.value
         update_data = po_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_po, key, value)
-        db.commit()
-        db.refresh(db_po)
-        # If status changed to 'Approved', create transaction
+        # If status changed to 'Approved', queue the budget transaction in the same commit
         new_status = db_po.status if not hasattr(db_po.status, 'compare') else db_po.status.value
         if str(old_status) != 'Approved' and str(new_status) == 'Approved':
-            create_purchase_order_transaction(db, db_po)
+            enqueue_job(db, "finance.purchase_order_approved", {"purchase_order_id": db_po.id},
+                        idempotency_key=f"purchase_order_approved:{db_po.id}")
+        db.commit()
+        db.refresh(db_po)
     return db_po
 # Helper: Create transaction when purchase order is approved
 def create_purchase_order_transaction(db: Session, purchase_order):
@@ -168,7 +180,7 @@ def create_purchase_order_transaction(db: Session, purchase_order):
         return None
 
     # Get task and project
-    task = db.query(Task).filter(Task.id == purchase_order.task_id).first()
+    task = db.query(Task).filter(Task.id == purchase_order.task_id).with_for_update().first()  # Serialize budget updates
     if not task:
         return None
     try:
@@ -200,6 +212,7 @@ def create_purchase_order_transaction(db: Session, purchase_order):
     db.add(transaction)
     # Update task budget
     setattr(task, 'budget', Decimal(str(new_budget)))
+    evaluate_transaction(db, transaction, task)  # Project spend and budget threshold alerts
     db.commit()
     db.refresh(transaction)
     return transaction
@@ -284,6 +297,8 @@ def generate_co_number(db: Session) -> str:
 def create_change_order(db: Session, co: schemas.ChangeOrderCreate):
     """Create a new change order with auto-generated CO number"""
     # Generate unique CO number
+    if get_task(db, co.task_id) is None:
+        return None  # Task missing or its project soft deleted
     co_number = generate_co_number(db)
     
     # Create the change order data
@@ -298,40 +313,41 @@ def create_change_order(db: Session, co: schemas.ChangeOrderCreate):
 
 def get_change_order(db: Session, co_id: int):
     """Get change order by ID"""
-    return db.query(models.ChangeOrder).filter(models.ChangeOrder.id == co_id).first()
+    return _live(db, models.ChangeOrder).filter(models.ChangeOrder.id == co_id).first()
 
-def get_change_orders(db: Session, skip: int = 0, limit: int = 100):
-    """Get list of all change orders"""
-    return db.query(models.ChangeOrder).offset(skip).limit(limit).all()
+def get_change_orders(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    """Get list of all change orders (optionally only those changed since a sync watermark)"""
+    query = changed_since(_live(db, models.ChangeOrder), models.ChangeOrder, updated_since)
+    return query.offset(skip).limit(limit).all()
 
 def get_change_orders_by_status(db: Session, status: str):
     """Get change orders by status"""
-    return db.query(models.ChangeOrder).filter(models.ChangeOrder.status == status).all()
+    return _live(db, models.ChangeOrder).filter(models.ChangeOrder.status == status).all()
 
 def get_change_orders_by_task(db: Session, task_id: int):
     """Get change orders by task"""
-    return db.query(models.ChangeOrder).filter(models.ChangeOrder.task_id == task_id).all()
+    return _live(db, models.ChangeOrder).filter(models.ChangeOrder.task_id == task_id).all()
 
 def get_change_orders_by_component(db: Session, component_id: int):
     """Get change orders by component"""
     # Join with Task table to filter by component_id
     from app.projects.models import Task
-    return db.query(models.ChangeOrder)\
+    return _live(db, models.ChangeOrder)\
         .join(Task, models.ChangeOrder.task_id == Task.id)\
         .filter(Task.component_id == component_id)\
         .all()
 
 def get_change_orders_by_creator(db: Session, creator_id: int):
     """Get change orders by creator (created_by)"""
-    return db.query(models.ChangeOrder).filter(models.ChangeOrder.created_by == creator_id).all()
+    return _live(db, models.ChangeOrder).filter(models.ChangeOrder.created_by == creator_id).all()
 
 def get_change_orders_by_approver(db: Session, approver_id: int):
     """Get change orders by approver (approved_by)"""
-    return db.query(models.ChangeOrder).filter(models.ChangeOrder.approved_by == approver_id).all()
+    return _live(db, models.ChangeOrder).filter(models.ChangeOrder.approved_by == approver_id).all()
 
 def update_change_order(db: Session, co_id: int, co_update: schemas.ChangeOrderUpdate):
     """Update change order and create transaction if approved"""
-    db_co = db.query(models.ChangeOrder).filter(models.ChangeOrder.id == co_id).first()
+    db_co = _live(db, models.ChangeOrder).filter(models.ChangeOrder.id == co_id).first()
     if db_co:
         # Get the old status before update
         old_status = db_co.status
@@ -339,15 +355,23 @@ def update_change_order(db: Session, co_id: int, co_update: schemas.ChangeOrderU
         update_data = co_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_co, key, value)
-        db.commit()
-        db.refresh(db_co)
         
-        # If status changed to 'Approved', create transaction
+        # If status changed to 'Approved', queue the budget transaction in the same commit
         if old_status != 'Approved' and db_co.status == 'Approved':  # type: ignore
-            create_change_order_transaction(db, db_co)
+            enqueue_job(db, "finance.change_order_approved", {"change_order_id": db_co.id},
+                        idempotency_key=f"change_order_approved:{db_co.id}")
+        db.commit()
+        db.refresh(db_co)
         
     return db_co
 
+def get_transaction_for_source(db: Session, transaction_type: str, source_id: int):
+    """Transaction already created for a purchase/change order, if any"""
+    return db.query(models.Transaction).filter(
+        models.Transaction.transaction_type == transaction_type,
+        models.Transaction.source_id == source_id
+    ).first()
+
 def create_change_order_transaction(db: Session, change_order):
     """Create transaction when change order is approved"""
     from datetime import datetime
@@ -361,7 +385,7 @@ def create_change_order_transaction(db: Session, change_order):
         return None  # No financial impact
     
     # Get current task budget
-    task = db.query(Task).filter(Task.id == change_order.task_id).first()
+    task = db.query(Task).filter(Task.id == change_order.task_id).with_for_update().first()  # Serialize budget updates
     if not task:
         return None
     
@@ -395,6 +419,7 @@ def create_change_order_transaction(db: Session, change_order):
     
     # Update task budget using proper assignment
     setattr(task, 'budget', Decimal(str(new_budget)))
+    evaluate_transaction(db, transaction, task)  # Budget threshold alerts
     
     db.commit()
     db.refresh(transaction)
@@ -494,7 +519,9 @@ def delete_change_order_item(db: Session, item_id: int):
 # ===============================
 
 def create_transaction(db: Session, transaction: schemas.TransactionCreate):
-    """Create a new transaction"""
+    """Create a new transaction; None if its project or task is missing or soft deleted"""
+    if get_project(db, transaction.project_id) is None or get_task(db, transaction.task_id) is None:
+        return None
     db_transaction = models.Transaction(**transaction.dict())
     db.add(db_transaction)
     db.commit()
@@ -503,20 +530,21 @@ def create_transaction(db: Session, transaction: schemas.TransactionCreate):
 
 def get_transaction(db: Session, transaction_id: int):
     """Get transaction by ID"""
-    return db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
+    return _live(db, models.Transaction).filter(models.Transaction.id == transaction_id).first()
 
-def get_transactions(db: Session, skip: int = 0, limit: int = 100):
-    """Get list of all transactions"""
-    return db.query(models.Transaction).offset(skip).limit(limit).all()
+def get_transactions(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    """Get list of all transactions (optionally only those changed since a sync watermark)"""
+    query = changed_since(_live(db, models.Transaction), models.Transaction, updated_since)
+    return query.offset(skip).limit(limit).all()
 
 def get_transactions_by_project(db: Session, project_id: int):
     """Get transactions by project"""
-    return db.query(models.Transaction).filter(models.Transaction.project_id == project_id).all()
+    return _live(db, models.Transaction).filter(models.Transaction.project_id == project_id).all()
 
 def get_transactions_by_task(db: Session, task_id: int):
     """Get transactions by task"""
-    return db.query(models.Transaction).filter(models.Transaction.task_id == task_id).all()
+    return _live(db, models.Transaction).filter(models.Transaction.task_id == task_id).all()
 
 def get_transactions_by_type(db: Session, transaction_type: str):
     """Get transactions by type"""
-    return db.query(models.Transaction).filter(models.Transaction.transaction_type == transaction_type).all()
+    return _live(db, models.Transaction).filter(models.Transaction.transaction_type == transaction_type).all()
@@ -0,0 +1,30 @@
+"""
+Background job handlers for finance side effects
+
+Handlers can run more than once (retries, runner crashes), so each one first
+checks whether its transaction already exists.
+"""
+from sqlalchemy.orm import Session
+
+from app.jobs.runner import job_handler
+from . import crud, models
+
+@job_handler("finance.purchase_order_approved")
+def create_transaction_for_approved_purchase_order(db: Session, payload: dict):
+    """Record the budget transaction for an approved purchase order"""
+    purchase_order = db.query(models.PurchaseOrder).filter(models.PurchaseOrder.id == payload["purchase_order_id"]).first()
+    if not purchase_order or str(purchase_order.status) != 'Approved':
+        return None  # Deleted or un-approved before the job ran
+    if crud.get_transaction_for_source(db, 'purchase_order', purchase_order.id):
+        return None
+    return crud.create_purchase_order_transaction(db, purchase_order)
+
+@job_handler("finance.change_order_approved")
+def create_transaction_for_approved_change_order(db: Session, payload: dict):
+    """Record the budget transaction for an approved change order"""
+    change_order = db.query(models.ChangeOrder).filter(models.ChangeOrder.id == payload["change_order_id"]).first()
+    if not change_order or str(change_order.status) != 'Approved':
+        return None
+    if crud.get_transaction_for_source(db, 'change_order', change_order.id):
+        return None
+    return crud.create_change_order_transaction(db, change_order)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, Boolean, Date, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, Text, Boolean, Date, Numeric, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -46,7 +46,7 @@ class PurchaseOrder(Base):
     notes = Column(Text)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
     
     # Relationships
     vendor = relationship("Vendor")
@@ -99,7 +99,7 @@ class ChangeOrder(Base):
     notes = Column(Text)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
     
     # Relationships
     task = relationship("Task")
@@ -158,10 +158,26 @@ class Transaction(Base):
     approved_date = Column(DateTime(timezone=True), nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
     
     # Relationships
     project = relationship("Project", back_populates="transactions")
     task = relationship("Task")
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_transactions")
     approver = relationship("User", foreign_keys=[approved_by], back_populates="approved_transactions")
+
+class ArchivedFinanceRecord(Base):
+    """
+    Copy of a transaction, purchase order or change order (items included)
+    taken before a deleted project is purged under the "archive" finance policy
+    """
+    __tablename__ = "archived_finance_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, nullable=False, index=True)  # No FK: the project is gone
+    project_name = Column(String(255))
+    record_type = Column(String(20), nullable=False)  # 'transaction', 'purchase_order', 'change_order'
+    record_id = Column(Integer, nullable=False)
+    record_number = Column(String(50))  # TXN-/PO-/CO- number
+    data = Column(JSON, nullable=False)  # Column values as of archiving
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
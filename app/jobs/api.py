@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.users.auth import require_admin_role
+from app.users.tokens import TokenPrincipal
+from . import crud, schemas
+from .runner import runner
+
+router = APIRouter()
+
+# ===============================
+# JOB MONITORING
+# ===============================
+
+@router.get("/stats", response_model=schemas.JobQueueStats)
+def get_job_queue_stats(
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Queue depth, oldest due job age and this worker's runner latency metrics"""
+    return {**crud.get_queue_stats(db), "runner": runner.get_stats()}
+
+@router.get("/{job_id}", response_model=schemas.BackgroundJobResponse)
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Get a background job's status, attempts and last error"""
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,179 @@
+"""
+Job queue operations
+
+`enqueue_job` only adds the row to the caller's session, so the job commits
+(or rolls back) together with the change that produced it. Runners claim jobs
+with `FOR UPDATE SKIP LOCKED`, so any number of threads and processes can poll
+the same table without handing out a job twice.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 3600
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _insert_ignoring_duplicates(db: Session, values: dict):
+    """INSERT ... ON CONFLICT (idempotency_key) DO NOTHING, inside the caller's transaction"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    if insert is not None:
+        statement = insert(models.BackgroundJob).values(**values)
+        if values.get("idempotency_key"):
+            statement = statement.on_conflict_do_nothing(index_elements=["idempotency_key"])
+        db.execute(statement)
+        return
+
+    if values.get("idempotency_key") and db.query(models.BackgroundJob.id).filter(
+        models.BackgroundJob.idempotency_key == values["idempotency_key"]
+    ).first():
+        return
+    db.add(models.BackgroundJob(**values))
+
+def enqueue_job(db: Session, job_type: str, payload: Optional[dict] = None, *,
+                idempotency_key: Optional[str] = None, delay_seconds: float = 0,
+                priority: int = 0, max_attempts: int = 5):
+    """
+    Add a job to the caller's transaction (not committed here). A job whose
+    idempotency_key already exists is silently skipped.
+    """
+    _insert_ignoring_duplicates(db, {
+        "job_type": job_type,
+        "payload": payload or {},
+        "status": "queued",
+        "priority": priority,
+        "idempotency_key": idempotency_key,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": utcnow() + timedelta(seconds=delay_seconds),
+        "created_at": utcnow(),
+    })
+    db.info["jobs_enqueued"] = True  # Wakes this process's runner after commit
+
+def claim_jobs(db: Session, worker_id: str, limit: int = 1) -> list[models.BackgroundJob]:
+    """Atomically mark up to `limit` due jobs as running for this worker"""
+    now = utcnow()
+    due = select(models.BackgroundJob.id).where(
+        models.BackgroundJob.status == "queued",
+        models.BackgroundJob.run_at <= now
+    ).order_by(
+        models.BackgroundJob.priority.desc(),
+        models.BackgroundJob.run_at
+    ).limit(limit).with_for_update(skip_locked=True)
+
+    claimed_ids = list(db.execute(
+        update(models.BackgroundJob)
+        .where(models.BackgroundJob.id.in_(due.scalar_subquery()))
+        .values(
+            status="running",
+            locked_by=worker_id,
+            locked_at=now,
+            started_at=now,
+            attempts=models.BackgroundJob.attempts + 1
+        )
+        .returning(models.BackgroundJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    db.commit()
+    if not claimed_ids:
+        return []
+    return db.query(models.BackgroundJob).filter(models.BackgroundJob.id.in_(claimed_ids)).all()
+
+def mark_job_succeeded(db: Session, job_id: int, worker_id: str):
+    db.query(models.BackgroundJob).filter(
+        models.BackgroundJob.id == job_id,
+        models.BackgroundJob.locked_by == worker_id
+    ).update({
+        models.BackgroundJob.status: "succeeded",
+        models.BackgroundJob.finished_at: utcnow(),
+        models.BackgroundJob.locked_by: None,
+        models.BackgroundJob.last_error: None
+    }, synchronize_session=False)
+    db.commit()
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter: 5s, 10s, 20s ... capped at an hour"""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+def mark_job_failed(db: Session, job: models.BackgroundJob, worker_id: str, error: str) -> str:
+    """Schedule a retry with backoff, or mark the job dead after max_attempts. Returns the new status."""
+    if job.attempts >= job.max_attempts:
+        values = {
+            models.BackgroundJob.status: "dead",
+            models.BackgroundJob.finished_at: utcnow()
+        }
+        new_status = "dead"
+    else:
+        values = {
+            models.BackgroundJob.status: "queued",
+            models.BackgroundJob.run_at: utcnow() + timedelta(seconds=backoff_seconds(job.attempts))
+        }
+        new_status = "queued"
+    values[models.BackgroundJob.last_error] = error[:4000]
+    values[models.BackgroundJob.locked_by] = None
+    db.query(models.BackgroundJob).filter(
+        models.BackgroundJob.id == job.id,
+        models.BackgroundJob.locked_by == worker_id
+    ).update(values, synchronize_session=False)
+    db.commit()
+    return new_status
+
+def requeue_stale_jobs(db: Session, timeout_seconds: int = 900) -> int:
+    """Return jobs whose runner died mid-job to the queue (counts as an attempt)"""
+    requeued = db.query(models.BackgroundJob).filter(
+        models.BackgroundJob.status == "running",
+        models.BackgroundJob.locked_at < utcnow() - timedelta(seconds=timeout_seconds)
+    ).update({
+        models.BackgroundJob.status: "queued",
+        models.BackgroundJob.locked_by: None,
+        models.BackgroundJob.run_at: utcnow(),
+        models.BackgroundJob.last_error: "Runner did not finish the job before the lock timeout"
+    }, synchronize_session=False)
+    db.commit()
+    return requeued
+
+def purge_finished_jobs(db: Session, older_than_days: int = 7) -> int:
+    """Delete succeeded jobs after a retention period (dead jobs are kept for inspection)"""
+    deleted = db.query(models.BackgroundJob).filter(
+        models.BackgroundJob.status == "succeeded",
+        models.BackgroundJob.finished_at < utcnow() - timedelta(days=older_than_days)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def get_job(db: Session, job_id: int):
+    return db.query(models.BackgroundJob).filter(models.BackgroundJob.id == job_id).first()
+
+def get_queue_stats(db: Session) -> dict:
+    """Queue depth per status/type and age of the oldest due job"""
+    by_status = dict(db.query(models.BackgroundJob.status, func.count(models.BackgroundJob.id))
+                     .group_by(models.BackgroundJob.status).all())
+    queued_by_type = dict(db.query(models.BackgroundJob.job_type, func.count(models.BackgroundJob.id))
+                          .filter(models.BackgroundJob.status == "queued")
+                          .group_by(models.BackgroundJob.job_type).all())
+    oldest_due = db.query(func.min(models.BackgroundJob.run_at)).filter(
+        models.BackgroundJob.status == "queued",
+        models.BackgroundJob.run_at <= utcnow()
+    ).scalar()
+    if oldest_due is not None and oldest_due.tzinfo is None:
+        oldest_due = oldest_due.replace(tzinfo=timezone.utc)
+    return {
+        "by_status": by_status,
+        "queued_by_type": queued_by_type,
+        "oldest_due_age_seconds": (utcnow() - oldest_due).total_seconds() if oldest_due else 0.0,
+    }
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class BackgroundJob(Base):
+    """
+    Deferred side effect, written in the same transaction as the change that
+    caused it (outbox) and executed by the job runner threads.
+    """
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        # Claim query: status = 'queued' AND run_at <= now ORDER BY priority, run_at
+        Index("ix_background_jobs_claim", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(100), nullable=False, index=True)  # Registered handler name, e.g. finance.purchase_order_approved
+    payload = Column(JSON, nullable=False, default=dict)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, succeeded, dead
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+    idempotency_key = Column(String(200), nullable=True, unique=True)  # Duplicate enqueues are ignored
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # Not claimed before this (backoff)
+    locked_by = Column(String(100), nullable=True)  # host:pid:thread of the runner holding the job
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,142 @@
+"""
+Background job runner
+
+Each API worker process runs JOB_WORKER_THREADS threads that claim due jobs
+from `background_jobs` and call the registered handler with a fresh session.
+Delivery is at-least-once: a handler may run again after a crash or timeout,
+so handlers must be idempotent (check whether their effect already exists).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import timezone
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import crud
+
+logger = logging.getLogger(__name__)
+
+TIMING_WINDOW = 500  # Recent jobs kept for latency percentiles
+
+_handlers: dict[str, Callable] = {}
+
+def job_handler(job_type: str):
+    """Register a function handler(db, payload) for a job type"""
+    def decorator(func: Callable):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+def get_handler(job_type: str) -> Optional[Callable]:
+    return _handlers.get(job_type)
+
+def _percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+class JobRunner:
+    """Polls the job table from worker threads and tracks per-process metrics"""
+
+    def __init__(self, session_factory: Callable, threads: Optional[int] = None, poll_seconds: Optional[float] = None):
+        self.session_factory = session_factory
+        self.threads = threads or int(os.getenv("JOB_WORKER_THREADS", "2"))
+        self.poll_seconds = poll_seconds or float(os.getenv("JOB_POLL_SECONDS", "2"))
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._workers: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._counts = {"succeeded": 0, "retried": 0, "dead": 0}
+        self._recent = deque(maxlen=TIMING_WINDOW)  # (queue_latency_ms, duration_ms)
+
+    def notify(self):
+        """Wake idle threads (called after a transaction that enqueued jobs commits)"""
+        self._wakeup.set()
+
+    def _run_one(self, db: Session, job, worker_id: str):
+        started = time.time()
+        run_at = job.run_at if job.run_at.tzinfo else job.run_at.replace(tzinfo=timezone.utc)
+        queue_latency_ms = max(0, int((started - run_at.timestamp()) * 1000))
+        handler = get_handler(job.job_type)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job type '{job.job_type}'")
+            handler(db, job.payload or {})
+            db.commit()
+            crud.mark_job_succeeded(db, job.id, worker_id)
+            outcome = "succeeded"
+        except Exception as e:
+            db.rollback()
+            logger.warning("Job %s (%s) attempt %s failed: %s", job.id, job.job_type, job.attempts, e)
+            error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+            outcome = "retried" if crud.mark_job_failed(db, job, worker_id, error) == "queued" else "dead"
+        with self._lock:
+            self._counts[outcome] += 1
+            self._recent.append((queue_latency_ms, int((time.time() - started) * 1000)))
+
+    def _worker(self, index: int):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+        while not self._stop.is_set():
+            claimed = []
+            db = self.session_factory()
+            try:
+                claimed = crud.claim_jobs(db, worker_id, limit=1)
+                for job in claimed:
+                    self._run_one(db, job, worker_id)
+            except Exception:
+                logger.exception("Job runner %s failed to claim or finish a job", worker_id)
+                db.rollback()
+            finally:
+                db.close()
+            if not claimed:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def start(self):
+        if self._workers:
+            return
+        self._stop.clear()
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._worker, args=(index,), name=f"job-runner-{index}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._workers:
+            thread.join(timeout=timeout)
+        self._workers = []
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            latencies = [latency for latency, _ in self._recent]
+            durations = [duration for _, duration in self._recent]
+            return {
+                "pid": os.getpid(),
+                "threads": self.threads,
+                "running": bool(self._workers),
+                **self._counts,
+                "recent_jobs": len(self._recent),
+                "queue_latency_ms": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95), "max": max(latencies) if latencies else None},
+                "duration_ms": {"p50": _percentile(durations, 0.5), "p95": _percentile(durations, 0.95), "max": max(durations) if durations else None},
+            }
+
+def _create_runner() -> JobRunner:
+    from app.database import SessionLocal
+    return JobRunner(SessionLocal)
+
+runner = _create_runner()
+
+@event.listens_for(Session, "after_commit")
+def _wake_runner_after_enqueue(session):
+    if session.info.pop("jobs_enqueued", False):
+        runner.notify()
@@ -0,0 +1,47 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+# ===============================
+# BACKGROUND JOB SCHEMAS
+# ===============================
+
+class BackgroundJobResponse(BaseModel):
+    id: int
+    job_type: str
+    payload: Dict[str, Any]
+    status: str
+    priority: int
+    idempotency_key: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class LatencySummary(BaseModel):
+    p50: Optional[int] = None
+    p95: Optional[int] = None
+    max: Optional[int] = None
+
+class JobRunnerStats(BaseModel):
+    pid: int
+    threads: int
+    running: bool
+    succeeded: int
+    retried: int
+    dead: int
+    recent_jobs: int
+    queue_latency_ms: LatencySummary
+    duration_ms: LatencySummary
+
+class JobQueueStats(BaseModel):
+    by_status: Dict[str, int]
+    queued_by_type: Dict[str, int]
+    oldest_due_age_seconds: float
+    runner: JobRunnerStats  # This worker process only
@@ -1,18 +1,60 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.orm import Session
 
-from .database import engine, Base
+import os
+
+from .database import engine, Base, SessionLocal, ensure_indexes, get_db, replica_set, DATABASE_URL
 from .users import models as user_models
 from .projects import models as project_models
 from .documents import models as document_models
 from .finance import models as finance_models
 from .workforce import models as workforce_models
+from .jobs import models as job_models
+from .templates import models as template_models
+from .streams import models as stream_models
+from .sync import models as sync_models
+from .alerts import models as alert_models
 
 # Create all database tables
 Base.metadata.create_all(bind=engine)
 
+# Soft delete column and ON DELETE rules for tables that predate them (before ensure_indexes: deleted_at is indexed)
+from .projects.purge import ensure_project_delete_schema
+ensure_project_delete_schema(engine)
+
+# File storage columns for documents tables that predate them
+from .documents.models import ensure_document_storage_columns
+ensure_document_storage_columns(engine)
+
+# Append-only audit log (partitioned by month on PostgreSQL)
+from .audit.models import ensure_audit_table
+ensure_audit_table(engine)
+
+# Indexes added to models after their tables were first created
+ensure_indexes(engine)
+
+# updated_at default/backfill for delta sync (rows inserted before it was set on insert)
+from .sync.tracking import ensure_sync_schema
+ensure_sync_schema(engine)
+
+# Full-text search index (tsvector/GIN on PostgreSQL, FTS5 on SQLite)
+from .documents.search import ensure_search_index
+ensure_search_index(engine)
+
+# Typeahead indexes for user search (pg_trgm when available)
+from .users.search import ensure_user_search_indexes
+ensure_user_search_indexes(engine)
+
 app = FastAPI(title="BuildBuzz API")
 
+# Load shedding: 503 + Retry-After when in-flight requests or pool waits exceed limits.
+# Added before CORS so rejections still carry CORS headers.
+from .admission import AdmissionMiddleware
+
+if os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true":
+    app.add_middleware(AdmissionMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -33,8 +75,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Queries", "Server-Timing", "X-Profile-Id", "X-Sync-Watermark"],
 )
 
+# Prometheus metrics; added before the SQL middleware so it runs inside it and sees the request's query stats
+from .monitoring.metrics import MetricsMiddleware, instrument_pool, render_metrics
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+if METRICS_ENABLED:
+    instrument_pool(engine)
+    for replica in replica_set.replicas:
+        instrument_pool(replica.engine, target=replica.name)
+    app.add_middleware(MetricsMiddleware)
+
+# Per-request SQL statement counts/timing, N+1 logging and query budgets
+from .monitoring.sql import SQLInstrumentationMiddleware, instrument_engine
+
+if os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true":
+    instrument_engine(engine)
+    for replica in replica_set.replicas:
+        instrument_engine(replica.engine, target=replica.name)  # GET reads routed to replicas count too
+    app.add_middleware(SQLInstrumentationMiddleware)
+
+# Route GET requests' reads to healthy read replicas (only when replicas are configured)
+from .replicas import ReadRoutingMiddleware, SQLiteReplicaStandIn
+
+if replica_set:
+    app.add_middleware(ReadRoutingMiddleware)
+
+# Audit log: buffer each write request's change events and hand them to the writer thread when it finishes
+from .audit.capture import AUDIT_ENABLED, AuditMiddleware, writer as audit_writer
+
+if AUDIT_ENABLED:
+    app.add_middleware(AuditMiddleware)
+
+# Sampling profiler for admin-requested (X-Profile: 1) or randomly sampled requests
+from .monitoring.profiling import ProfilingMiddleware
+
+if os.getenv("PROFILING_ENABLED", "true").lower() == "true":
+    app.add_middleware(ProfilingMiddleware)
+
 @app.get("/")
 def read_root():
     """Root endpoint with API information"""
@@ -51,14 +131,163 @@ def health_check():
     """Health check endpoint for load balancers and monitoring"""
     return {"status": "healthy", "message": "BuildBuzz Backend is running"}
 
+if METRICS_ENABLED:
+    @app.get("/metrics", tags=["health"], include_in_schema=False)
+    def metrics(db: Session = Depends(get_db)):
+        """Prometheus metrics aggregated across workers (scrape from the internal network only)"""
+        body, content_type = render_metrics(db)
+        return Response(content=body, media_type=content_type)
+
 from .users.api import router as users_router
 from .projects.api import router as projects_router
 from .documents.api import router as documents_router
 from .finance.api import router as finance_router
 from .workforce.api import router as workforce_router
+from .jobs.api import router as jobs_router
+from .templates.api import router as templates_router
+from .monitoring.api import router as profiles_router
+from .audit.api import router as audit_router
+from .streams.api import router as streams_router
+from .sync.api import router as sync_router
+from .dashboards.api import router as dashboards_router
+from .alerts.api import router as alerts_router
 
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(projects_router, prefix="", tags=["projects"])
 app.include_router(documents_router, prefix="/documents", tags=["documents"])
 app.include_router(finance_router, prefix="/finance", tags=["finance"])
 app.include_router(workforce_router, prefix="/workforce", tags=["workforce"])
+app.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
+app.include_router(templates_router, prefix="/templates", tags=["templates"])
+app.include_router(profiles_router, prefix="/profiles", tags=["profiling"])
+app.include_router(audit_router, prefix="/audit", tags=["audit"])
+app.include_router(streams_router, prefix="/events", tags=["events"])
+app.include_router(sync_router, prefix="/sync", tags=["sync"])
+app.include_router(dashboards_router, prefix="/dashboards", tags=["dashboards"])
+app.include_router(alerts_router, prefix="/alerts", tags=["alerts"])
+
+from .documents.processing import processor as document_processor
+
+@app.on_event("shutdown")
+def shutdown_document_processor():
+    """Stop the document-processing process pool"""
+    document_processor.shutdown()
+
+from .users.password import password_hasher
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    """Stop the password-hashing thread pool"""
+    password_hasher.shutdown()
+
+from .users.tokens import get_signing_key, revocation_syncer
+
+@app.on_event("startup")
+def check_signing_key():
+    """Refuse to start without a shared token signing key"""
+    get_signing_key()
+
+@app.on_event("startup")
+def start_revocation_sync():
+    """Mirror revoked tokens into this worker's memory"""
+    revocation_syncer.start()
+
+@app.on_event("shutdown")
+def stop_revocation_sync():
+    revocation_syncer.stop()
+
+# Periodic background jobs (only the elected leader worker runs them)
+from .scheduler import create_scheduler
+from .users import crud as user_crud
+from .users.tokens import purge_expired_revocations
+from .jobs import crud as job_crud
+from .streams.broker import broker as event_broker, purge_live_events
+from .sync.tracking import purge_tombstones
+from .documents.crud import purge_expired_upload_sessions
+
+scheduler = create_scheduler(engine, SessionLocal)
+scheduler.add_job("expire_invitations", float(os.getenv("INVITATION_EXPIRY_INTERVAL_SECONDS", "300")), user_crud.expire_old_invitations)
+scheduler.add_job("purge_revoked_tokens", 3600, purge_expired_revocations)
+scheduler.add_job("requeue_stale_jobs", 60, job_crud.requeue_stale_jobs)
+scheduler.add_job("purge_finished_jobs", 3600, job_crud.purge_finished_jobs)
+scheduler.add_job("purge_live_events", 3600, purge_live_events)
+scheduler.add_job("purge_sync_tombstones", 3600, purge_tombstones)
+scheduler.add_job("purge_upload_sessions", 3600, purge_expired_upload_sessions)
+
+@app.on_event("startup")
+def start_scheduler():
+    """Start the periodic job scheduler thread"""
+    if os.getenv("SCHEDULER_ENABLED", "true").lower() == "true":
+        scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    scheduler.stop()
+
+# Background job runner threads; importing handler modules registers their job types
+from .jobs.runner import runner as job_runner
+from .finance import jobs as finance_jobs
+from .projects import purge as project_purge
+from .alerts import jobs as alert_jobs
+
+@app.on_event("startup")
+def queue_project_spend_backfill():
+    """Queue the one-time project spend backfill until it has completed"""
+    db = SessionLocal()
+    try:
+        alert_jobs.queue_project_spend_backfill(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_job_runner():
+    """Start polling the background job table"""
+    if os.getenv("JOB_RUNNER_ENABLED", "true").lower() == "true":
+        job_runner.start()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    job_runner.stop()
+
+@app.on_event("startup")
+def start_audit_writer():
+    """Start the thread that stores buffered audit events"""
+    if AUDIT_ENABLED:
+        audit_writer.start()
+
+@app.on_event("shutdown")
+def stop_audit_writer():
+    audit_writer.stop()  # After the job runner, whose commits may still queue events
+
+# Live event stream: capture listeners write live_events rows, the broker thread fans them out to /events/stream
+from .streams import capture as stream_capture
+
+@app.on_event("startup")
+def start_event_broker():
+    """Start this worker's live event broker thread"""
+    event_broker.start()
+
+@app.on_event("shutdown")
+def stop_event_broker():
+    event_broker.stop()
+
+# Local replication stand-in: copies the SQLite primary into the first replica URL
+replica_stand_in = None
+if os.getenv("DATABASE_REPLICA_STANDIN", "false").lower() == "true":
+    replica_stand_in = SQLiteReplicaStandIn(
+        DATABASE_URL, os.getenv("DATABASE_REPLICA_URLS", "").split(",")[0].strip(),
+        interval=float(os.getenv("DATABASE_REPLICA_STANDIN_SECONDS", "1"))
+    )
+
+@app.on_event("startup")
+def start_replica_monitoring():
+    """Start replica lag checks (and the local stand-in replication)"""
+    if replica_stand_in is not None:
+        replica_stand_in.start()
+    replica_set.start()
+
+@app.on_event("shutdown")
+def stop_replica_monitoring():
+    replica_set.stop()
+    if replica_stand_in is not None:
+        replica_stand_in.stop()
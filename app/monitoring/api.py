@@ -0,0 +1,39 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from app.users.auth import require_admin_role
+from app.users.tokens import TokenPrincipal
+from . import schemas
+from .profiling import profile_store
+
+router = APIRouter()
+
+# ===============================
+# REQUEST PROFILES
+# ===============================
+
+@router.get("/", response_model=List[schemas.ProfileSummary])
+async def list_profiles(
+    route: Optional[str] = Query(None, description="Route template, e.g. /projects/{project_id}"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """List stored request profiles, newest first"""
+    return await run_in_threadpool(profile_store.list, route, limit)
+
+@router.get("/{profile_id}", response_model=schemas.ProfileDetail)
+async def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Get a profile; format=collapsed returns plain collapsed stacks for flamegraph tools"""
+    profile = await run_in_threadpool(profile_store.get, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse("\n".join(profile["collapsed"]) + "\n")
+    return profile
@@ -0,0 +1,229 @@
+"""
+Prometheus metrics
+
+Request latency/status per route template, SQL statements per route (from the
+per-request QueryStats in monitoring/sql.py), connection pool checkouts,
+bulkhead usage, in-process cache hits/misses and background job queue depth.
+
+Under gunicorn every worker writes its samples to PROMETHEUS_MULTIPROC_DIR
+(set by gunicorn.conf.py before the workers import anything) and `/metrics`
+merges all workers' files, so any worker can answer a scrape. Without that
+variable (plain uvicorn) the process-local registry is served.
+"""
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+from .sql import current_query_stats
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+CACHE_SYNC_SECONDS = 1.0
+JOB_STATUSES = ("queued", "running", "succeeded", "dead")
+
+# ===============================
+# METRIC DEFINITIONS
+# ===============================
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter("http_requests_total", "Requests by route template and status", ["method", "route", "status"])
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests rejected with 503 by admission control", ["priority", "reason"])
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "Requests being handled", multiprocess_mode="livesum"
+)
+
+DB_STATEMENTS = Counter(
+    "db_statements_total", "SQL statements executed by route and database", ["method", "route", "target"]
+)
+DB_SECONDS = Counter(
+    "db_statement_seconds_total", "Time spent in SQL statements by route and database", ["method", "route", "target"]
+)
+DB_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request", "SQL statements per request by route",
+    ["method", "route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out of the pool", ["target"],
+    multiprocess_mode="livesum"
+)
+POOL_CAPACITY = Gauge(
+    "db_pool_capacity_connections", "Pool size plus max overflow", ["target"], multiprocess_mode="livesum"
+)
+POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Connection checkouts from the pool", ["target"])
+REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Last measured replication lag (-1 when the probe fails)", ["replica"],
+    multiprocess_mode="mostrecent"
+)
+REPLICA_READS = Counter("db_replica_sessions_total", "Read-only request sessions by the database they read from", ["target"])
+
+BULKHEAD_ACTIVE = Gauge(
+    "bulkhead_active_requests", "Requests running in a bulkhead", ["bulkhead"], multiprocess_mode="livesum"
+)
+BULKHEAD_WAITING = Gauge(
+    "bulkhead_waiting_requests", "Requests queued for a bulkhead slot", ["bulkhead"], multiprocess_mode="livesum"
+)
+BULKHEAD_CAPACITY = Gauge(
+    "bulkhead_capacity", "Configured bulkhead limits", ["bulkhead", "resource"], multiprocess_mode="livesum"
+)
+BULKHEAD_DB_IN_USE = Gauge(
+    "bulkhead_db_connections_in_use", "Connections held against a bulkhead's DB quota", ["bulkhead"],
+    multiprocess_mode="livesum"
+)
+BULKHEAD_REJECTED = Counter("bulkhead_rejected_total", "Requests rejected because a bulkhead queue was full", ["bulkhead"])
+BULKHEAD_QUEUE_WAIT = Histogram(
+    "bulkhead_queue_wait_seconds", "Time spent waiting for a bulkhead slot", ["bulkhead"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+CACHE_HITS = Counter("cache_hits_total", "In-process cache hits", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "In-process cache misses", ["cache"])
+CACHE_SIZE = Gauge("cache_entries", "Entries held by an in-process cache", ["cache"], multiprocess_mode="livesum")
+
+JOB_QUEUE_DEPTH = Gauge(
+    "background_jobs", "Background jobs by status", ["status"], multiprocess_mode="mostrecent"
+)
+JOB_OLDEST_DUE_AGE = Gauge(
+    "background_jobs_oldest_due_age_seconds", "Age of the oldest queued job that is due", multiprocess_mode="mostrecent"
+)
+
+# ===============================
+# CONNECTION POOL
+# ===============================
+
+_instrumented_pools: "weakref.WeakSet" = weakref.WeakSet()
+
+def instrument_pool(engine, target: str = "primary"):
+    """Track pool checkouts with pool events, labelled by database `target` (idempotent)"""
+    pool = engine.pool
+    if pool in _instrumented_pools:
+        return
+    _instrumented_pools.add(pool)
+    checked_out, checkouts = POOL_CHECKED_OUT.labels(target), POOL_CHECKOUTS.labels(target)
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+        checkouts.inc()
+
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    if hasattr(pool, "size"):
+        POOL_CAPACITY.labels(target).set(pool.size() + max(0, getattr(pool, "_max_overflow", 0)))
+
+# ===============================
+# IN-PROCESS CACHES
+# ===============================
+
+_caches: dict[str, Callable] = {}
+_cache_totals: dict[str, tuple[int, int]] = {}
+_last_cache_sync = 0.0
+_cache_sync_lock = threading.Lock()
+
+def register_cache(name: str, cached_function: Callable):
+    """Report a functools.lru_cache'd function's hit/miss counts as `cache` label `name`"""
+    _caches[name] = cached_function
+    _cache_totals[name] = (0, 0)
+
+def sync_cache_metrics(force: bool = False):
+    """Move cache_info() deltas into the counters (throttled; called after requests)"""
+    global _last_cache_sync
+    now = time.monotonic()
+    if not force and now - _last_cache_sync < CACHE_SYNC_SECONDS:
+        return
+    with _cache_sync_lock:  # Scrapes sync from a threadpool thread
+        _last_cache_sync = now
+        for name, cached_function in _caches.items():
+            info = cached_function.cache_info()
+            previous_hits, previous_misses = _cache_totals[name]
+            if info.hits < previous_hits or info.misses < previous_misses:
+                previous_hits, previous_misses = 0, 0  # cache_clear() resets the counts
+            CACHE_HITS.labels(name).inc(info.hits - previous_hits)
+            CACHE_MISSES.labels(name).inc(info.misses - previous_misses)
+            CACHE_SIZE.labels(name).set(info.currsize)
+            _cache_totals[name] = (info.hits, info.misses)
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and SQL statements per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            method = scope.get("method", "")
+            route = getattr(scope.get("route"), "path", None) or "unmatched"  # Templates keep label cardinality bounded
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+            REQUESTS.labels(method, route, str(status_code)).inc()
+            stats = current_query_stats()
+            if stats is not None:
+                for target, count in stats.targets.items():
+                    DB_STATEMENTS.labels(method, route, target).inc(count)
+                    DB_SECONDS.labels(method, route, target).inc(stats.target_ms[target] / 1000)
+                DB_STATEMENTS_PER_REQUEST.labels(method, route).observe(stats.count)
+            sync_cache_metrics()
+
+# ===============================
+# EXPOSITION
+# ===============================
+
+def update_queue_metrics(db):
+    from app.jobs.crud import get_queue_stats
+
+    stats = get_queue_stats(db)
+    for status in set(JOB_STATUSES) | set(stats["by_status"]):
+        JOB_QUEUE_DEPTH.labels(status).set(stats["by_status"].get(status, 0))
+    JOB_OLDEST_DUE_AGE.set(stats["oldest_due_age_seconds"])
+
+def render_metrics(db: Optional[object] = None) -> tuple[bytes, str]:
+    """Prometheus text exposition for all workers (multiprocess) or this process"""
+    sync_cache_metrics(force=True)
+    if db is not None:
+        try:
+            update_queue_metrics(db)
+        except Exception:
+            logger.exception("Could not read background job queue depth")  # Still serve the other metrics
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,340 @@
+"""
+Sampling request profiler
+
+Opt-in per request: an admin sends `X-Profile: 1` (checked against their
+access token), or PROFILE_SAMPLE_RATE picks a fraction of all traffic. While a
+profiled request runs, one background thread snapshots its stacks every
+PROFILE_SAMPLE_INTERVAL_MS:
+
+* on the event-loop thread, only while the request's task is the running task,
+* in threadpool workers (sync endpoints, run_in_threadpool) whose current job
+  carries the request's context.
+
+Samples are folded into collapsed stacks ("a;b;c count", the flamegraph.pl /
+speedscope format) and saved as one JSON file per request in PROFILE_DIR, a
+ring buffer keeping the newest PROFILE_MAX_PER_ROUTE profiles per route and
+PROFILE_MAX_TOTAL overall. Unprofiled requests only pay for a header scan.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import count
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/buildbuzz-profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # 0.01 = 1% of requests
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_MAX_PER_ROUTE = int(os.getenv("PROFILE_MAX_PER_ROUTE", "20"))
+PROFILE_MAX_TOTAL = int(os.getenv("PROFILE_MAX_TOTAL", "200"))
+PROFILE_MAX_SAMPLES = 20000  # Per request; stops sampling runaway requests
+PROFILE_HEADER = b"x-profile"
+PROFILER_ROLES = {"superadmin", "business_admin", "clerk"}  # Same roles as require_admin_role
+
+PROFILE_ID_PATTERN = re.compile(r"^\d+-\d+-\d+$")
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+_profile_ids = count(1)
+
+def _worker_thread_code():
+    """Code object of anyio's threadpool worker loop, whose `context` local is the job's context"""
+    try:
+        from anyio._backends._asyncio import WorkerThread
+        return WorkerThread.run.__code__
+    except (ImportError, AttributeError):
+        return None
+
+_WORKER_RUN_CODE = _worker_thread_code()
+
+@dataclass(eq=False)  # Hashed by identity; the sampler keeps a set of active profiles
+class RequestProfile:
+    id: str
+    method: str
+    path: str
+    trigger: str  # "header" or "sampled"
+    loop: asyncio.AbstractEventLoop
+    task: Optional[asyncio.Task]
+    loop_thread_id: int
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started: float = field(default_factory=time.perf_counter)
+    stacks: Counter = field(default_factory=Counter)
+    samples: int = 0
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    duration_ms: Optional[float] = None
+
+    def add_sample(self, stack: str):
+        if self.samples < PROFILE_MAX_SAMPLES:
+            self.samples += 1
+            self.stacks[stack] += 1
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route or self.path,
+            "status_code": self.status_code,
+            "trigger": self.trigger,
+            "pid": os.getpid(),
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "samples": self.samples,
+            "interval_ms": PROFILE_SAMPLE_INTERVAL_MS,
+            "collapsed": [f"{stack} {n}" for stack, n in self.stacks.most_common()],
+        }
+
+# ===============================
+# STACK SAMPLER
+# ===============================
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}"
+
+def _collapse(frames: list) -> str:
+    return ";".join(_frame_label(frame) for frame in frames)
+
+def _outer_to_inner(frame) -> list:
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+class StackSampler:
+    """One daemon thread per process; idle (blocked on an event) while nothing is profiled"""
+
+    def __init__(self, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self._profiles: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._active.set()
+
+    def remove(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles.discard(profile)
+            if not self._profiles:
+                self._active.clear()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            self._active.wait()
+            started = time.perf_counter()
+            with self._lock:
+                profiles = list(self._profiles)
+            if profiles:
+                self._sample(profiles, own_id)
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def _sample(self, profiles: list, own_id: int):
+        frames = sys._current_frames()
+        for profile in profiles:
+            # Event loop thread: only while this request's task is the one running
+            if profile.task is not None and asyncio.current_task(profile.loop) is profile.task:
+                frame = frames.get(profile.loop_thread_id)
+                if frame is not None:
+                    profile.add_sample(_collapse(self._trim_loop_stack(_outer_to_inner(frame))))
+
+        if _WORKER_RUN_CODE is None:
+            return
+        for thread_id, frame in frames.items():
+            if thread_id == own_id:
+                continue
+            stack = _outer_to_inner(frame)
+            for index, outer in enumerate(stack[:8]):
+                if outer.f_code is _WORKER_RUN_CODE:
+                    job_frames = stack[index + 1:]
+                    if not job_frames or job_frames[0].f_globals.get("__name__") == "queue":
+                        break  # Idle worker; its `context` local is from the previous job
+                    context = outer.f_locals.get("context")
+                    profile = context.get(_active_profile) if context is not None else None
+                    if profile is not None and profile in profiles:
+                        profile.add_sample(_collapse(job_frames))
+                    break
+
+    def _trim_loop_stack(self, stack: list) -> list:
+        """Drop event loop/server frames above the profiling middleware"""
+        for index, frame in enumerate(stack):
+            if frame.f_code is ProfilingMiddleware.__call__.__code__:
+                return stack[index:]
+        return stack
+
+sampler = StackSampler()
+
+# ===============================
+# RING BUFFER STORAGE
+# ===============================
+
+def _route_key(method: str, route: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", f"{method} {route}").strip("_")[:120]
+
+class ProfileStore:
+    """
+    Profiles on disk as `<id>.<route key>.json`. Ids start with a millisecond
+    timestamp, so name order is age order across all workers sharing the directory.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, max_per_route: int = PROFILE_MAX_PER_ROUTE,
+                 max_total: int = PROFILE_MAX_TOTAL):
+        self.directory = directory
+        self.max_per_route = max_per_route
+        self.max_total = max_total
+
+    def _files(self) -> list[str]:
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return sorted(names, key=lambda name: [int(part) for part in name.split(".", 1)[0].split("-")])
+
+    def save(self, profile: RequestProfile):
+        os.makedirs(self.directory, exist_ok=True)
+        data = profile.to_dict()
+        name = f"{profile.id}.{_route_key(profile.method, data['route'])}.json"
+        temp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, os.path.join(self.directory, name))
+        self._prune(name.split(".", 1)[1])
+
+    def _prune(self, route_suffix: str):
+        files = self._files()
+        same_route = [name for name in files if name.split(".", 1)[1] == route_suffix]
+        expired = same_route[:max(0, len(same_route) - self.max_per_route)]
+        remaining = [name for name in files if name not in expired]
+        expired += remaining[:max(0, len(remaining) - self.max_total)]
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # Pruned by another worker
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.directory, name)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self, route: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """Newest first, without the stacks"""
+        summaries = []
+        for name in reversed(self._files()):
+            data = self._read(name)
+            if data is None or (route and data.get("route") != route):
+                continue
+            data.pop("collapsed", None)
+            summaries.append(data)
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        for name in self._files():
+            if name.split(".", 1)[0] == profile_id:
+                return self._read(name)
+        return None
+
+profile_store = ProfileStore()
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+def _is_profiler_admin(authorization: Optional[bytes]) -> bool:
+    from app.users.tokens import ACCESS, TokenError, decode_token
+
+    if not authorization:
+        return False
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return False
+    try:
+        claims = decode_token(token.strip(), ACCESS)
+    except TokenError:
+        return False
+    return claims.get("role") in PROFILER_ROLES
+
+class ProfilingMiddleware:
+    """ASGI middleware starting a sampled profile for opted-in requests"""
+
+    def __init__(self, app, sample_rate: Optional[float] = None, store: Optional[ProfileStore] = None):
+        self.app = app
+        self.sample_rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.store = store or profile_store
+
+    def _trigger(self, scope) -> Optional[str]:
+        requested, authorization = False, None
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                requested = value not in (b"", b"0", b"false")
+            elif name == b"authorization":
+                authorization = value
+        if requested and _is_profiler_admin(authorization):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            id=f"{int(time.time() * 1000)}-{os.getpid()}-{next(_profile_ids)}",
+            method=scope.get("method", ""),
+            path=scope.get("path", ""),
+            trigger=trigger,
+            loop=asyncio.get_running_loop(),
+            task=asyncio.current_task(),
+            loop_thread_id=threading.get_ident(),
+        )
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        token = _active_profile.set(profile)
+        sampler.add(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.remove(profile)
+            _active_profile.reset(token)
+            profile.duration_ms = round((time.perf_counter() - profile.started) * 1000, 2)
+            profile.route = getattr(scope.get("route"), "path", None)
+            try:
+                await run_in_threadpool(self.store.save, profile)
+            except Exception:
+                logger.exception("Could not save request profile %s", profile.id)
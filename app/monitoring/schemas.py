@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+# ===============================
+# REQUEST PROFILE SCHEMAS
+# ===============================
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: str
+    status_code: Optional[int] = None
+    trigger: str
+    pid: int
+    started_at: datetime
+    duration_ms: Optional[float] = None
+    samples: int
+    interval_ms: float
+
+class ProfileDetail(ProfileSummary):
+    collapsed: List[str]  # "frame;frame;frame count" lines (flamegraph.pl / speedscope input)
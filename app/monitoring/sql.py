@@ -0,0 +1,223 @@
+"""
+Per-request SQL instrumentation
+
+SQLAlchemy cursor events on the engine record every statement executed while
+a request is being handled (the request's stats object lives in a contextvar,
+which Starlette copies into the threadpool running sync endpoints). The ASGI
+middleware then:
+
+* adds `X-DB-Queries` and `Server-Timing: db;dur=..., app;dur=...` headers,
+* logs a structured `n_plus_one` warning when the same statement shape runs
+  SQL_N_PLUS_ONE_THRESHOLD or more times in one request,
+* enforces per-route query budgets (`@query_budget(n)` on an endpoint, or the
+  SQL_QUERY_BUDGETS / SQL_QUERY_BUDGET_DEFAULT settings). With
+  SQL_QUERY_BUDGET_STRICT=true an exceeded budget raises QueryBudgetExceeded,
+  so tests using TestClient fail; otherwise it is logged.
+"""
+import json
+import logging
+import os
+import re
+import time
+import weakref
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+DEFAULT_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET_DEFAULT", "0"))  # 0 = no default budget
+QUERY_BUDGET_STRICT = os.getenv("SQL_QUERY_BUDGET_STRICT", "false").lower() == "true"
+MAX_STATEMENT_LOG_LENGTH = 300
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|:\w+|\$\d+)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more SQL statements than its route allows"""
+    pass
+
+@dataclass
+class QueryStats:
+    """Statements recorded for one request (or one `track_queries` block)"""
+    count: int = 0
+    total_ms: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    shape_ms: dict = field(default_factory=lambda: defaultdict(float))
+    targets: Counter = field(default_factory=Counter)  # Statements per database (primary or a replica)
+    target_ms: dict = field(default_factory=lambda: defaultdict(float))
+
+    def record(self, statement: str, duration_ms: float, target: str = "primary"):
+        shape = statement_shape(statement)
+        self.count += 1
+        self.total_ms += duration_ms
+        self.shapes[shape] += 1
+        self.shape_ms[shape] += duration_ms
+        self.targets[target] += 1
+        self.target_ms[target] += duration_ms
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[tuple[str, int, float]]:
+        """(shape, count, total_ms) for statements repeated at least `threshold` times"""
+        return [
+            (shape, count, self.shape_ms[shape])
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+def statement_shape(statement: str) -> str:
+    """Normalize a parametrized statement so repeated lookups compare equal"""
+    return _IN_LIST.sub("IN (...)", _WHITESPACE.sub(" ", statement).strip())
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@contextmanager
+def track_queries():
+    """Record statements run inside the block (tests, benchmarks, jobs)"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+# ===============================
+# ENGINE EVENTS
+# ===============================
+
+_engine_targets: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()  # Engine -> target label
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    target = _engine_targets.get(conn.engine, "primary")
+    stats.record(statement, (time.perf_counter() - start_times.pop()) * 1000, target)
+
+def instrument_engine(engine, target: str = "primary"):
+    """Attach the statement-recording hooks to an engine (idempotent); `target` labels its statements"""
+    _engine_targets[engine] = target
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+# ===============================
+# QUERY BUDGETS
+# ===============================
+
+def query_budget(max_queries: int):
+    """Decorator setting the maximum number of SQL statements an endpoint may run"""
+    def decorator(func):
+        func.query_budget = max_queries
+        return func
+    return decorator
+
+def _configured_budgets() -> dict:
+    """SQL_QUERY_BUDGETS='{"GET /projects/": 10}' (route path templates)"""
+    raw = os.getenv("SQL_QUERY_BUDGETS")
+    if not raw:
+        return {}
+    try:
+        return {key: int(value) for key, value in json.loads(raw).items()}
+    except (ValueError, AttributeError):
+        logger.warning("Ignoring invalid SQL_QUERY_BUDGETS setting")
+        return {}
+
+_route_budgets = _configured_budgets()
+
+def get_query_budget(method: str, route) -> Optional[int]:
+    if route is None:
+        return None
+    configured = _route_budgets.get(f"{method} {route.path}")
+    if configured is not None:
+        return configured
+    budget = getattr(getattr(route, "endpoint", None), "query_budget", None)
+    if budget is not None:
+        return budget
+    return DEFAULT_QUERY_BUDGET or None
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+class SQLInstrumentationMiddleware:
+    """ASGI middleware adding DB timing headers, N+1 logging and query budgets"""
+
+    def __init__(self, app, strict: Optional[bool] = None):
+        self.app = app
+        self.strict = QUERY_BUDGET_STRICT if strict is None else strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                self._check_budget(scope, stats)
+                app_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((b"server-timing", (
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", app;dur={app_ms:.1f}'
+                ).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            self._report_repeated_statements(scope, stats)
+
+    def _route_label(self, scope) -> str:
+        route = scope.get("route")
+        return getattr(route, "path", None) or scope.get("path", "")
+
+    def _check_budget(self, scope, stats: QueryStats):
+        budget = get_query_budget(scope.get("method", ""), scope.get("route"))
+        if budget is None or stats.count <= budget:
+            return
+        details = {
+            "event": "query_budget_exceeded",
+            "method": scope.get("method"),
+            "route": self._route_label(scope),
+            "queries": stats.count,
+            "budget": budget,
+            "db_ms": round(stats.total_ms, 1),
+        }
+        logger.error(json.dumps(details))
+        if self.strict:
+            raise QueryBudgetExceeded(
+                f"{details['method']} {details['route']} ran {stats.count} queries (budget {budget})"
+            )
+
+    def _report_repeated_statements(self, scope, stats: QueryStats):
+        for shape, count, total_ms in stats.repeated_shapes():
+            logger.warning(json.dumps({
+                "event": "n_plus_one",
+                "method": scope.get("method"),
+                "route": self._route_label(scope),
+                "count": count,
+                "db_ms": round(total_ms, 1),
+                "request_queries": stats.count,
+                "statement": shape[:MAX_STATEMENT_LOG_LENGTH],
+            }))
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from . import crud, models, schemas
+from app.bulkheads import bulkhead
 from app.database import get_db
+from app.sync.tracking import sync_window
 
 router = APIRouter()
 
@@ -50,9 +53,10 @@ def create_project(project: schemas.ProjectCreate, db: Session = Depends(get_db)
     return crud.create_project(db=db, project=project)
 
 @router.get("/projects/", response_model=List[schemas.ProjectWithDetails])
-def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@bulkhead("reports")
+def read_projects(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all projects with related object details (client names, project manager names, financial summaries, etc.)"""
-    projects = crud.get_projects_with_details(db, skip=skip, limit=limit)
+    projects = crud.get_projects_with_details(db, skip=skip, limit=limit, updated_since=updated_since)
     result = []
     for project in projects:
         project_id_val = getattr(project, 'id')
@@ -61,9 +65,10 @@ def read_projects(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)
     return result
 
 @router.get("/projects/with-details/", response_model=List[schemas.ProjectWithDetails])
-def read_projects_with_details(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@bulkhead("reports")
+def read_projects_with_details(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all projects with related object details (client names, etc.)"""
-    projects = crud.get_projects_with_details(db, skip=skip, limit=limit)
+    projects = crud.get_projects_with_details(db, skip=skip, limit=limit, updated_since=updated_since)
     return [schemas.ProjectWithDetails.from_orm_with_names(project) for project in projects]
 
 @router.get("/projects/{project_id}", response_model=schemas.ProjectWithDetails)
@@ -110,7 +115,7 @@ def update_project(project_id: int, project: schemas.ProjectUpdate, db: Session
 
 @router.delete("/projects/{project_id}")
 def delete_project(project_id: int, db: Session = Depends(get_db)):
-    """Delete project by ID"""
+    """Delete project by ID (instant soft delete; its rows are purged in the background)"""
     db_project = crud.delete_project(db, project_id=project_id)
     if db_project is None:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -118,18 +123,21 @@ def delete_project(project_id: int, db: Session = Depends(get_db)):
 
 # Project filtering endpoints
 @router.get("/projects/by-client/{client_id}", response_model=List[schemas.ProjectWithDetails])
+@bulkhead("reports")
 def read_projects_by_client(client_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all projects by client ID with detailed information"""
     projects = crud.get_projects_by_client_with_details(db, client_id=client_id, skip=skip, limit=limit)
     return [schemas.ProjectWithDetails.from_orm_with_names(project) for project in projects]
 
 @router.get("/projects/by-manager/{project_manager_id}", response_model=List[schemas.ProjectWithDetails])
+@bulkhead("reports")
 def read_projects_by_manager(project_manager_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all projects by project manager ID with detailed information"""
     projects = crud.get_projects_by_project_manager_with_details(db, project_manager_id=project_manager_id, skip=skip, limit=limit)
     return [schemas.ProjectWithDetails.from_orm_with_names(project) for project in projects]
 
 @router.get("/projects/by-type/{project_type_id}", response_model=List[schemas.ProjectWithDetails])
+@bulkhead("reports")
 def read_projects_by_type(project_type_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """Get all projects by project type ID with detailed information"""
     projects = crud.get_projects_by_project_type_with_details(db, project_type_id=project_type_id, skip=skip, limit=limit)
@@ -139,12 +147,15 @@ def read_projects_by_type(project_type_id: int, skip: int = 0, limit: int = 100,
 @router.post("/components/", response_model=schemas.ProjectComponent)
 def create_component(component: schemas.ProjectComponentCreate, db: Session = Depends(get_db)):
     """Create a new project component"""
-    return crud.create_project_component(db=db, component=component)
+    db_component = crud.create_project_component(db=db, component=component)
+    if db_component is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_component
 
 @router.get("/components/", response_model=List[schemas.ProjectComponent])
-def read_components(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_components(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all project components"""
-    components = crud.get_project_components(db, skip=skip, limit=limit)
+    components = crud.get_project_components(db, skip=skip, limit=limit, updated_since=updated_since)
     return components
 
 @router.get("/components/{component_id}", response_model=schemas.ProjectComponent)
@@ -156,9 +167,9 @@ def read_component(component_id: int, db: Session = Depends(get_db)):
     return component
 
 @router.get("/projects/{project_id}/components", response_model=List[schemas.ProjectComponent])
-def read_components_by_project(project_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_components_by_project(project_id: int, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all components for a specific project"""
-    components = crud.get_project_components_by_project(db, project_id=project_id, skip=skip, limit=limit)
+    components = crud.get_project_components_by_project(db, project_id=project_id, skip=skip, limit=limit, updated_since=updated_since)
     return components
 
 @router.put("/components/{component_id}", response_model=schemas.ProjectComponent)
@@ -181,12 +192,31 @@ def delete_component(component_id: int, db: Session = Depends(get_db)):
 @router.post("/tasks/", response_model=schemas.Task)
 def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
     """Create a new task"""
-    return crud.create_task(db=db, task=task)
+    db_task = crud.create_task(db=db, task=task)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return db_task
+
+@router.post("/tasks/bulk", response_model=schemas.TaskBulkResult)
+def create_tasks_bulk(payload: schemas.TaskBulkCreate, atomic: bool = True, db: Session = Depends(get_db)):
+    """Create many tasks at once (e.g. a schedule import). With atomic=false, valid rows are created and invalid ones reported"""
+    task_ids, errors = crud.create_tasks_bulk(db, payload.tasks, atomic=atomic)
+    if errors and atomic:
+        raise HTTPException(status_code=422, detail={"message": "No tasks were created", "errors": errors})
+    return {"succeeded": len(task_ids), "failed": len(errors), "task_ids": task_ids, "errors": errors}
+
+@router.patch("/tasks/bulk", response_model=schemas.TaskBulkResult)
+def update_tasks_bulk(payload: schemas.TaskBulkUpdate, atomic: bool = True, db: Session = Depends(get_db)):
+    """Partially update many tasks at once. With atomic=false, valid rows are updated and invalid ones reported"""
+    task_ids, errors = crud.update_tasks_bulk(db, payload.tasks, atomic=atomic)
+    if errors and atomic:
+        raise HTTPException(status_code=422, detail={"message": "No tasks were updated", "errors": errors})
+    return {"succeeded": len(task_ids), "failed": len(errors), "task_ids": task_ids, "errors": errors}
 
 @router.get("/tasks/", response_model=List[schemas.Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_tasks(skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all tasks"""
-    tasks = crud.get_tasks(db, skip=skip, limit=limit)
+    tasks = crud.get_tasks(db, skip=skip, limit=limit, updated_since=updated_since)
     return tasks
 
 @router.get("/tasks/{task_id}", response_model=schemas.Task)
@@ -198,15 +228,15 @@ def read_task(task_id: int, db: Session = Depends(get_db)):
     return task
 
 @router.get("/components/{component_id}/tasks", response_model=List[schemas.Task])
-def read_tasks_by_component(component_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_tasks_by_component(component_id: int, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all tasks for a specific component"""
-    tasks = crud.get_tasks_by_component(db, component_id=component_id, skip=skip, limit=limit)
+    tasks = crud.get_tasks_by_component(db, component_id=component_id, skip=skip, limit=limit, updated_since=updated_since)
     return tasks
 
 @router.get("/projects/{project_id}/tasks", response_model=List[schemas.Task])
-def read_tasks_by_project(project_id: int, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_tasks_by_project(project_id: int, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all tasks for a specific project"""
-    tasks = crud.get_tasks_by_project(db, project_id=project_id, skip=skip, limit=limit)
+    tasks = crud.get_tasks_by_project(db, project_id=project_id, skip=skip, limit=limit, updated_since=updated_since)
     return tasks
 
 @router.put("/tasks/{task_id}", response_model=schemas.Task)
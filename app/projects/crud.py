@@ -1,5 +1,9 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy import and_, func, insert, select, update
+from typing import List, Optional
+from datetime import datetime
+from app.alerts.engine import evaluate_planned_budget
+from app.sync.tracking import changed_since
 from . import models, schemas
 
 # ProjectType CRUD
@@ -34,6 +38,24 @@ def delete_project_type(db: Session, project_type_id: int):
     return db_project_type
 
 # Project CRUD
+def _live_projects(db: Session):
+    """Projects that are not soft deleted"""
+    return db.query(models.Project).filter(models.Project.deleted_at.is_(None))
+
+def live_project_ids():
+    """Select of the ids of projects that are not soft deleted (children of the others are hidden too)"""
+    return select(models.Project.id).where(models.Project.deleted_at.is_(None))
+
+def live_task_ids():
+    """Select of the ids of tasks in projects that are not soft deleted"""
+    return select(models.Task.id).where(models.Task.project_id.in_(live_project_ids()))
+
+def _live_components(db: Session):
+    return db.query(models.ProjectComponent).filter(models.ProjectComponent.project_id.in_(live_project_ids()))
+
+def _live_tasks(db: Session):
+    return db.query(models.Task).filter(models.Task.project_id.in_(live_project_ids()))
+
 def create_project(db: Session, project: schemas.ProjectCreate):
     db_project = models.Project(**project.dict())
     db.add(db_project)
@@ -41,12 +63,12 @@ def create_project(db: Session, project: schemas.ProjectCreate):
     db.refresh(db_project)
     return db_project
 
-def get_projects(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).offset(skip).limit(limit).all()
+def get_projects(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    return changed_since(_live_projects(db), models.Project, updated_since).offset(skip).limit(limit).all()
 
-def get_projects_with_details(db: Session, skip: int = 0, limit: int = 100):
+def get_projects_with_details(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
     """Get projects with all related objects loaded"""
-    return db.query(models.Project).options(
+    return changed_since(_live_projects(db), models.Project, updated_since).options(
         joinedload(models.Project.client),
         joinedload(models.Project.project_manager),
         joinedload(models.Project.accountant),
@@ -54,11 +76,11 @@ def get_projects_with_details(db: Session, skip: int = 0, limit: int = 100):
     ).offset(skip).limit(limit).all()
 
 def get_project(db: Session, project_id: int):
-    return db.query(models.Project).filter(models.Project.id == project_id).first()
+    return _live_projects(db).filter(models.Project.id == project_id).first()
 
 def get_project_with_details(db: Session, project_id: int):
     """Get a single project with all related objects loaded"""
-    return db.query(models.Project).options(
+    return _live_projects(db).options(
         joinedload(models.Project.client),
         joinedload(models.Project.project_manager),
         joinedload(models.Project.accountant),
@@ -66,31 +88,38 @@ def get_project_with_details(db: Session, project_id: int):
     ).filter(models.Project.id == project_id).first()
 
 def update_project(db: Session, project_id: int, project_update: schemas.ProjectUpdate):
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    db_project = _live_projects(db).filter(models.Project.id == project_id).first()
     if db_project:
         update_data = project_update.dict(exclude_unset=True)
+        if "planned_budget" in update_data:
+            db.refresh(db_project, with_for_update=True)  # Current spend, locked like evaluate_transaction does
+        previous_planned = db_project.planned_budget
         for field, value in update_data.items():
             setattr(db_project, field, value)
+        if "planned_budget" in update_data and update_data["planned_budget"] != previous_planned:
+            evaluate_planned_budget(db, db_project, previous_planned)  # Budget threshold alerts
         db.commit()
         db.refresh(db_project)
     return db_project
 
 def delete_project(db: Session, project_id: int):
-    db_project = db.query(models.Project).filter(models.Project.id == project_id).first()
+    """Soft delete; the project's rows are purged in batches by a background job"""
+    from .purge import soft_delete_project
+
+    db_project = _live_projects(db).filter(models.Project.id == project_id).first()
     if db_project:
-        db.delete(db_project)
-        db.commit()
+        soft_delete_project(db, db_project)
     return db_project
 
 # Project filtering functions
 def get_projects_by_client(db: Session, client_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).filter(
+    return _live_projects(db).filter(
         models.Project.client_id == client_id
     ).offset(skip).limit(limit).all()
 
 def get_projects_by_client_with_details(db: Session, client_id: int, skip: int = 0, limit: int = 100):
     """Get projects by client with all related objects loaded"""
-    return db.query(models.Project).options(
+    return _live_projects(db).options(
         joinedload(models.Project.client),
         joinedload(models.Project.project_manager),
         joinedload(models.Project.accountant),
@@ -98,13 +127,13 @@ def get_projects_by_client_with_details(db: Session, client_id: int, skip: int =
     ).filter(models.Project.client_id == client_id).offset(skip).limit(limit).all()
 
 def get_projects_by_project_manager(db: Session, project_manager_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).filter(
+    return _live_projects(db).filter(
         models.Project.project_manager_id == project_manager_id
     ).offset(skip).limit(limit).all()
 
 def get_projects_by_project_manager_with_details(db: Session, project_manager_id: int, skip: int = 0, limit: int = 100):
     """Get projects by project manager with all related objects loaded"""
-    return db.query(models.Project).options(
+    return _live_projects(db).options(
         joinedload(models.Project.client),
         joinedload(models.Project.project_manager),
         joinedload(models.Project.accountant),
@@ -112,13 +141,13 @@ def get_projects_by_project_manager_with_details(db: Session, project_manager_id
     ).filter(models.Project.project_manager_id == project_manager_id).offset(skip).limit(limit).all()
 
 def get_projects_by_project_type(db: Session, project_type_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Project).filter(
+    return _live_projects(db).filter(
         models.Project.project_type_id == project_type_id
     ).offset(skip).limit(limit).all()
 
 def get_projects_by_project_type_with_details(db: Session, project_type_id: int, skip: int = 0, limit: int = 100):
     """Get projects by project type with all related objects loaded"""
-    return db.query(models.Project).options(
+    return _live_projects(db).options(
         joinedload(models.Project.client),
         joinedload(models.Project.project_manager),
         joinedload(models.Project.accountant),
@@ -127,25 +156,29 @@ def get_projects_by_project_type_with_details(db: Session, project_type_id: int,
 
 # ProjectComponent CRUD
 def create_project_component(db: Session, component: schemas.ProjectComponentCreate):
+    """Create a component; None if its project does not exist or is soft deleted"""
+    if get_project(db, component.project_id) is None:
+        return None
     db_component = models.ProjectComponent(**component.dict())
     db.add(db_component)
     db.commit()
     db.refresh(db_component)
     return db_component
 
-def get_project_components(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.ProjectComponent).offset(skip).limit(limit).all()
+def get_project_components(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    query = changed_since(_live_components(db), models.ProjectComponent, updated_since)
+    return query.offset(skip).limit(limit).all()
 
-def get_project_components_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.ProjectComponent).filter(
-        models.ProjectComponent.project_id == project_id
-    ).offset(skip).limit(limit).all()
+def get_project_components_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                                      updated_since: Optional[datetime] = None):
+    query = _live_components(db).filter(models.ProjectComponent.project_id == project_id)
+    return changed_since(query, models.ProjectComponent, updated_since).offset(skip).limit(limit).all()
 
 def get_project_component(db: Session, component_id: int):
-    return db.query(models.ProjectComponent).filter(models.ProjectComponent.id == component_id).first()
+    return _live_components(db).filter(models.ProjectComponent.id == component_id).first()
 
 def update_project_component(db: Session, component_id: int, component_update: schemas.ProjectComponentUpdate):
-    db_component = db.query(models.ProjectComponent).filter(models.ProjectComponent.id == component_id).first()
+    db_component = _live_components(db).filter(models.ProjectComponent.id == component_id).first()
     if db_component:
         update_data = component_update.dict(exclude_unset=True)
         for field, value in update_data.items():
@@ -155,7 +188,7 @@ def update_project_component(db: Session, component_id: int, component_update: s
     return db_component
 
 def delete_project_component(db: Session, component_id: int):
-    db_component = db.query(models.ProjectComponent).filter(models.ProjectComponent.id == component_id).first()
+    db_component = _live_components(db).filter(models.ProjectComponent.id == component_id).first()
     if db_component:
         db.delete(db_component)
         db.commit()
@@ -163,26 +196,33 @@ def delete_project_component(db: Session, component_id: int):
 
 # Task CRUD
 def create_task(db: Session, task: schemas.TaskCreate):
+    """Create a task; None if its project does not exist or is soft deleted"""
+    if get_project(db, task.project_id) is None:
+        return None
     db_task = models.Task(**task.dict())
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).offset(skip).limit(limit).all()
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, updated_since: Optional[datetime] = None):
+    return changed_since(_live_tasks(db), models.Task, updated_since).offset(skip).limit(limit).all()
 
 def get_task(db: Session, task_id: int):
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+    return _live_tasks(db).filter(models.Task.id == task_id).first()
 
-def get_tasks_by_component(db: Session, component_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).filter(models.Task.component_id == component_id).offset(skip).limit(limit).all()
+def get_tasks_by_component(db: Session, component_id: int, skip: int = 0, limit: int = 100,
+                           updated_since: Optional[datetime] = None):
+    query = _live_tasks(db).filter(models.Task.component_id == component_id)
+    return changed_since(query, models.Task, updated_since).offset(skip).limit(limit).all()
 
-def get_tasks_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).filter(models.Task.project_id == project_id).offset(skip).limit(limit).all()
+def get_tasks_by_project(db: Session, project_id: int, skip: int = 0, limit: int = 100,
+                         updated_since: Optional[datetime] = None):
+    query = _live_tasks(db).filter(models.Task.project_id == project_id)
+    return changed_since(query, models.Task, updated_since).offset(skip).limit(limit).all()
 
 def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    db_task = _live_tasks(db).filter(models.Task.id == task_id).first()
     if db_task:
         update_data = task_update.dict(exclude_unset=True)
         for field, value in update_data.items():
@@ -192,12 +232,120 @@ def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
     return db_task
 
 def delete_task(db: Session, task_id: int):
-    db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
+    db_task = _live_tasks(db).filter(models.Task.id == task_id).first()
     if db_task:
         db.delete(db_task)
         db.commit()
     return db_task
 
+# Bulk task import/update
+# The Task/ProjectComponent @validates hooks lazy-load the parent on every date
+# assignment. Bulk writes check the same rules for the whole batch against
+# parent date ranges loaded in one query, then write with executemany.
+def get_task_parent_ranges(db: Session, project_ids, component_ids):
+    """Date ranges of the projects and of those components that belong to them"""
+    rows = db.query(
+        models.Project.id, models.Project.start_date, models.Project.end_date,
+        models.ProjectComponent.id, models.ProjectComponent.start_date, models.ProjectComponent.end_date,
+    ).outerjoin(
+        models.ProjectComponent,
+        and_(models.ProjectComponent.project_id == models.Project.id, models.ProjectComponent.id.in_(component_ids)),
+    ).filter(models.Project.id.in_(project_ids), models.Project.deleted_at.is_(None)).all()
+
+    projects, components = {}, {}
+    for project_id, project_start, project_end, component_id, component_start, component_end in rows:
+        projects[project_id] = (project_start, project_end)
+        if component_id is not None:
+            components[component_id] = (project_id, component_start, component_end)
+    return projects, components
+
+def _task_dates_error(task: dict, projects: dict, components: dict):
+    """Same rules as Task.validate_task_dates, against preloaded parent ranges"""
+    project_id, component_id = task["project_id"], task.get("component_id")
+    if project_id not in projects:
+        return f"Project {project_id} not found"
+    if component_id is not None:
+        if components.get(component_id, (None,))[0] != project_id:
+            return f"Component {component_id} not found in project {project_id}"
+        parent, (parent_start, parent_end) = "component", components[component_id][1:]
+    else:
+        parent, (parent_start, parent_end) = "project", projects[project_id]
+
+    start_date, end_date = task.get("start_date"), task.get("end_date")
+    if start_date and parent_start and start_date < parent_start:
+        return f"Task start date must be after {parent} start date"
+    if end_date and parent_end and end_date > parent_end:
+        return f"Task end date must be before {parent} end date"
+    if start_date and end_date and end_date < start_date:
+        return "Task end date must be after start date"
+    return None
+
+def _validate_task_batch(db: Session, tasks: dict, errors: dict):
+    """tasks: row index -> task values; adds row index -> message to errors"""
+    projects, components = get_task_parent_ranges(
+        db,
+        {task["project_id"] for task in tasks.values()},
+        {task["component_id"] for task in tasks.values() if task.get("component_id") is not None},
+    )
+    for index, task in tasks.items():
+        error = _task_dates_error(task, projects, components)
+        if error:
+            errors[index] = error
+
+def _row_errors(errors: dict, ids: dict = None):
+    return [{"index": index, "id": (ids or {}).get(index), "error": errors[index]} for index in sorted(errors)]
+
+def create_tasks_bulk(db: Session, tasks: List[schemas.TaskCreate], atomic: bool = True):
+    """Validate and insert tasks in one executemany; returns (new ids, row errors)"""
+    rows = [task.dict() for task in tasks]
+    errors = {}
+    _validate_task_batch(db, dict(enumerate(rows)), errors)
+    valid_rows = [row for index, row in enumerate(rows) if index not in errors]
+    if (errors and atomic) or not valid_rows:
+        return [], _row_errors(errors)
+
+    task_ids = list(db.scalars(
+        insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+        valid_rows,
+    ))
+    db.commit()
+    return task_ids, _row_errors(errors)
+
+def update_tasks_bulk(db: Session, tasks: List[schemas.TaskBulkUpdateItem], atomic: bool = True):
+    """Validate and apply partial task updates with one executemany; returns (updated ids, row errors)"""
+    changes = {index: task.dict(exclude_unset=True) for index, task in enumerate(tasks)}
+    task_ids = {index: change["id"] for index, change in changes.items()}
+    current = {
+        row.id: row._asdict()
+        for row in db.query(
+            models.Task.id, models.Task.project_id, models.Task.component_id,
+            models.Task.start_date, models.Task.end_date,
+        ).filter(models.Task.id.in_(set(task_ids.values())))
+    }
+
+    errors, merged, seen = {}, {}, set()
+    for index, change in changes.items():
+        task_id = change["id"]
+        if task_id not in current:
+            errors[index] = f"Task {task_id} not found"
+        elif task_id in seen:
+            errors[index] = f"Task {task_id} appears more than once"
+        else:
+            merged[index] = {**current[task_id], **change}
+        seen.add(task_id)
+    if merged:
+        _validate_task_batch(db, merged, errors)
+
+    valid = [index for index in changes if index not in errors]
+    if (errors and atomic) or not valid:
+        return [], _row_errors(errors, task_ids)
+
+    rows = [changes[index] for index in valid if len(changes[index]) > 1]  # Rows with only an id change nothing
+    if rows:
+        db.execute(update(models.Task), rows)  # Bulk UPDATE by primary key, grouped by column set
+    db.commit()
+    return [task_ids[index] for index in valid], _row_errors(errors, task_ids)
+
 # Finance summary functions
 def get_project_purchase_orders_sum(db: Session, project_id: int):
     """Calculate the total sum of all approved purchase order items for a project"""
@@ -36,14 +36,17 @@ class Project(Base):
     project_manager = relationship("User", foreign_keys=[project_manager_id], back_populates="managed_projects")
     accountant = relationship("User", foreign_keys=[accountant_id])
     project_type = relationship("ProjectType", back_populates="projects")
-    components = relationship("ProjectComponent", back_populates="project", cascade="all, delete-orphan")
+    # Projects are soft deleted and purged in batches (purge.py); passive_deletes keeps the ORM from loading
+    # every child row if a project is ever deleted through the session
+    components = relationship("ProjectComponent", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
     transactions = relationship("Transaction", back_populates="project")
-    all_tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
+    all_tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan", passive_deletes=True)
     documents = relationship("Document", back_populates="project")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Soft deleted; rows purged by a background job
+
     @validates('start_date', 'end_date')
     def validate_project_dates(self, key, value):
         if key == 'end_date' and value is not None and hasattr(self, 'start_date') and self.start_date is not None:
@@ -55,7 +58,7 @@ class ProjectComponent(Base):
     __tablename__ = "project_components"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text)
     budget = Column(Numeric(15, 2))
@@ -64,7 +67,7 @@ class ProjectComponent(Base):
     end_date = Column(Date)
     
     # Self-referential relationship for component hierarchy
-    parent_id = Column(Integer, ForeignKey("project_components.id"))
+    parent_id = Column(Integer, ForeignKey("project_components.id", ondelete="CASCADE"))
     parent = relationship("ProjectComponent", remote_side=[id], back_populates="children")
     children = relationship("ProjectComponent", back_populates="parent", cascade="all, delete-orphan")
     
@@ -74,7 +77,7 @@ class ProjectComponent(Base):
     documents = relationship("Document", back_populates="component")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
     
     @validates('start_date', 'end_date')
     def validate_component_dates(self, key, value):
@@ -105,8 +108,8 @@ class Task(Base):
     priority = Column(String(50), default='Medium')  # Low, Medium, High, Critical
 
     # Project and Component Relationships
-    component_id = Column(Integer, ForeignKey("project_components.id"))
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)  # Direct project link for easier queries
+    component_id = Column(Integer, ForeignKey("project_components.id", ondelete="CASCADE"))
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)  # Direct project link for easier queries
     
     # Task Management Details
     task_type = Column(String(100))  # 'Planning', 'Construction', 'Inspection', 'Documentation'
@@ -119,7 +122,7 @@ class Task(Base):
     project = relationship("Project", back_populates="all_tasks")
     documents = relationship("Document", back_populates="task")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
     
     @validates('start_date', 'end_date')
     def validate_task_dates(self, key, value):
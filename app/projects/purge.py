@@ -0,0 +1,225 @@
+"""
+Project deletion
+
+`DELETE /projects/{id}` only sets `projects.deleted_at` and enqueues a
+`projects.purge` job in the same transaction. Project reads skip soft-deleted
+rows from then on. The job removes the project's rows in batches of
+PROJECT_PURGE_BATCH_SIZE. Each batch is one job in its own short transaction
+and enqueues the next, so a large project never holds locks for long. The
+order is tasks, leaf components, worker assignment history, then the project
+itself. Documents are kept and detached.
+
+Finance ledger rows (transactions, purchase and change orders) follow
+PROJECT_PURGE_FINANCE:
+
+* keep (default) - they stay, together with the tasks they reference and the
+  soft-deleted project row
+* archive - they are copied into archived_finance_records and deleted, and
+  then the project is purged completely
+
+Child foreign keys also carry ON DELETE rules (CASCADE for components, tasks
+and assignment history; SET NULL for documents). `ensure_project_delete_schema`
+applies these to existing PostgreSQL tables. SQLite does not enforce foreign
+keys here, so the purge deletes explicitly and does not depend on them.
+"""
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import delete, exists, func, or_, select, text, update
+from sqlalchemy.orm import Session, aliased, selectinload
+
+from app.documents.models import Document, UploadSession
+from app.finance.models import ArchivedFinanceRecord, ChangeOrder, ChangeOrderItem, PurchaseOrder, PurchaseOrderItem, Transaction
+from app.jobs.crud import enqueue_job
+from app.jobs.runner import job_handler
+from app.templates.models import ProjectTemplate
+from app.workforce.models import WorkerProjectHistory
+from .models import Project, ProjectComponent, Task
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH_SIZE = int(os.getenv("PROJECT_PURGE_BATCH_SIZE", "500"))
+KEEP, ARCHIVE = "keep", "archive"
+PURGE_FINANCE_POLICY = os.getenv("PROJECT_PURGE_FINANCE", KEEP).lower()
+PURGE_JOB = "projects.purge"
+
+# (table, column, referenced table, ON DELETE action)
+DELETE_RULES = [
+    ("project_components", "project_id", "projects", "CASCADE"),
+    ("project_components", "parent_id", "project_components", "CASCADE"),
+    ("tasks", "project_id", "projects", "CASCADE"),
+    ("tasks", "component_id", "project_components", "CASCADE"),
+    ("worker_project_history", "project_id", "projects", "CASCADE"),
+    ("document_access", "document_id", "documents", "CASCADE"),
+    ("documents", "project_id", "projects", "SET NULL"),
+    ("documents", "component_id", "project_components", "SET NULL"),
+    ("documents", "task_id", "tasks", "SET NULL"),
+    ("document_upload_sessions", "project_id", "projects", "SET NULL"),
+    ("document_upload_sessions", "component_id", "project_components", "SET NULL"),
+    ("document_upload_sessions", "task_id", "tasks", "SET NULL"),
+]
+
+POSTGRES_FOREIGN_KEY_QUERY = text(
+    "SELECT tc.constraint_name, rc.delete_rule FROM information_schema.table_constraints tc "
+    "JOIN information_schema.key_column_usage kcu "
+    "ON kcu.constraint_name = tc.constraint_name AND kcu.table_name = tc.table_name "
+    "JOIN information_schema.referential_constraints rc ON rc.constraint_name = tc.constraint_name "
+    "WHERE tc.constraint_type = 'FOREIGN KEY' AND tc.table_name = :table AND kcu.column_name = :column"
+)
+
+# ===============================
+# SCHEMA
+# ===============================
+
+def ensure_project_delete_schema(engine):
+    """Add projects.deleted_at and the ON DELETE rules to tables created before them"""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE projects ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE"))
+            for table, column, referenced, action in DELETE_RULES:
+                for name, rule in conn.execute(POSTGRES_FOREIGN_KEY_QUERY, {"table": table, "column": column}).all():
+                    if rule == action:
+                        continue
+                    logger.info("Setting ON DELETE %s on %s.%s", action, table, column)
+                    conn.execute(text(
+                        f'ALTER TABLE {table} DROP CONSTRAINT "{name}", '
+                        f'ADD CONSTRAINT "{name}" FOREIGN KEY ({column}) REFERENCES {referenced} (id) ON DELETE {action}'
+                    ))
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(projects)"))]
+            if "deleted_at" not in columns:
+                conn.execute(text("ALTER TABLE projects ADD COLUMN deleted_at DATETIME"))
+
+# ===============================
+# BATCHED PURGE
+# ===============================
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _row_data(row) -> dict:
+    return {column.name: _json_value(getattr(row, column.key)) for column in row.__table__.columns}
+
+def _archive_finance_batch(db: Session, project_id: int, project_name: str, batch_size: int) -> bool:
+    """Archive and delete up to batch_size ledger records of the project; False when none are left"""
+    project_tasks = select(Task.id).where(Task.project_id == project_id)
+    transactions = db.query(Transaction).filter(
+        or_(Transaction.project_id == project_id, Transaction.task_id.in_(project_tasks))
+    ).limit(batch_size).all()
+    if transactions:
+        db.execute(ArchivedFinanceRecord.__table__.insert(), [
+            {"project_id": project_id, "project_name": project_name, "record_type": "transaction",
+             "record_id": row.id, "record_number": row.transaction_number, "data": _row_data(row)}
+            for row in transactions
+        ])
+        db.execute(delete(Transaction).where(Transaction.id.in_([row.id for row in transactions])))
+        return True
+
+    for record_type, order_model, item_model, item_key, number_key in (
+        ("purchase_order", PurchaseOrder, PurchaseOrderItem, "purchase_order_id", "po_number"),
+        ("change_order", ChangeOrder, ChangeOrderItem, "change_order_id", "co_number"),
+    ):
+        orders = db.query(order_model).options(selectinload(order_model.items)).filter(
+            order_model.task_id.in_(project_tasks)
+        ).limit(batch_size).all()
+        if not orders:
+            continue
+        db.execute(ArchivedFinanceRecord.__table__.insert(), [
+            {"project_id": project_id, "project_name": project_name, "record_type": record_type,
+             "record_id": order.id, "record_number": getattr(order, number_key),
+             "data": {**_row_data(order), "items": [_row_data(item) for item in order.items]}}
+            for order in orders
+        ])
+        order_ids = [order.id for order in orders]
+        db.execute(delete(item_model).where(getattr(item_model, item_key).in_(order_ids)))
+        db.execute(delete(order_model).where(order_model.id.in_(order_ids)))
+        return True
+    return False
+
+def _detach_documents(db: Session, column: str, ids):
+    for model in (Document, UploadSession):
+        db.execute(
+            update(model).where(getattr(model, column).in_(ids)).values({column: None}),
+            execution_options={"synchronize_session": False},
+        )
+
+def purge_project_batch(db: Session, project_id: int, batch_size: int = PURGE_BATCH_SIZE,
+                        finance_policy: str = PURGE_FINANCE_POLICY) -> bool:
+    """
+    Delete the next batch (at most batch_size rows per table) of a soft-deleted
+    project. Returns True once nothing more can be purged. Does not commit.
+    """
+    project_name = db.query(Project.name).filter(Project.id == project_id).scalar()
+    if finance_policy == ARCHIVE and _archive_finance_batch(db, project_id, project_name, batch_size):
+        return False
+
+    # Tasks not referenced by (kept) ledger rows
+    task_ids = db.scalars(select(Task.id).where(
+        Task.project_id == project_id,
+        ~exists().where(PurchaseOrder.task_id == Task.id),
+        ~exists().where(ChangeOrder.task_id == Task.id),
+        ~exists().where(Transaction.task_id == Task.id),
+    ).limit(batch_size)).all()
+    if task_ids:
+        _detach_documents(db, "task_id", task_ids)
+        db.execute(delete(Task).where(Task.id.in_(task_ids)), execution_options={"synchronize_session": False})
+        return False
+
+    # Leaf components no remaining task points at
+    child = aliased(ProjectComponent)
+    component_ids = db.scalars(select(ProjectComponent.id).where(
+        ProjectComponent.project_id == project_id,
+        ~exists().where(child.parent_id == ProjectComponent.id),
+        ~exists().where(Task.component_id == ProjectComponent.id),
+    ).limit(batch_size)).all()
+    if component_ids:
+        _detach_documents(db, "component_id", component_ids)
+        db.execute(delete(ProjectComponent).where(ProjectComponent.id.in_(component_ids)),
+                   execution_options={"synchronize_session": False})
+        return False
+
+    history_ids = db.scalars(select(WorkerProjectHistory.id).where(
+        WorkerProjectHistory.project_id == project_id
+    ).limit(batch_size)).all()
+    if history_ids:
+        db.execute(delete(WorkerProjectHistory).where(WorkerProjectHistory.id.in_(history_ids)),
+                   execution_options={"synchronize_session": False})
+        return False
+
+    still_referenced = db.query(
+        exists().where(Task.project_id == project_id)
+        | exists().where(ProjectComponent.project_id == project_id)
+        | exists().where(Transaction.project_id == project_id)
+    ).scalar()
+    if still_referenced:
+        logger.info("Project %s keeps its ledger rows; leaving it soft deleted", project_id)
+        return True
+
+    _detach_documents(db, "project_id", [project_id])
+    db.execute(update(ProjectTemplate).where(ProjectTemplate.source_project_id == project_id).values(source_project_id=None))
+    db.execute(delete(Project).where(Project.id == project_id), execution_options={"synchronize_session": False})
+    return True
+
+@job_handler(PURGE_JOB)
+def purge_deleted_project(db: Session, payload: dict):
+    """Purge one batch of a soft-deleted project and queue the next"""
+    project_id = payload["project_id"]
+    deleted_at = db.query(Project.deleted_at).filter(Project.id == project_id).scalar()
+    if deleted_at is None:
+        return None  # Already purged, or not deleted
+    if not purge_project_batch(db, project_id):
+        enqueue_job(db, PURGE_JOB, {"project_id": project_id}, priority=-1)  # Next batch, next transaction
+
+def soft_delete_project(db: Session, project: Project):
+    """Hide the project now and queue its purge (commits)"""
+    project.deleted_at = func.now()
+    enqueue_job(db, PURGE_JOB, {"project_id": project.id}, idempotency_key=f"{PURGE_JOB}:{project.id}", priority=-1)
+    db.commit()
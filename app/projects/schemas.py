@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, date
 from typing import List, Optional
 from decimal import Decimal
@@ -85,6 +85,29 @@ class Task(TaskBase):
     class Config:
         from_attributes = True
 
+# Bulk task import/update
+MAX_BULK_TASKS = 5000
+
+class TaskBulkCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=MAX_BULK_TASKS)
+
+class TaskBulkUpdateItem(TaskUpdate):
+    id: int
+
+class TaskBulkUpdate(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=MAX_BULK_TASKS)
+
+class TaskBulkRowError(BaseModel):
+    index: int = Field(..., description="Position of the row in the request")
+    id: Optional[int] = Field(None, description="Task ID (updates only)")
+    error: str
+
+class TaskBulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    task_ids: List[int] = Field(default_factory=list, description="IDs of the created/updated tasks, in request order")
+    errors: List[TaskBulkRowError] = Field(default_factory=list)
+
 # Schemas for Project
 class ProjectBase(BaseModel):
     name: str
@@ -106,7 +129,6 @@ class ProjectUpdate(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     planned_budget: Optional[Decimal] = None
-    actual_budget: Optional[Decimal] = None
     status: Optional[str] = None
     client_id: Optional[int] = None
     project_manager_id: Optional[int] = None
@@ -0,0 +1,364 @@
+"""
+Read-replica routing
+
+Sessions from SessionLocal are RoutingSessions. During a GET/HEAD request they
+send plain SELECTs to a healthy replica. Everything else goes to the primary:
+flushes, DML, SELECT ... FOR UPDATE, background jobs, and any read made after
+the session has written. Writes and reads in other requests always use the
+primary.
+
+* Lag: a thread per worker probes each replica every REPLICA_LAG_CHECK_SECONDS
+  (PostgreSQL replay delay; the SQLite stand-in's heartbeat row). A replica
+  lagging more than REPLICA_MAX_LAG_SECONDS, or failing the probe, gets no
+  reads until it recovers. With no healthy replica, reads use the primary.
+* Read-your-writes: after a request commits a write, that user's reads stay
+  on the primary for READ_YOUR_WRITES_SECONDS. The user is pinned in this
+  worker's memory and also through a cookie, so requests that land on other
+  workers are pinned too.
+* `@use_primary` on a GET endpoint opts it out of replica reads, and
+  `read_from_primary()` does the same from a dependency. A single
+  select with side effects (nextval()) opts out with
+  `.execution_options(use_primary=True)`. Raw text() SQL stays on the primary
+  unless it is marked `.execution_options(replica_safe=True)`.
+
+For local development and tests, SQLiteReplicaStandIn copies a SQLite primary
+into a second file every few seconds (the sqlite3 backup API). This gives
+real replication lag without a second server.
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.monitoring.metrics import REPLICA_LAG, REPLICA_READS
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "2"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "15"))
+STICKY_COOKIE = "bb_primary_until"
+READ_METHODS = {"GET", "HEAD"}
+
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "  # Caught up, primary idle
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+HEARTBEAT_TABLE = "replication_heartbeat"
+
+# ===============================
+# REPLICA SET AND LAG MONITOR
+# ===============================
+
+@dataclass
+class Replica:
+    name: str
+    engine: object
+    healthy: bool = False  # Unknown until the first probe
+    lag_seconds: Optional[float] = None
+    last_error: Optional[str] = None
+    checked_at: Optional[float] = None
+
+def measure_lag(engine) -> float:
+    """Seconds the replica is behind its primary"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+        beat = conn.execute(text(f"SELECT max(beat_at) FROM {HEARTBEAT_TABLE}")).scalar()
+        if beat is None:
+            raise LookupError("No replication heartbeat on replica")
+        return max(0.0, time.time() - float(beat))
+
+class ReplicaSet:
+    """Replica engines plus their last measured health; picks one per session"""
+
+    def __init__(self, replicas: list[Replica], max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+                 check_seconds: float = REPLICA_LAG_CHECK_SECONDS):
+        self.replicas = replicas
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __bool__(self):
+        return bool(self.replicas)
+
+    def check(self):
+        """Probe every replica once and update its health"""
+        for replica in self.replicas:
+            try:
+                replica.lag_seconds = measure_lag(replica.engine)
+                replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+                replica.last_error = None if replica.healthy else f"Lag {replica.lag_seconds:.1f}s"
+            except Exception as e:
+                replica.healthy, replica.lag_seconds = False, None
+                replica.last_error = f"{type(e).__name__}: {e}"
+            replica.checked_at = time.time()
+            REPLICA_LAG.labels(replica.name).set(replica.lag_seconds if replica.lag_seconds is not None else -1)
+            if not replica.healthy:
+                logger.warning("Replica %s not used for reads: %s", replica.name, replica.last_error)
+
+    def choose(self):
+        """Engine of a random healthy replica, or None to read from the primary"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        return random.choice(healthy).engine if healthy else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.check_seconds)
+
+    def start(self):
+        if self.replicas and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-lag-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_status(self) -> list[dict]:
+        return [
+            {"name": r.name, "healthy": r.healthy, "lag_seconds": r.lag_seconds,
+             "last_error": r.last_error, "checked_at": r.checked_at}
+            for r in self.replicas
+        ]
+
+# ===============================
+# REQUEST ROUTING STATE
+# ===============================
+
+@dataclass
+class RequestRouting:
+    """Shared by a request and the threadpool thread running its endpoint"""
+    use_replica: bool
+    scope: dict = field(repr=False, default_factory=dict)
+    wrote: bool = False
+
+_request_routing: ContextVar[Optional[RequestRouting]] = ContextVar("request_routing", default=None)
+
+def use_primary(func):
+    """Decorator: this GET endpoint always reads from the primary"""
+    func.use_primary = True
+    return func
+
+def read_from_primary():
+    """Send the rest of the current request's reads to the primary"""
+    routing = _request_routing.get()
+    if routing is not None:
+        routing.use_replica = False
+
+def _replica_allowed() -> bool:
+    routing = _request_routing.get()
+    if routing is None or not routing.use_replica:
+        return False
+    endpoint = getattr(routing.scope.get("route"), "endpoint", None)
+    return not getattr(endpoint, "use_primary", False)
+
+def _is_plain_select(clause) -> bool:
+    """ORM/Core selects without FOR UPDATE; text() only when marked replica_safe"""
+    if clause is None:
+        return False
+    options = clause.get_execution_options() if hasattr(clause, "get_execution_options") else {}
+    if getattr(clause, "is_select", False):
+        return getattr(clause, "_for_update_arg", None) is None and not options.get("use_primary", False)
+    if getattr(clause, "is_text", False):
+        return options.get("replica_safe", False)  # Raw SQL may call nextval(), setval(), advisory locks...
+    return False
+
+# ===============================
+# ROUTING SESSION
+# ===============================
+
+class RoutingSession(Session):
+    """Session sending a read-only request's SELECTs to a replica"""
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (
+            self.replicas
+            and not self._flushing
+            and not self.info.get("wrote")
+            and _is_plain_select(clause)
+            and _replica_allowed()
+        ):
+            if "replica" not in self.info:  # One replica per session keeps its reads consistent
+                self.info["replica"] = self.replicas.choose()
+                REPLICA_READS.labels("replica" if self.info["replica"] is not None else "primary").inc()
+            if self.info["replica"] is not None:
+                return self.info["replica"]
+        elif clause is not None and getattr(clause, "is_dml", False):
+            _mark_wrote(self)
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+def _mark_wrote(session: Session):
+    session.info["wrote"] = True  # Later reads in this session must see the write
+    routing = _request_routing.get()
+    if routing is not None:
+        routing.wrote = True
+
+@event.listens_for(RoutingSession, "after_flush")
+def _after_flush(session, flush_context):
+    _mark_wrote(session)
+
+# ===============================
+# MIDDLEWARE
+# ===============================
+
+class _StickyUsers:
+    """user id -> time until which their reads go to the primary (this worker)"""
+
+    def __init__(self):
+        self._until: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def pin(self, user_id: int, until: float):
+        with self._lock:
+            self._until[user_id] = until
+            if len(self._until) > 10000:
+                now = time.time()
+                self._until = {uid: t for uid, t in self._until.items() if t > now}
+
+    def is_pinned(self, user_id: int) -> bool:
+        return self._until.get(user_id, 0) > time.time()
+
+sticky_users = _StickyUsers()
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+def _request_user_id(scope) -> Optional[int]:
+    from app.users.tokens import ACCESS, TokenError, decode_token
+
+    authorization = _header(scope, b"authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    try:
+        return int(decode_token(token.strip(), ACCESS)["sub"])
+    except (TokenError, KeyError, ValueError):
+        return None
+
+def _cookie_pinned(scope) -> bool:
+    cookies = _header(scope, b"cookie")
+    if not cookies:
+        return False
+    for part in cookies.decode("latin-1").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == STICKY_COOKIE:
+            try:
+                return float(value) > time.time()
+            except ValueError:
+                return False
+    return False
+
+class ReadRoutingMiddleware:
+    """ASGI middleware deciding per request whether reads may use a replica"""
+
+    def __init__(self, app, window_seconds: float = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        user_id = _request_user_id(scope)
+        use_replica = (
+            scope.get("method") in READ_METHODS
+            and not _cookie_pinned(scope)
+            and not (user_id is not None and sticky_users.is_pinned(user_id))
+        )
+        routing = RequestRouting(use_replica=use_replica, scope=scope)
+
+        async def send_with_stickiness(message):
+            if message["type"] == "http.response.start" and routing.wrote:
+                until = time.time() + self.window_seconds
+                if user_id is not None:
+                    sticky_users.pin(user_id, until)
+                cookie = f"{STICKY_COOKIE}={until:.0f}; Max-Age={int(self.window_seconds)}; Path=/; HttpOnly; SameSite=Lax"
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        token = _request_routing.set(routing)
+        try:
+            await self.app(scope, receive, send_with_stickiness)
+        finally:
+            _request_routing.reset(token)
+
+# ===============================
+# LOCAL STAND-IN
+# ===============================
+
+def _sqlite_path(url: str) -> str:
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        raise ValueError("The replica stand-in needs file-based SQLite URLs")
+    return database
+
+class SQLiteReplicaStandIn:
+    """Replicates a SQLite primary into a replica file every `interval` seconds"""
+
+    def __init__(self, primary_url: str, replica_url: str, interval: float = 1.0):
+        self.primary_path = _sqlite_path(primary_url)
+        self.replica_path = _sqlite_path(replica_url)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sync(self):
+        """Write a heartbeat on the primary, then copy the primary to the replica"""
+        primary = sqlite3.connect(self.primary_path, timeout=30)
+        try:
+            primary.execute(f"CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} (id INTEGER PRIMARY KEY, beat_at REAL NOT NULL)")
+            primary.execute(f"INSERT OR REPLACE INTO {HEARTBEAT_TABLE} (id, beat_at) VALUES (1, ?)", (time.time(),))
+            primary.commit()
+            replica = sqlite3.connect(self.replica_path, timeout=30)
+            try:
+                primary.backup(replica)
+            finally:
+                replica.close()
+        finally:
+            primary.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Replica stand-in sync failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-stand-in", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,221 @@
+"""
+In-process periodic scheduler with leader election
+
+Every gunicorn worker starts a scheduler thread, but only the worker holding
+the leader lock runs jobs:
+
+* PostgreSQL: a session-level `pg_try_advisory_lock` held on a dedicated
+  connection from an unpooled engine, so leading does not use up one of the
+  request pool's connections (admission control and the bulkhead quotas are
+  sized against that pool). If the leader process dies its connection
+  closes, the lock is released and another worker takes over on its next
+  tick.
+* Other databases (local SQLite): an exclusive `flock` on a lock file, which
+  covers workers on the same host.
+
+Jobs are plain functions taking a Session; each run gets its own session.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_KEY = zlib.crc32(b"buildbuzz-scheduler")  # Advisory lock id shared by all workers
+
+class PostgresLeaderLock:
+    """Session-level advisory lock on a connection held for as long as we lead"""
+
+    def __init__(self, engine, key: int = SCHEDULER_LOCK_KEY):
+        self.engine = engine
+        self.key = key
+        self._conn = None
+
+    def acquire(self) -> bool:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT 1"))  # Lock lives as long as this connection does
+                self._conn.rollback()  # Don't leave the connection idle in a transaction
+                return True
+            except Exception:
+                logger.warning("Scheduler lost its leader connection")
+                self._discard()
+        conn = self.engine.connect()
+        try:
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if acquired:
+            self._conn = conn
+            return True
+        conn.close()
+        return False
+
+    def _discard(self):
+        try:
+            self._conn.invalidate()  # Make sure the lock-holding connection is really closed
+        except Exception:
+            pass
+        self._conn = None
+
+    def release(self):
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+                self._conn.commit()
+                self._conn.close()
+            except Exception:
+                self._discard()
+            self._conn = None
+
+class FileLeaderLock:
+    """Exclusive flock on a file shared by workers on the same host"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv("SCHEDULER_LOCK_FILE", os.path.join(tempfile.gettempdir(), "buildbuzz-scheduler.lock"))
+        self._fd: Optional[int] = None
+
+    def acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        if fcntl is None:
+            return True  # Single-process development on Windows
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)  # Closing the descriptor drops the flock
+            self._fd = None
+
+def create_leader_lock(engine):
+    if engine.dialect.name == "postgresql":
+        from app.database import create_unpooled_engine
+        return PostgresLeaderLock(create_unpooled_engine())
+    return FileLeaderLock()
+
+@dataclass
+class ScheduledJob:
+    name: str
+    interval: float
+    func: Callable
+    next_run: float = 0.0
+    last_run_at: Optional[float] = None
+    last_duration_ms: Optional[int] = None
+    last_result: Optional[str] = None
+    last_error: Optional[str] = None
+    runs: int = 0
+    failures: int = 0
+
+@dataclass
+class PeriodicScheduler:
+    """Runs registered jobs on their interval while this worker is the leader"""
+    session_factory: Callable
+    lock: object
+    tick_seconds: float = 5.0
+    jobs: dict = field(default_factory=dict)
+    is_leader: bool = False
+
+    def __post_init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_job(self, name: str, interval_seconds: float, func: Callable):
+        """Register func(db) to run every interval_seconds (first run on the leader's first tick)"""
+        self.jobs[name] = ScheduledJob(name=name, interval=interval_seconds, func=func)
+
+    def _run_job(self, job: ScheduledJob):
+        started = time.time()
+        db = self.session_factory()
+        try:
+            result = job.func(db)
+            job.last_result = repr(result)[:200]
+            job.last_error = None
+        except Exception as e:
+            db.rollback()
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Scheduled job %s failed", job.name)
+        finally:
+            db.close()
+        job.runs += 1
+        job.last_run_at = started
+        job.last_duration_ms = int((time.time() - started) * 1000)
+        job.next_run = started + job.interval
+
+    def tick(self):
+        """Check leadership and run any jobs that are due"""
+        try:
+            self.is_leader = self.lock.acquire()
+        except Exception:
+            logger.exception("Scheduler leader election failed")
+            self.is_leader = False
+        if not self.is_leader:
+            return
+        now = time.time()
+        for job in list(self.jobs.values()):
+            if job.next_run <= now:
+                self._run_job(job)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.tick_seconds)
+        self.lock.release()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="periodic-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.tick_seconds + 5)
+            self._thread = None
+
+    def get_status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "jobs": [
+                {
+                    "name": job.name,
+                    "interval_seconds": job.interval,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "last_run_at": job.last_run_at,
+                    "last_duration_ms": job.last_duration_ms,
+                    "last_result": job.last_result,
+                    "last_error": job.last_error,
+                }
+                for job in self.jobs.values()
+            ],
+        }
+
+def create_scheduler(engine, session_factory) -> PeriodicScheduler:
+    return PeriodicScheduler(
+        session_factory=session_factory,
+        lock=create_leader_lock(engine),
+        tick_seconds=float(os.getenv("SCHEDULER_TICK_SECONDS", "5")),
+    )
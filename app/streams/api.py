@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.projects.models import Project
+from app.replicas import use_primary
+from app.users.auth import get_current_user_from_header
+from app.users.roles import UserRole
+from app.users.tokens import TokenPrincipal
+from .broker import STREAM_QUEUE_SIZE, BrokerFull, Subscription, broker
+
+router = APIRouter()
+
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+STREAM_VISIBILITY_REFRESH_SECONDS = 60  # Picks up project (re)assignments on open streams
+STREAM_RETRY_MS = 3000  # Reconnect delay suggested to EventSource
+
+ALL_PROJECT_ROLES = {UserRole.SUPERADMIN.value, UserRole.BUSINESS_ADMIN.value, UserRole.CLERK.value}
+PROJECT_ROLE_COLUMNS = {
+    UserRole.PROJECT_MANAGER.value: Project.project_manager_id,
+    UserRole.ACCOUNTANT.value: Project.accountant_id,
+    UserRole.CLIENT.value: Project.client_id,
+}
+
+def visible_project_ids(user: TokenPrincipal) -> Optional[set]:
+    """Projects whose events the user receives (None: all of them)"""
+    if str(user.role) in ALL_PROJECT_ROLES:
+        return None
+    column = PROJECT_ROLE_COLUMNS.get(str(user.role))
+    if column is None:
+        return set()
+    db = SessionLocal()
+    try:
+        return set(db.scalars(select(Project.id).where(column == user.id, Project.deleted_at.is_(None))))
+    finally:
+        db.close()
+
+def replay_events(after_id: int, subscription: Subscription) -> list[dict]:
+    db = SessionLocal()
+    try:
+        return broker.replay(db, after_id, subscription)
+    finally:
+        db.close()
+
+def format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+async def event_source(user: TokenPrincipal, subscription: Subscription, backlog: list[dict]):
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        replayed = set()
+        for event in backlog:
+            replayed.add(event["id"])
+            yield format_event(event)
+        if len(backlog) >= STREAM_QUEUE_SIZE:
+            return  # A full replay page may end before the live events: the client resumes from the last one sent
+        refreshed = time.monotonic()
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                event = None
+            if subscription.overflowed:
+                return  # Too far behind: the client reconnects with Last-Event-ID and replays from the table
+            if event is not None and event["id"] not in replayed:  # Committed during the replay query
+                yield format_event(event)
+            if subscription.project_ids is not None and time.monotonic() - refreshed > STREAM_VISIBILITY_REFRESH_SECONDS:
+                subscription.project_ids = await run_in_threadpool(visible_project_ids, user)
+                refreshed = time.monotonic()
+    finally:
+        broker.unsubscribe(subscription)
+
+@router.get("/stream")
+@use_primary  # Replay must see every event the broker may already have pushed
+async def stream_events(
+    access_token: Optional[str] = Query(None, description="Access token, for EventSource clients that cannot set headers"),
+    last_event_id: Optional[int] = Query(None, description="Resume after this event id (or send Last-Event-ID)"),
+    authorization: Optional[str] = Header(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-sent events for purchase/change order status changes, new
+    transactions, budget updates and task status changes on the projects the
+    user can see. A heartbeat comment is sent every STREAM_HEARTBEAT_SECONDS.
+    Each event's `id` can be passed back as Last-Event-ID to resume after a
+    disconnect (events are kept for STREAM_RETENTION_HOURS). A resume sends
+    at most STREAM_QUEUE_SIZE stored events; when there are more, the stream
+    closes after them and EventSource reconnects from the last one.
+    """
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+    user = await get_current_user_from_header(authorization)
+
+    resume_from = last_event_id
+    if last_event_id_header:
+        try:
+            resume_from = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Last-Event-ID must be an event id")
+
+    project_ids = await run_in_threadpool(visible_project_ids, user)
+    try:
+        subscription = broker.subscribe(asyncio.get_running_loop(), project_ids)
+    except BrokerFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open event streams, please retry shortly",
+            headers={"Retry-After": str(STREAM_RETRY_MS // 1000)},
+        )
+    try:
+        # Subscribed first, so nothing committed during the replay is missed
+        backlog = await run_in_threadpool(replay_events, resume_from, subscription) if resume_from is not None else []
+    except BaseException:
+        broker.unsubscribe(subscription)
+        raise
+
+    return StreamingResponse(
+        event_source(user, subscription, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,291 @@
+"""
+Live event broker
+
+Each worker runs one broker thread serving all of its /events/stream
+connections. Events themselves live in the live_events table; workers only
+tell each other that new rows were committed:
+
+* every broker binds a Unix datagram socket `<pid>.sock` in
+  STREAM_SOCKET_DIR. After a commit that wrote events, `notify()` sends one
+  byte to every socket in the directory (stale sockets of dead workers are
+  removed). This is the single-host stand-in for PostgreSQL LISTEN/NOTIFY,
+  which the pg8000 driver cannot wait on,
+* on a wakeup, the broker reads the rows after the last id it saw - one query
+  per worker, not per connection - and hands each one to the subscribers
+  allowed to see its project,
+* while it has subscribers the broker also polls every STREAM_POLL_SECONDS,
+  which covers workers on other hosts and lost datagrams.
+
+On PostgreSQL ids are assigned before commit, so a transaction can commit an
+id lower than one already delivered. Such gaps are re-checked for
+STREAM_GAP_SECONDS before they are given up as rolled back.
+"""
+import asyncio
+import glob
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func
+
+from .models import LiveEvent
+
+logger = logging.getLogger(__name__)
+
+STREAM_SOCKET_DIR = os.getenv("STREAM_SOCKET_DIR", "/tmp/buildbuzz-events")
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "2"))
+STREAM_MAX_SUBSCRIBERS = int(os.getenv("STREAM_MAX_SUBSCRIBERS", "500"))  # Per worker
+STREAM_QUEUE_SIZE = 1000  # Undelivered events per connection before it is closed (the client resumes)
+STREAM_GAP_SECONDS = 30
+STREAM_READ_BATCH = 500
+STREAM_RETENTION_HOURS = float(os.getenv("STREAM_RETENTION_HOURS", "24"))  # How far back clients can resume
+
+class BrokerFull(Exception):
+    """This worker already serves STREAM_MAX_SUBSCRIBERS streams"""
+
+def event_dict(row: LiveEvent) -> dict:
+    return {
+        "id": row.id,
+        "event": row.event_type,
+        "project_id": row.project_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "data": row.payload,
+    }
+
+class Subscription:
+    """One stream connection: its event queue (on its event loop) and visible projects"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, project_ids: Optional[set], queue_size: int = STREAM_QUEUE_SIZE):
+        self.loop = loop
+        self.project_ids = project_ids  # None: every project
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def can_see(self, project_id: Optional[int]) -> bool:
+        return self.project_ids is None or project_id in self.project_ids
+
+    def _offer(self, event: dict):
+        # Runs on the subscription's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True  # The stream closes; the client resumes from its last event id
+
+class EventBroker:
+    def __init__(self, session_factory, socket_dir: str = STREAM_SOCKET_DIR, poll_seconds: float = STREAM_POLL_SECONDS,
+                 max_subscribers: int = STREAM_MAX_SUBSCRIBERS):
+        self.session_factory = session_factory
+        self.socket_dir = socket_dir
+        self.poll_seconds = poll_seconds
+        self.max_subscribers = max_subscribers
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()  # Used when no socket could be bound
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._socket: Optional[socket.socket] = None
+        self._socket_path: Optional[str] = None
+        self._last_id: Optional[int] = None
+        self._gaps: dict[int, float] = {}  # Missing id -> when first noticed
+
+    # ===============================
+    # SUBSCRIPTIONS
+    # ===============================
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop, project_ids: Optional[set]) -> Subscription:
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull()
+            subscription = Subscription(loop, project_ids)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def replay(self, db, after_id: int, subscription: Subscription, limit: int = STREAM_QUEUE_SIZE) -> list[dict]:
+        """Stored events after after_id that the subscription may see (resume after reconnect)"""
+        query = db.query(LiveEvent).filter(LiveEvent.id > after_id)
+        if subscription.project_ids is not None:
+            query = query.filter(LiveEvent.project_id.in_(subscription.project_ids))
+        return [event_dict(row) for row in query.order_by(LiveEvent.id).limit(limit).all()]
+
+    # ===============================
+    # WAKEUPS
+    # ===============================
+
+    def notify(self):
+        """Wake the brokers of all workers on this host (called after a commit wrote events)"""
+        sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) if hasattr(socket, "AF_UNIX") else None
+        if sender is None:
+            self._wakeup.set()
+            return
+        try:
+            sender.setblocking(False)
+            for path in glob.glob(os.path.join(self.socket_dir, "*.sock")):
+                try:
+                    sender.sendto(b"1", path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    try:
+                        os.unlink(path)  # Worker gone
+                    except OSError:
+                        pass
+                except BlockingIOError:
+                    pass  # Its buffer is full of wakeups already
+                except OSError:
+                    logger.debug("Could not wake event broker at %s", path, exc_info=True)
+        finally:
+            sender.close()
+        if self._socket is None:
+            self._wakeup.set()
+
+    def _bind(self):
+        if not hasattr(socket, "AF_UNIX"):
+            return
+        try:
+            os.makedirs(self.socket_dir, exist_ok=True)
+            path = os.path.join(self.socket_dir, f"{os.getpid()}.sock")
+            if os.path.exists(path):
+                os.unlink(path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+            sock.settimeout(self.poll_seconds)
+            self._socket, self._socket_path = sock, path
+        except OSError:
+            logger.warning("Event broker socket unavailable in %s; polling every %ss", self.socket_dir, self.poll_seconds)
+
+    def _wait(self) -> bool:
+        """Block until a wakeup or the poll interval; True when woken"""
+        if self._socket is None:
+            woken = self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+            return woken
+        try:
+            self._socket.recv(16)
+        except (socket.timeout, OSError):
+            return False
+        self._socket.setblocking(False)  # Collapse queued wakeups into this one
+        try:
+            while True:
+                self._socket.recv(16)
+        except OSError:
+            pass
+        finally:
+            self._socket.settimeout(self.poll_seconds)
+        return True
+
+    # ===============================
+    # DISPATCH
+    # ===============================
+
+    def _fan_out(self, events: list[dict]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            for event in events:
+                if subscription.can_see(event["project_id"]):
+                    try:
+                        subscription.loop.call_soon_threadsafe(subscription._offer, event)
+                    except RuntimeError:
+                        self.unsubscribe(subscription)  # Its event loop is closed
+                        break
+
+    def dispatch(self):
+        """Deliver events committed since the last call"""
+        db = self.session_factory()
+        try:
+            if self._last_id is None or not self._subscribers:
+                # Nobody listening: only keep up with the newest id
+                self._last_id = db.query(func.max(LiveEvent.id)).scalar() or 0
+                self._gaps.clear()
+                return
+            events = []
+            if self._gaps:
+                now = time.monotonic()
+                rows = db.query(LiveEvent).filter(LiveEvent.id.in_(list(self._gaps))).all()
+                for row in rows:
+                    del self._gaps[row.id]
+                    events.append(event_dict(row))
+                self._gaps = {key: noticed for key, noticed in self._gaps.items() if now - noticed < STREAM_GAP_SECONDS}
+            while True:
+                rows = db.query(LiveEvent).filter(LiveEvent.id > self._last_id).order_by(LiveEvent.id).limit(STREAM_READ_BATCH).all()
+                now = time.monotonic()
+                for row in rows:
+                    for missing in range(self._last_id + 1, row.id):
+                        self._gaps[missing] = now
+                    self._last_id = row.id
+                    events.append(event_dict(row))
+                if len(rows) < STREAM_READ_BATCH:
+                    break
+            if events:
+                self._fan_out(events)
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.is_set():
+            woken = self._wait()
+            if self._stop.is_set():
+                break
+            if not woken and not self._subscribers:
+                continue
+            try:
+                self.dispatch()
+            except Exception:
+                logger.exception("Event broker dispatch failed")
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._bind()
+            try:
+                self.dispatch()  # Record the newest id
+            except Exception:
+                logger.exception("Event broker could not read live_events")
+            self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._socket_path:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+                    sender.sendto(b"1", self._socket_path)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+            self._socket_path = None
+
+def purge_live_events(db, older_than_hours: float = STREAM_RETENTION_HOURS) -> int:
+    """Delete events older than the resume window"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
+    deleted = db.query(LiveEvent).filter(LiveEvent.created_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def _create_broker() -> EventBroker:
+    from app.database import SessionLocal
+    return EventBroker(SessionLocal)
+
+broker = _create_broker()
@@ -0,0 +1,180 @@
+"""
+Live event capture
+
+after_flush turns the changes clients watch into live_events rows, inserted
+on the flushing connection so they commit or roll back with the change:
+
+* purchase_order.status / change_order.status - status of an order changed
+* transaction.created - a ledger transaction was recorded
+* task.status - status of a task changed
+* task.budget, project.budget - remaining task budget or project planned /
+  actual budget changed
+* budget.alert - a budget threshold alert was raised (alerts/engine.py)
+
+after_commit then wakes the event brokers. Bulk task updates by primary key
+(PATCH /tasks/bulk) skip the flush; do_orm_execute reads the tasks' current
+status and budget first and writes their task.* events the same way.
+Criteria-based statements (project purge) produce no events.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.alerts.models import BudgetAlert
+from app.finance.models import ChangeOrder, PurchaseOrder, Transaction
+from app.projects.models import Project, Task
+from .broker import broker
+from .models import LiveEvent
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _change(obj, key):
+    """(before, after) of an attribute changed in this flush, else None"""
+    history = inspect(obj).attrs[key].history
+    if not history.has_changes():
+        return None
+    before = history.deleted[0] if history.deleted else None
+    after = history.added[0] if history.added else None
+    if before == after:
+        return None
+    return _json_value(before), _json_value(after)
+
+def _task_project_id(session: Session, task_id):
+    task = session.identity_map.get(session.identity_key(Task, task_id))
+    if task is not None:
+        return task.project_id
+    return session.connection().scalar(select(Task.project_id).where(Task.id == task_id))
+
+def _order_event(session: Session, order, number: str, prefix: str):
+    change = _change(order, "status")
+    if change is None:
+        return None
+    return {
+        "event_type": f"{prefix}.status",
+        "project_id": _task_project_id(session, order.task_id),
+        "payload": {"id": order.id, "number": number, "task_id": order.task_id, "from": change[0], "to": change[1]},
+    }
+
+def _updated_events(session: Session, obj) -> list[dict]:
+    if isinstance(obj, PurchaseOrder):
+        event_row = _order_event(session, obj, obj.po_number, "purchase_order")
+        return [event_row] if event_row else []
+    if isinstance(obj, ChangeOrder):
+        event_row = _order_event(session, obj, obj.co_number, "change_order")
+        return [event_row] if event_row else []
+    events = []
+    if isinstance(obj, Task):
+        for key in ("status", "budget"):
+            change = _change(obj, key)
+            if change is not None:
+                events.append({
+                    "event_type": f"task.{key}",
+                    "project_id": obj.project_id,
+                    "payload": {"id": obj.id, "name": obj.name, "component_id": obj.component_id,
+                                "from": change[0], "to": change[1]},
+                })
+    elif isinstance(obj, Project):
+        changes = {key: _change(obj, key) for key in ("planned_budget", "actual_budget")}
+        changes = {key: list(change) for key, change in changes.items() if change is not None}
+        if changes:
+            events.append({"event_type": "project.budget", "project_id": obj.id, "payload": {"id": obj.id, **changes}})
+    return events
+
+def _transaction_event(transaction: Transaction) -> dict:
+    return {
+        "event_type": "transaction.created",
+        "project_id": transaction.project_id,
+        "payload": {
+            "id": transaction.id,
+            "number": transaction.transaction_number,
+            "task_id": transaction.task_id,
+            "transaction_type": transaction.transaction_type,
+            "source_number": transaction.source_number,
+            "amount": _json_value(transaction.amount),
+            "impact_type": transaction.impact_type,
+            "budget_before": _json_value(transaction.budget_before),
+            "budget_after": _json_value(transaction.budget_after),
+        },
+    }
+
+def _alert_event(alert: BudgetAlert) -> dict:
+    return {
+        "event_type": "budget.alert",
+        "project_id": alert.project_id,
+        "payload": {
+            "id": alert.id,
+            "alert_type": alert.alert_type,
+            "task_id": alert.task_id,
+            "threshold": _json_value(alert.threshold),
+            "message": alert.message,
+        },
+    }
+
+# ===============================
+# SESSION EVENTS
+# ===============================
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    events = [_transaction_event(obj) for obj in session.new if isinstance(obj, Transaction)]
+    events.extend(_alert_event(obj) for obj in session.new if isinstance(obj, BudgetAlert))
+    for obj in session.dirty:
+        if isinstance(obj, (PurchaseOrder, ChangeOrder, Task, Project)):
+            events.extend(_updated_events(session, obj))
+    if events:
+        session.connection().execute(LiveEvent.__table__.insert(), events)
+        session.info["live_events_written"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state: ORMExecuteState):
+    rows = orm_execute_state.parameters
+    if not orm_execute_state.is_update or not isinstance(rows, list) or not rows:
+        return None
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None or mapper.class_ is not Task:
+        return None
+    keys = [key for key in ("status", "budget") if any(key in row for row in rows)]
+    if not keys:
+        return None
+    session = orm_execute_state.session
+    current = {
+        task.id: task
+        for task in session.connection().execute(
+            select(Task.id, Task.project_id, Task.name, Task.component_id, Task.status, Task.budget)
+            .where(Task.id.in_({row["id"] for row in rows}))
+        )
+    }
+    events = []
+    for row in rows:
+        task = current.get(row["id"])
+        if task is None:
+            continue
+        for key in keys:
+            if key in row and row[key] != getattr(task, key):
+                events.append({
+                    "event_type": f"task.{key}",
+                    "project_id": task.project_id,
+                    "payload": {"id": task.id, "name": row.get("name", task.name),
+                                "component_id": row.get("component_id", task.component_id),
+                                "from": _json_value(getattr(task, key)), "to": _json_value(row[key])},
+                })
+    if events:
+        session.connection().execute(LiveEvent.__table__.insert(), events)
+        session.info["live_events_written"] = True
+    return None
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("live_events_written", False):
+        broker.notify()
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("live_events_written", None)
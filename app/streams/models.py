@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, JSON, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class LiveEvent(Base):
+    """
+    Change pushed to /events/stream clients. Written in the same transaction as
+    the change (so only committed changes are announced) and kept for
+    STREAM_RETENTION_HOURS so reconnecting clients can resume by event id.
+    """
+    __tablename__ = "live_events"
+
+    id = Column(Integer, primary_key=True, index=True)  # SSE event id, increasing
+    event_type = Column(String(50), nullable=False)  # e.g. task.status, purchase_order.status, transaction.created
+    project_id = Column(Integer, nullable=True, index=True)  # Visibility scope; no FK, events outlive purged projects
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,32 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.replicas import use_primary
+from . import schemas
+from .tracking import SYNCED_ENTITIES, WATERMARK_HEADER, current_watermark, tombstones_since
+
+router = APIRouter()
+
+# ===============================
+# DELETIONS
+# ===============================
+
+@router.get("/deleted", response_model=List[schemas.SyncTombstone])
+@use_primary  # Hands out a watermark, see app/sync/tracking.py
+def read_deleted(
+    response: Response,
+    updated_since: datetime,
+    entity: Optional[List[str]] = Query(None, description="Only these entities (repeatable); all synced entities by default"),
+    skip: int = 0,
+    limit: int = 1000,
+    db: Session = Depends(get_db)
+):
+    """Rows removed from synced lists at or after updated_since (410: too old, do a full sync)"""
+    unknown = set(entity or ()) - SYNCED_ENTITIES
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown entity; synced: {', '.join(sorted(SYNCED_ENTITIES))}")
+    response.headers[WATERMARK_HEADER] = current_watermark(db)
+    return tombstones_since(db, updated_since, entity, skip=skip, limit=min(limit, 5000))
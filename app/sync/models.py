@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class SyncTombstone(Base):
+    """
+    Row removed from a synced list (deleted, or a soft-deleted project), so
+    delta-sync clients can drop their local copy. Kept for
+    SYNC_TOMBSTONE_RETENTION_DAYS.
+    """
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        Index("ix_sync_tombstones_entity", "entity", "deleted_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String(50), nullable=False)  # project, task, purchase_order, ...
+    entity_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=True)  # No FK: the project may be purged too
+    deleted_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), index=True)
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+# ===============================
+# SYNC SCHEMAS
+# ===============================
+
+class SyncTombstone(BaseModel):
+    entity: str
+    entity_id: int
+    project_id: Optional[int] = None
+    deleted_at: datetime
+
+    class Config:
+        from_attributes = True
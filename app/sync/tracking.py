@@ -0,0 +1,163 @@
+"""
+Delta sync
+
+List endpoints of synced entities accept `updated_since` and answer with an
+X-Sync-Watermark header. Clients store the watermark and pass it back as
+`updated_since` next time. Then only rows changed since are returned,
+ordered by (updated_at, id). Deletions come from GET /sync/deleted.
+
+* `updated_at` is set on insert as well as on update (it used to be NULL
+  until the first update). `ensure_sync_schema` backfills old rows from
+  created_at.
+* Requests that hand out a watermark read from the primary. A lagging
+  replica would miss rows committed just before the watermark, and the next
+  sync would never ask for them again.
+* The watermark is the app server's clock minus SYNC_OVERLAP_SECONDS (clock
+  skew to the database). On PostgreSQL it is also never later than the
+  start of the oldest open transaction. now() is the transaction start, so a
+  long transaction commits rows with an updated_at before the watermark of
+  syncs that ran while it was open. Rows in the overlap are sent twice;
+  clients upsert by id.
+* SQLite stores whole-second timestamps, so `updated_since` is compared to
+  the second.
+
+Set-based statements (bulk task updates, template cloning, project purge)
+set updated_at through the column's onupdate/default as well. Purged rows of
+soft-deleted projects get no tombstones of their own; the project's
+tombstone covers them.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, Response
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.finance.models import ChangeOrder, PurchaseOrder, Transaction
+from app.projects.models import Project, ProjectComponent, Task
+from app.workforce.models import Worker
+from app.replicas import read_from_primary
+from .models import SyncTombstone
+
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+WATERMARK_HEADER = "X-Sync-Watermark"
+
+# Start of the oldest transaction other than ours (rows it writes get updated_at >= this)
+OLDEST_TRANSACTION_QUERY = text(
+    "SELECT min(xact_start) FROM pg_stat_activity "
+    "WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid()"
+)
+
+# Mapped class -> entity name in tombstones
+SYNCED_MODELS = {
+    Project: "project",
+    ProjectComponent: "project_component",
+    Task: "task",
+    Worker: "worker",
+    PurchaseOrder: "purchase_order",
+    ChangeOrder: "change_order",
+    Transaction: "transaction",
+}
+SYNCED_ENTITIES = set(SYNCED_MODELS.values())
+
+# ===============================
+# WATERMARKS AND FILTERS
+# ===============================
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def current_watermark(db: Session) -> str:
+    """Watermark for a sync whose rows are read after this call (on the primary)"""
+    watermark = datetime.now(timezone.utc) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    if db.get_bind().dialect.name == "postgresql":
+        oldest = db.execute(OLDEST_TRANSACTION_QUERY).scalar()
+        if oldest is not None:
+            watermark = min(watermark, _utc(oldest))
+    return watermark.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def sync_window(
+    response: Response,
+    updated_since: Optional[datetime] = Query(
+        None, description="Only rows changed at or after this time (the X-Sync-Watermark of the previous sync)"
+    ),
+    db: Session = Depends(get_db),
+) -> Optional[datetime]:
+    """Dependency for synced list endpoints: moves the request's reads to the primary, sets the watermark header (before the query runs) and returns updated_since"""
+    read_from_primary()
+    response.headers[WATERMARK_HEADER] = current_watermark(db)
+    return _utc(updated_since) if updated_since is not None else None
+
+def _since_bound(updated_since: datetime) -> datetime:
+    # Whole seconds: SQLite's text timestamps have no fraction, and "12:00:05" < "12:00:05.000000" as text
+    return _utc(updated_since).replace(microsecond=0) - timedelta(seconds=1)
+
+def changed_since(query, model, updated_since: Optional[datetime]):
+    """Restrict a list query to rows changed at or after updated_since, oldest change first"""
+    if updated_since is None:
+        return query
+    return query.filter(model.updated_at > _since_bound(updated_since)).order_by(model.updated_at, model.id)
+
+def tombstones_since(db: Session, updated_since: datetime, entities: Optional[list] = None, skip: int = 0, limit: int = 1000):
+    """Tombstones at or after updated_since; 410 when that is older than the retention window"""
+    horizon = datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    if _utc(updated_since) < horizon:
+        raise HTTPException(status_code=410, detail="updated_since is older than the deletion history; do a full sync")
+    query = db.query(SyncTombstone).filter(SyncTombstone.deleted_at > _since_bound(updated_since)).order_by(
+        SyncTombstone.deleted_at, SyncTombstone.id
+    )
+    if entities:
+        query = query.filter(SyncTombstone.entity.in_(entities))
+    return query.offset(skip).limit(limit).all()
+
+def purge_tombstones(db: Session, older_than_days: int = SYNC_TOMBSTONE_RETENTION_DAYS) -> int:
+    """Delete tombstones past the retention window"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    deleted = db.query(SyncTombstone).filter(SyncTombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+# ===============================
+# TOMBSTONES
+# ===============================
+
+def _project_id(obj):
+    return obj.id if isinstance(obj, Project) else getattr(obj, "project_id", None)
+
+@event.listens_for(Session, "before_flush")
+def _collect_tombstones(session, flush_context, instances):
+    # Before the flush: deleted_at = func.now() is expired (history gone) once it has been written
+    rows = [
+        {"entity": SYNCED_MODELS[type(obj)], "entity_id": obj.id, "project_id": _project_id(obj)}
+        for obj in session.deleted if type(obj) in SYNCED_MODELS
+    ]
+    for obj in session.dirty:
+        if isinstance(obj, Project):
+            history = inspect(obj).attrs.deleted_at.history
+            if history.added and history.added[0] is not None and all(value is None for value in history.deleted):
+                rows.append({"entity": "project", "entity_id": obj.id, "project_id": obj.id})  # Soft delete
+    session.info["sync_tombstones"] = rows
+
+@event.listens_for(Session, "after_flush")
+def _record_tombstones(session, flush_context):
+    rows = session.info.pop("sync_tombstones", None)
+    if rows:
+        session.connection().execute(SyncTombstone.__table__.insert(), rows)
+
+# ===============================
+# SCHEMA
+# ===============================
+
+def ensure_sync_schema(engine):
+    """Give existing tables an updated_at default and backfill rows that never had one"""
+    with engine.begin() as conn:
+        for model in SYNCED_MODELS:
+            table = model.__tablename__
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN updated_at SET DEFAULT now()"))
+            conn.execute(text(
+                f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+            ))
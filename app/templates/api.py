@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+from app.users.auth import require_admin_role
+from app.users.tokens import TokenPrincipal
+from . import crud, schemas
+
+router = APIRouter()
+
+# ===============================
+# PROJECT TEMPLATES
+# ===============================
+
+@router.post("/", response_model=schemas.ProjectTemplate)
+def create_template(
+    template: schemas.ProjectTemplateCreate,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Snapshot an existing project's component tree and tasks as a template"""
+    db_template = crud.create_template(db, template, created_by_id=current_user.id)
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="Source project not found")
+    return db_template
+
+@router.get("/", response_model=List[schemas.ProjectTemplate])
+def read_templates(
+    project_type_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """List templates, newest first, optionally for one project type"""
+    return crud.get_templates(db, project_type_id=project_type_id, skip=skip, limit=limit)
+
+@router.get("/{template_id}", response_model=schemas.ProjectTemplate)
+def read_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Get template by ID"""
+    db_template = crud.get_template(db, template_id)
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return db_template
+
+@router.delete("/{template_id}")
+def delete_template(
+    template_id: int,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Delete template by ID (projects created from it are not affected)"""
+    db_template = crud.delete_template(db, template_id)
+    if db_template is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return {"detail": "Template deleted successfully"}
+
+@router.post("/{template_id}/instantiate", response_model=schemas.ProjectTemplateInstance)
+def instantiate_template(
+    template_id: int,
+    request: schemas.ProjectTemplateInstantiate,
+    db: Session = Depends(get_db),
+    current_user: TokenPrincipal = Depends(require_admin_role)
+):
+    """Create a new project from a template, shifting dates to start_date and scaling budgets"""
+    instance = crud.instantiate_template(db, template_id, request)
+    if instance is None:
+        raise HTTPException(status_code=404, detail="Template not found")
+    return instance
@@ -0,0 +1,244 @@
+"""
+Project templates
+
+`create_template` snapshots a project's component tree and tasks into one JSON
+row. Dates become day offsets from the project start and budgets are kept as
+strings. Task.budget is the remaining budget (purchase and change order
+transactions overwrite it), so a task with ledger transactions is
+snapshotted with the budget_before of its first transaction - its budget
+as allocated, before anything was spent or changed.
+
+`instantiate_template` builds a new project from a template in one
+transaction. It inserts the project, then reserves primary keys for all
+components so each component's parent_id can be mapped before anything is
+written. Components and then tasks go in with one executemany each, instead
+of one ORM add (and @validates lazy load) per row. Shifting every date by the
+same amount keeps the source project's date containment valid.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.finance.models import Transaction
+from app.projects import models as project_models
+from . import models, schemas
+
+CENTS = Decimal("0.01")
+
+def _allocated_budgets(db: Session, project_id: int) -> dict:
+    """task id -> budget before the task's first ledger transaction (tasks with transactions only)"""
+    first = select(func.min(Transaction.id)).where(Transaction.project_id == project_id).group_by(Transaction.task_id)
+    return dict(db.execute(
+        select(Transaction.task_id, Transaction.budget_before).where(Transaction.id.in_(first))
+    ).all())
+
+def _budget_string(value) -> Optional[str]:
+    return str(value) if value is not None else None
+
+def _offset(value: Optional[date], base: Optional[date]) -> Optional[int]:
+    return (value - base).days if value is not None and base is not None else None
+
+def _shift(offset: Optional[int], start: date) -> Optional[date]:
+    return start + timedelta(days=offset) if offset is not None else None
+
+def _scale(amount: Optional[str], scale: Decimal) -> Optional[Decimal]:
+    return (Decimal(amount) * scale).quantize(CENTS) if amount is not None else None
+
+def _parents_first(components: list) -> list:
+    """Components ordered so every parent precedes its children"""
+    ids = {component.id for component in components}
+    children = defaultdict(list)
+    for component in components:
+        children[component.parent_id if component.parent_id in ids else None].append(component)
+    ordered, queue = [], list(children[None])
+    while queue:
+        component = queue.pop(0)
+        ordered.append(component)
+        queue.extend(children[component.id])
+    seen = {component.id for component in ordered}
+    return ordered + [component for component in components if component.id not in seen]  # Parent cycles
+
+# ===============================
+# SNAPSHOTS
+# ===============================
+
+def create_template(db: Session, template: schemas.ProjectTemplateCreate, created_by_id: Optional[int] = None):
+    project = db.query(project_models.Project).filter(
+        project_models.Project.id == template.source_project_id, project_models.Project.deleted_at.is_(None)
+    ).first()
+    if project is None:
+        return None
+    components = db.query(project_models.ProjectComponent).filter(
+        project_models.ProjectComponent.project_id == project.id
+    ).order_by(project_models.ProjectComponent.id).all()
+    tasks = db.query(project_models.Task).filter(
+        project_models.Task.project_id == project.id
+    ).order_by(project_models.Task.id).all()
+    allocated = _allocated_budgets(db, project.id)
+
+    dates = [d for row in [*components, *tasks] for d in (row.start_date, row.end_date) if d is not None]
+    base = project.start_date or (min(dates) if dates else None)
+    ordered = _parents_first(components)
+    keys = {component.id: key for key, component in enumerate(ordered)}
+
+    snapshot = {
+        "components": [
+            {
+                "key": keys[component.id],
+                "parent_key": keys.get(component.parent_id),
+                "name": component.name,
+                "description": component.description,
+                "budget": str(component.budget) if component.budget is not None else None,
+                "start_offset": _offset(component.start_date, base),
+                "end_offset": _offset(component.end_date, base),
+            }
+            for component in ordered
+        ],
+        "tasks": [
+            {
+                "component_key": keys.get(task.component_id),
+                "name": task.name,
+                "description": task.description,
+                "priority": task.priority,
+                "task_type": task.task_type,
+                "budget": _budget_string(allocated.get(task.id, task.budget)),
+                "start_offset": _offset(task.start_date, base),
+                "end_offset": _offset(task.end_date, base),
+            }
+            for task in tasks
+        ],
+    }
+
+    db_template = models.ProjectTemplate(
+        name=template.name,
+        description=template.description,
+        project_type_id=project.project_type_id,
+        source_project_id=project.id,
+        created_by_id=created_by_id,
+        duration_days=_offset(project.end_date, base),
+        planned_budget=project.planned_budget,
+        component_count=len(components),
+        task_count=len(tasks),
+        snapshot=snapshot,
+    )
+    db.add(db_template)
+    db.commit()
+    db.refresh(db_template)
+    return db_template
+
+def get_templates(db: Session, project_type_id: Optional[int] = None, skip: int = 0, limit: int = 100):
+    query = db.query(models.ProjectTemplate)
+    if project_type_id is not None:
+        query = query.filter(models.ProjectTemplate.project_type_id == project_type_id)
+    return query.order_by(models.ProjectTemplate.id.desc()).offset(skip).limit(limit).all()
+
+def get_template(db: Session, template_id: int):
+    return db.query(models.ProjectTemplate).filter(models.ProjectTemplate.id == template_id).first()
+
+def delete_template(db: Session, template_id: int):
+    db_template = get_template(db, template_id)
+    if db_template:
+        db.delete(db_template)
+        db.commit()
+    return db_template
+
+# ===============================
+# INSTANTIATION
+# ===============================
+
+def allocate_ids(db: Session, model, count: int) -> list[int]:
+    """Reserve `count` primary keys of `model`'s table inside the current transaction"""
+    if count <= 0:
+        return []
+    table = model.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        sequence = func.pg_get_serial_sequence(table.name, "id")
+        query = select(func.nextval(sequence)).select_from(func.generate_series(1, count))
+        return list(db.scalars(query.execution_options(use_primary=True)))  # nextval() writes
+    # SQLite: the transaction holds the database write lock since the project insert, so max(id) cannot move
+    start = (db.query(func.max(model.id)).scalar() or 0) + 1
+    return list(range(start, start + count))
+
+def _budget_scale(template, request: schemas.ProjectTemplateInstantiate) -> Decimal:
+    if request.budget_scale is not None:
+        return request.budget_scale
+    if request.planned_budget is not None and template.planned_budget:
+        return Decimal(request.planned_budget) / Decimal(template.planned_budget)
+    return Decimal(1)
+
+def instantiate_template(db: Session, template_id: int, request: schemas.ProjectTemplateInstantiate):
+    """Create a project from a template; returns a summary dict, or None if the template does not exist"""
+    template = get_template(db, template_id)
+    if template is None:
+        return None
+    scale = _budget_scale(template, request)
+    planned_budget = request.planned_budget
+    if planned_budget is None and template.planned_budget is not None:
+        planned_budget = (Decimal(template.planned_budget) * scale).quantize(CENTS)
+
+    project = project_models.Project(
+        name=request.name,
+        description=request.description,
+        start_date=request.start_date,
+        end_date=_shift(template.duration_days, request.start_date),
+        planned_budget=planned_budget,
+        status=request.status,
+        client_id=request.client_id,
+        project_manager_id=request.project_manager_id,
+        accountant_id=request.accountant_id,
+        project_type_id=template.project_type_id,
+    )
+    db.add(project)
+    db.flush()
+
+    components = template.snapshot.get("components", [])
+    component_ids = allocate_ids(db, project_models.ProjectComponent, len(components))
+    ids_by_key = {component["key"]: component_id for component, component_id in zip(components, component_ids)}
+    component_rows = [
+        {
+            "id": ids_by_key[component["key"]],
+            "project_id": project.id,
+            "parent_id": ids_by_key.get(component["parent_key"]),
+            "name": component["name"],
+            "description": component["description"],
+            "budget": _scale(component["budget"], scale),
+            "status": "planned",
+            "start_date": _shift(component["start_offset"], request.start_date),
+            "end_date": _shift(component["end_offset"], request.start_date),
+        }
+        for component in components  # Parents first, so self-referencing FKs are satisfied row by row
+    ]
+    task_rows = [
+        {
+            "project_id": project.id,
+            "component_id": ids_by_key.get(task["component_key"]),
+            "name": task["name"],
+            "description": task["description"],
+            "status": "To Do",
+            "priority": task["priority"],
+            "task_type": task["task_type"],
+            "budget": _scale(task["budget"], scale),
+            "start_date": _shift(task["start_offset"], request.start_date),
+            "end_date": _shift(task["end_offset"], request.start_date),
+        }
+        for task in template.snapshot.get("tasks", [])
+    ]
+    if component_rows:
+        db.execute(insert(project_models.ProjectComponent), component_rows)
+    if task_rows:
+        db.execute(insert(project_models.Task), task_rows)
+    summary = {
+        "project_id": project.id,
+        "template_id": template.id,
+        "component_count": len(component_rows),
+        "task_count": len(task_rows),
+        "budget_scale": scale,
+        "start_date": project.start_date,
+        "end_date": project.end_date,
+    }
+    db.commit()
+    return summary
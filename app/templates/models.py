@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Text, Numeric
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+class ProjectTemplate(Base):
+    """
+    Snapshot of a project's component tree and tasks, reusable for new projects
+    of the same type. Dates are stored as day offsets from the source project's
+    start so they can be shifted to any new start date.
+    """
+    __tablename__ = "project_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(255), nullable=False, index=True)
+    description = Column(Text)
+    project_type_id = Column(Integer, ForeignKey("project_types.id"), nullable=True, index=True)
+    source_project_id = Column(Integer, ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    duration_days = Column(Integer)  # Source project length; None when it had no dates
+    planned_budget = Column(Numeric(15, 2))  # Source planned budget, the base for budget scaling
+    component_count = Column(Integer, nullable=False, default=0)
+    task_count = Column(Integer, nullable=False, default=0)
+    # {"components": [{"key", "parent_key", "name", ..., "start_offset", "end_offset"}], "tasks": [...]}
+    # Components are stored parents first.
+    snapshot = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    project_type = relationship("ProjectType")
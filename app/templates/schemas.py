@@ -0,0 +1,49 @@
+from pydantic import BaseModel, Field
+from datetime import datetime, date
+from typing import Optional
+from decimal import Decimal
+
+# ===============================
+# PROJECT TEMPLATE SCHEMAS
+# ===============================
+
+class ProjectTemplateCreate(BaseModel):
+    source_project_id: int = Field(..., description="Project whose components and tasks are snapshotted")
+    name: str
+    description: Optional[str] = None
+
+class ProjectTemplate(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    project_type_id: Optional[int] = None
+    source_project_id: Optional[int] = None
+    created_by_id: Optional[int] = None
+    duration_days: Optional[int] = None
+    planned_budget: Optional[Decimal] = None
+    component_count: int
+    task_count: int
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ProjectTemplateInstantiate(BaseModel):
+    name: str
+    description: Optional[str] = None
+    start_date: date = Field(..., description="Component and task dates are shifted to keep their offset from this date")
+    planned_budget: Optional[Decimal] = Field(None, description="Budgets are scaled by planned_budget / template budget")
+    budget_scale: Optional[Decimal] = Field(None, gt=0, description="Explicit budget multiplier (overrides planned_budget scaling)")
+    status: str = 'planned'
+    client_id: Optional[int] = None
+    project_manager_id: Optional[int] = None
+    accountant_id: Optional[int] = None
+
+class ProjectTemplateInstance(BaseModel):
+    project_id: int
+    template_id: int
+    component_count: int
+    task_count: int
+    budget_scale: Decimal
+    start_date: date
+    end_date: Optional[date] = None
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from . import crud, schemas
+from . import crud, schemas, tokens
 from .roles import RolePermissions, UserRole
+from ..bulkheads import bulkhead
 from ..database import get_db
 
 router = APIRouter()
@@ -38,20 +39,72 @@ def user_signup(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/login/", response_model=schemas.LoginResponse)
-def user_login(
+async def user_login(
     login_data: schemas.UserLogin, 
     db: Session = Depends(get_db)
 ):
     """Authenticate user and get navigation route based on role"""
     try:
-        user, navigation_route = crud.authenticate_user(db=db, login_data=login_data)
+        user, navigation_route = await crud.authenticate_user(db=db, login_data=login_data)
         return schemas.LoginResponse(
             user=user,
-            navigation_route=navigation_route
+            navigation_route=navigation_route,
+            **tokens.create_token_pair(user)
         )
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
 
+@router.post("/token/refresh/", response_model=schemas.TokenResponse)
+def refresh_access_token(
+    refresh_data: schemas.TokenRefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """Exchange a refresh token for a new token pair (the old refresh token is revoked)"""
+    try:
+        claims = tokens.decode_token(refresh_data.refresh_token, tokens.REFRESH)
+    except tokens.TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    
+    # Reload the user so role changes and deactivation are picked up
+    user = crud.get_user(db, int(claims["sub"]))
+    if not user or not getattr(user, 'is_active', False):
+        raise HTTPException(status_code=401, detail="User account is inactive")
+    
+    # Rotation: only the request whose revocation insert wins gets a new pair
+    try:
+        tokens.revoke_token(db, claims)
+    except tokens.TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    return tokens.create_token_pair(user)
+
+@router.post("/logout/")
+def user_logout(
+    refresh_data: Optional[schemas.TokenRefreshRequest] = None,
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Revoke the current access token and, if given, the refresh token"""
+    scheme, _, access_token = (authorization or "").partition(" ")
+    candidates = []
+    if scheme.lower() == "bearer" and access_token.strip():
+        candidates.append((access_token.strip(), tokens.ACCESS))
+    if refresh_data:
+        candidates.append((refresh_data.refresh_token, tokens.REFRESH))
+    
+    revoked = 0
+    for token, token_type in candidates:
+        try:
+            claims = tokens.decode_token(token, token_type)
+        except tokens.TokenError:
+            continue  # Already expired or revoked
+        try:
+            tokens.revoke_token(db, claims)
+        except tokens.TokenError:
+            continue  # Revoked concurrently
+        revoked += 1
+    
+    return {"message": "Logged out", "revoked_tokens": revoked}
+
 @router.get("/invitation/{token}/", response_model=schemas.User)
 def get_invitation_details(token: str, db: Session = Depends(get_db)):
     """Get invitation details by token for signup form"""
@@ -93,8 +146,8 @@ def expire_old_invitations(
     if str(requester.role) != UserRole.SUPERADMIN.value:
         raise HTTPException(status_code=403, detail="Only superadmin can expire invitations")
     
-    expired_count = crud.expire_old_invitations(db)
-    return {"message": f"Expired {expired_count} old invitations"}
+    expired_ids = crud.expire_old_invitations(db)
+    return {"message": f"Expired {len(expired_ids)} old invitations", "expired_user_ids": expired_ids}
 
 @router.get("/roles/", response_model=List[str])
 def get_available_roles(
@@ -225,6 +278,7 @@ def setup_user_account(account_setup: schemas.AccountSetup, db: Session = Depend
 # ===============================
 
 @router.get("/business-admin/overview/", response_model=dict)
+@bulkhead("reports")
 def get_business_overview(admin_id: int, db: Session = Depends(get_db)):
     """Business admin gets complete company overview"""
     admin = crud.get_user(db, user_id=admin_id)
@@ -267,6 +321,7 @@ def get_all_users_for_admin(admin_id: int, skip: int = 0, limit: int = 100, db:
 # ===============================
 
 @router.get("/clerk/overview/", response_model=dict)
+@bulkhead("reports")
 def get_clerk_overview(clerk_id: int, db: Session = Depends(get_db)):
     """Clerk gets company overview with user statistics"""
     clerk = crud.get_user(db, user_id=clerk_id)
@@ -310,6 +365,7 @@ def get_all_users_for_clerk(clerk_id: int, skip: int = 0, limit: int = 100, db:
 # ===============================
 
 @router.get("/admin/overview/", response_model=dict)
+@bulkhead("reports")
 def get_admin_overview(admin_id: int, db: Session = Depends(get_db)):
     """Get company overview for authorized admin users (business admin, clerk, or superadmin)"""
     admin = crud.get_user(db, user_id=admin_id)
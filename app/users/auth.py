@@ -5,6 +5,7 @@ from sqlalchemy.orm import Session
 from .crud import get_user_by_email, get_user
 from .models import User
 from .roles import UserRole, RolePermissions
+from .tokens import ACCESS, TokenError, TokenPrincipal, decode_token, principal_from_claims
 from ..database import get_db
 
 # ===============================
@@ -12,13 +13,12 @@ from ..database import get_db
 # ===============================
 
 async def get_current_user_from_header(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> User:
+    authorization: Optional[str] = Header(None)
+) -> TokenPrincipal:
     """
-    Get current user from authorization header
-    This is a placeholder for future JWT implementation
-    For now, expects "Bearer user_id" format
+    Get current user from a "Bearer <access token>" authorization header.
+    Verification is a signature check plus in-memory revocation lookup -
+    the user is described by the token claims, no database access.
     """
     if not authorization:
         raise HTTPException(
@@ -27,44 +27,37 @@ async def get_current_user_from_header(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication scheme",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
     try:
-        scheme, user_identifier = authorization.split()
-        if scheme.lower() != "bearer":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication scheme",
-            )
-        
-        # For now, treat user_identifier as user_id
-        # In production, this would be a JWT token
-        user_id = int(user_identifier)
-        user = get_user(db, user_id)
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
-        
-        if not getattr(user, 'is_active', False):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User account is inactive",
-            )
-        
-        if not getattr(user, 'account_setup_completed', False):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Account setup not completed",
-            )
-        
-        return user
-        
-    except (ValueError, AttributeError):
+        claims = decode_token(token.strip(), ACCESS)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = principal_from_claims(claims)
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User account is inactive",
+        )
+    
+    if not user.account_setup_completed:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authorization format",
+            detail="Account setup not completed",
         )
+    
+    return user
 
 async def get_current_user_from_email(
     user_email: str,
@@ -103,7 +96,7 @@ def require_role(required_role: UserRole):
     """
     Dependency factory to require specific role
     """
-    def role_checker(current_user: User = Depends(get_current_user_from_header)):
+    def role_checker(current_user: TokenPrincipal = Depends(get_current_user_from_header)):
         if str(current_user.role) != required_role.value:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -116,7 +109,7 @@ def require_roles(allowed_roles: list[UserRole]):
     """
     Dependency factory to require one of multiple roles
     """
-    def roles_checker(current_user: User = Depends(get_current_user_from_header)):
+    def roles_checker(current_user: TokenPrincipal = Depends(get_current_user_from_header)):
         if str(current_user.role) not in [role.value for role in allowed_roles]:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -129,7 +122,7 @@ def require_minimum_role(minimum_role: UserRole):
     """
     Dependency factory to require minimum role level
     """
-    def min_role_checker(current_user: User = Depends(get_current_user_from_header)):
+    def min_role_checker(current_user: TokenPrincipal = Depends(get_current_user_from_header)):
         if not RolePermissions.has_higher_or_equal_permission(str(current_user.role), minimum_role.value):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
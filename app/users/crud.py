@@ -1,10 +1,15 @@
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import Optional
 import secrets
 
+from fastapi.concurrency import run_in_threadpool
+
 from . import models, schemas
 from .roles import RolePermissions, UserRole
-from .password import hash_password, verify_password
+from .password import hash_password, password_hasher
+from .tokens import revoke_user_tokens
 
 # ===============================
 # BASIC USER OPERATIONS
@@ -37,6 +42,7 @@ def deactivate_user(db: Session, user_id: int):
         })
         db.commit()
         db.refresh(db_user)
+        revoke_user_tokens(db, user_id)  # Outstanding tokens still claim the account is active
     return db_user
 
 # ===============================
@@ -132,11 +138,9 @@ def complete_user_signup(db: Session, signup_data: schemas.UserSignup):
     
     return db_user
 
-def authenticate_user(db: Session, login_data: schemas.UserLogin):
-    """Authenticate user and return user with navigation route"""
-    
-    # Find user by email
-    db_user = get_user_by_email(db, login_data.email)
+def _check_login_user(db: Session, email: str):
+    """Look up a user for login and check the account can sign in"""
+    db_user = get_user_by_email(db, email)
     
     if not db_user:
         raise ValueError("User not found")
@@ -147,28 +151,44 @@ def authenticate_user(db: Session, login_data: schemas.UserLogin):
     if not getattr(db_user, 'account_setup_completed', False):
         raise ValueError("Account setup not completed")
     
+    return db_user
+
+def _record_login(db: Session, user_id: int, new_password_hash: Optional[str] = None):
+    """Update last login time, upgrading the stored password hash if needed"""
+    update_data = {models.User.last_login_at: datetime.now()}
+    if new_password_hash:
+        update_data[models.User.hashed_password] = new_password_hash
+    db.query(models.User).filter(models.User.id == user_id).update(update_data)
+    db.commit()
+    db_user = get_user(db, user_id)
+    
+    # Get navigation route based on role
+    user_role = getattr(db_user, 'role', 'client')
+    navigation_route = RolePermissions.get_navigation_route(str(user_role))
+    
+    return db_user, navigation_route
+
+async def authenticate_user(db: Session, login_data: schemas.UserLogin):
+    """
+    Authenticate user and return user with navigation route.
+    Password verification runs in the bounded hashing pool; legacy or outdated
+    hashes are replaced with a fresh hash on success.
+    """
+    db_user = await run_in_threadpool(_check_login_user, db, login_data.email)
+    
     # Verify password if user has one
+    new_password_hash = None
     user_password = getattr(db_user, 'hashed_password', None)
     if user_password:
-        if not verify_password(login_data.password, user_password):
+        valid, new_password_hash = await password_hasher.verify_and_update(login_data.password, user_password)
+        if not valid:
             raise ValueError("Incorrect password")
     elif login_data.password:
         # User doesn't have a password but one was provided
         raise ValueError("This account doesn't use password authentication")
     # If no password is stored and none provided, allow access (legacy users)
     
-    # Update last login time
-    db.query(models.User).filter(models.User.id == db_user.id).update({
-        models.User.last_login_at: datetime.now()
-    })
-    db.commit()
-    db.refresh(db_user)
-    
-    # Get navigation route based on role
-    user_role = getattr(db_user, 'role', 'client')
-    navigation_route = RolePermissions.get_navigation_route(str(user_role))
-    
-    return db_user, navigation_route
+    return await run_in_threadpool(_record_login, db, db_user.id, new_password_hash)
 
 def get_user_by_invitation_token(db: Session, token: str):
     """Get user by invitation token"""
@@ -177,22 +197,24 @@ def get_user_by_invitation_token(db: Session, token: str):
         models.User.invitation_status == 'pending'
     ).first()
 
-def expire_old_invitations(db: Session):
-    """Mark expired invitations as expired"""
-    current_time = datetime.now()
-    
-    expired_users = db.query(models.User).filter(
-        models.User.invitation_status == 'pending',
-        models.User.invitation_expires_at < current_time
-    ).all()
-    
-    for user in expired_users:
-        db.query(models.User).filter(models.User.id == user.id).update({
-            models.User.invitation_status: "expired"
-        })
-    
+def expire_old_invitations(db: Session) -> list[int]:
+    """
+    Mark expired invitations as expired in one statement.
+    Returns the ids of the users whose invitations were expired.
+    """
+    result = db.execute(
+        update(models.User)
+        .where(
+            models.User.invitation_status == 'pending',
+            models.User.invitation_expires_at < datetime.now()
+        )
+        .values(invitation_status='expired')
+        .returning(models.User.id)
+        .execution_options(synchronize_session=False)
+    )
+    expired_ids = list(result.scalars())
     db.commit()
-    return len(expired_users)
+    return expired_ids
 
 def get_pending_invitations(db: Session, skip: int = 0, limit: int = 100):
     """Get all pending user invitations"""
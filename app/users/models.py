@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Index, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -6,11 +6,16 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Serves the invitation expiry sweep (status = 'pending' AND expires_at < now)
+        Index("ix_users_invitation_status_expires_at", "invitation_status", "invitation_expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, index=True, nullable=False)
     last_name = Column(String, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
+    search_name = Column(String, nullable=True)  # Lowercased "first last" for typeahead (indexed in users/search.py)
     hashed_password = Column(String, nullable=True)  # Optional for invitation-based signup
     
     # Role and authentication fields
@@ -49,3 +54,29 @@ class User(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+
+def build_search_name(first_name, last_name) -> str:
+    """Normalized name used by the typeahead index"""
+    return " ".join(f"{first_name or ''} {last_name or ''}".lower().split())
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def set_search_name(mapper, connection, target):
+    """Keep the stored searchable name in sync with first/last name"""
+    target.search_name = build_search_name(target.first_name, target.last_name)
+
+class RevokedToken(Base):
+    """
+    Revoked JWTs. A row with a jti revokes that single token; a row without a
+    jti revokes every token of the user issued before revoked_at (e.g. on
+    deactivation). Workers mirror this table in memory (see users/tokens.py).
+    """
+    __tablename__ = "revoked_tokens"
+
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String, unique=True, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Row can be purged after this
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
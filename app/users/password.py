@@ -1,24 +1,116 @@
 """
 Password utilities for user authentication
+
+Passwords are hashed with argon2 (when argon2-cffi is installed) or bcrypt via
+passlib. Both are deliberately slow, so hashing runs in a small bounded thread
+pool (the underlying C implementations release the GIL) instead of on the event
+loop or in an unbounded number of request threads. Legacy SHA-256 hashes are
+still accepted and are upgraded on the next successful login.
 """
-import secrets
+import asyncio
 import hashlib
+import hmac
+import os
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-# TODO: Install passlib and uncomment for production
-# from passlib.context import CryptContext
-# pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from passlib.context import CryptContext
+
+try:
+    import argon2  # noqa: F401 - only checks that the argon2 backend is available
+    PASSWORD_SCHEMES = ["argon2", "bcrypt"]
+except ImportError:  # pragma: no cover - depends on deployment
+    PASSWORD_SCHEMES = ["bcrypt"]
+
+# The first scheme is used for new hashes; hashes in other schemes (or with
+# outdated cost settings) are reported by needs_rehash()
+pwd_context = CryptContext(
+    schemes=PASSWORD_SCHEMES,
+    deprecated="auto",
+    bcrypt__rounds=int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12")),
+)
+
+LEGACY_SALT = "buildbuzz_salt_2024_secure"
+LEGACY_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def _legacy_hash(password: str) -> str:
+    """Original SHA-256 + static salt scheme, kept only to verify old hashes"""
+    return hashlib.sha256((password + LEGACY_SALT).encode()).hexdigest()
+
+def is_legacy_hash(hashed_password: str) -> bool:
+    return bool(hashed_password) and LEGACY_HASH_PATTERN.match(hashed_password) is not None
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    if is_legacy_hash(hashed_password):
+        return hmac.compare_digest(_legacy_hash(plain_password), hashed_password)
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except ValueError:
+        return False  # Unrecognised hash format
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True for legacy hashes and hashes made with a deprecated scheme or cost"""
+    if is_legacy_hash(hashed_password):
+        return True
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return True
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    if not _verify(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, _hash(plain_password)
+    return True, None
+
+class PasswordHasher:
+    """
+    Runs slow password hashing in a bounded pool. The pool size is the
+    concurrency limit: extra logins queue instead of oversubscribing the CPU.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Verify a password; returns (valid, new_hash) where new_hash is set if the stored hash should be replaced"""
+        return await self._run(_verify_and_update, plain_password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        """Blocking variant for sync code paths (must not be called on the event loop)"""
+        return self._executor.submit(_hash, password).result()
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        return self._executor.submit(_verify, plain_password, hashed_password).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher()
 
 def hash_password(password: str) -> str:
-    """Hash a password using SHA256 with salt (temporary implementation)"""
-    # TODO: Replace with bcrypt when passlib is installed
-    salt = "buildbuzz_salt_2024_secure"
-    return hashlib.sha256((password + salt).encode()).hexdigest()
+    """Hash a password (blocking; used from sync handlers)"""
+    return password_hasher.hash_sync(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    # TODO: Replace with bcrypt verification when passlib is installed
-    return hash_password(plain_password) == hashed_password
+    """Verify a password against its hash (blocking; used from sync handlers)"""
+    return password_hasher.verify_sync(plain_password, hashed_password)
 
 def generate_password(length: int = 12) -> str:
     """Generate a secure random password"""
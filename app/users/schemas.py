@@ -141,8 +141,21 @@ class LoginResponse(BaseModel):
     """Response schema for successful login"""
     user: User
     navigation_route: str
-    access_token: Optional[str] = None  # For future JWT implementation
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
     token_type: Optional[str] = "bearer"
+    expires_in: Optional[int] = None  # Access token lifetime in seconds
+
+class TokenRefreshRequest(BaseModel):
+    """Request schema for refreshing or revoking tokens"""
+    refresh_token: str
+
+class TokenResponse(BaseModel):
+    """New access/refresh token pair"""
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
 
 # ===============================
 # LEGACY SCHEMAS (for backward compatibility)
@@ -0,0 +1,58 @@
+"""
+Typeahead search over users
+
+`users.search_name` holds the lowercased "first last" name. On PostgreSQL it is
+covered by a trigram GIN index (substring/fuzzy matches) and a text_pattern_ops
+B-tree (prefix matches); email gets the same pair on lower(email).
+"""
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_DDL = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS search_name VARCHAR",
+    "UPDATE users SET search_name = lower(trim(regexp_replace(coalesce(first_name, '') || ' ' || coalesce(last_name, ''), '\\s+', ' ', 'g'))) WHERE search_name IS NULL",
+    "CREATE INDEX IF NOT EXISTS ix_users_search_name_prefix ON users (search_name text_pattern_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_lower_prefix ON users (lower(email) text_pattern_ops)",
+]
+
+POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_search_name_trgm ON users USING GIN (search_name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING GIN (lower(email) gin_trgm_ops)",
+]
+
+_trigram_enabled = False
+
+def trigram_enabled() -> bool:
+    """Whether pg_trgm indexes are available (substring matching is index-backed)"""
+    return _trigram_enabled
+
+def ensure_user_search_indexes(engine):
+    """Add/backfill users.search_name and create the typeahead indexes"""
+    global _trigram_enabled
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+        try:
+            with engine.begin() as conn:
+                for statement in POSTGRES_TRGM_DDL:
+                    conn.execute(text(statement))
+            _trigram_enabled = True
+        except Exception:
+            # Extension needs CREATE privilege; prefix search still works without it
+            logger.warning("pg_trgm unavailable; user typeahead falls back to prefix matching")
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            columns = [row[1] for row in conn.execute(text("PRAGMA table_info(users)"))]
+            if "search_name" not in columns:
+                conn.execute(text("ALTER TABLE users ADD COLUMN search_name VARCHAR"))
+            conn.execute(text(
+                "UPDATE users SET search_name = lower(trim(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))) "
+                "WHERE search_name IS NULL"
+            ))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_users_search_name_prefix ON users (search_name)"))
@@ -0,0 +1,267 @@
+"""
+Signed JWT access and refresh tokens
+
+Access tokens carry the user's id, role, active/setup flags and expiry, so
+authorizing a request is a signature check against the cached key plus an
+in-memory revocation lookup - no database queries. Refresh tokens are
+short-lived and rotated on every use; refreshing reloads the user, so role
+changes and deactivations take effect within one access-token lifetime.
+
+Revocations are written to the `revoked_tokens` table and mirrored in memory.
+Each worker pulls new rows in a background thread (REVOCATION_SYNC_SECONDS),
+so a logout handled by one worker reaches the others within that interval.
+"""
+import logging
+import os
+import secrets
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.monitoring.metrics import register_cache
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", "720"))
+REVOCATION_SYNC_SECONDS = int(os.getenv("REVOCATION_SYNC_SECONDS", "15"))
+JWT_ALLOW_EPHEMERAL_KEY = os.getenv("JWT_ALLOW_EPHEMERAL_KEY", "false").lower() == "true"  # Local development only
+ISSUER = "buildbuzz"
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+class TokenError(Exception):
+    """Token is malformed, expired, revoked or of the wrong type"""
+    pass
+
+@dataclass(frozen=True)
+class TokenPrincipal:
+    """Authenticated user as described by a verified access token"""
+    id: int
+    role: str
+    email: Optional[str]
+    is_active: bool
+    account_setup_completed: bool
+    token_id: str
+    issued_at: int
+    expires_at: int
+
+@lru_cache(maxsize=1)
+def get_signing_key() -> str:
+    """Signing key, read once per process; raises RuntimeError when none is configured"""
+    key = os.getenv("JWT_SECRET_KEY") or os.getenv("SECRET_KEY")
+    if not key:
+        if not JWT_ALLOW_EPHEMERAL_KEY:
+            raise RuntimeError("SECRET_KEY (or JWT_SECRET_KEY) must be set; every worker has to sign tokens with the same key")
+        logger.warning("SECRET_KEY is not set; using a random per-process key (tokens will not work across workers or restarts)")
+        key = secrets.token_urlsafe(64)
+    return key
+
+# ===============================
+# REVOCATION LIST
+# ===============================
+
+class RevocationList:
+    """In-memory mirror of revoked_tokens, pruned as entries expire"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}  # jti -> token expiry (epoch seconds)
+        self._users: dict[int, tuple[float, float]] = {}  # user_id -> (revoked_at, entry expiry)
+        self._synced_until: Optional[datetime] = None
+
+    def add_token(self, jti: str, expires_at: float):
+        with self._lock:
+            self._tokens[jti] = expires_at
+
+    def add_user(self, user_id: int, revoked_at: float, expires_at: float):
+        with self._lock:
+            current = self._users.get(user_id)
+            if current is None or current[0] < revoked_at:
+                self._users[user_id] = (revoked_at, expires_at)
+
+    def is_revoked(self, jti: str, user_id: int, issued_at: float) -> bool:
+        if jti in self._tokens:
+            return True
+        cutoff = self._users.get(user_id)
+        return cutoff is not None and issued_at <= cutoff[0]
+
+    def prune(self, now: Optional[float] = None):
+        now = now or time.time()
+        with self._lock:
+            self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+            self._users = {uid: entry for uid, entry in self._users.items() if entry[1] > now}
+
+    def sync(self, db: Session):
+        """Load rows revoked since the last sync (full load on first call)"""
+        query = db.query(RevokedToken).filter(RevokedToken.expires_at > datetime.now(timezone.utc))
+        if self._synced_until is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._synced_until)
+        started = datetime.now(timezone.utc) - timedelta(seconds=1)  # Overlap guards against clock skew between workers
+        for row in query.all():
+            expires_at = _timestamp(row.expires_at)
+            if row.jti:
+                self.add_token(row.jti, expires_at)
+            else:
+                self.add_user(row.user_id, _timestamp(row.revoked_at), expires_at)
+        self._synced_until = started
+        self.prune()
+
+    def size(self) -> int:
+        return len(self._tokens) + len(self._users)
+
+revocations = RevocationList()
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def revoke_token(db: Session, claims: dict):
+    """
+    Revoke a single token by its claims.
+    The unique jti makes the insert the gate: raises TokenError if the token
+    was already revoked, even by another worker whose revocation has not
+    been synced here yet.
+    """
+    db.add(RevokedToken(
+        jti=claims["jti"],
+        user_id=int(claims["sub"]),
+        expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc),
+        revoked_at=datetime.now(timezone.utc)
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        revocations.add_token(claims["jti"], claims["exp"])
+        raise TokenError("Token has been revoked")
+    revocations.add_token(claims["jti"], claims["exp"])
+
+def revoke_user_tokens(db: Session, user_id: int):
+    """Revoke every token issued to a user so far (deactivation, password reset)"""
+    now = time.time()
+    expires_at = now + max(ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_MINUTES) * 60
+    revocations.add_user(user_id, now, expires_at)
+    db.add(RevokedToken(
+        user_id=user_id,
+        expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+        revoked_at=datetime.fromtimestamp(now, timezone.utc)
+    ))
+    db.commit()
+
+def purge_expired_revocations(db: Session) -> int:
+    """Delete revocation rows whose tokens have expired anyway"""
+    deleted = db.query(RevokedToken).filter(
+        RevokedToken.expires_at <= datetime.now(timezone.utc)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+class RevocationSyncer:
+    """Background thread that keeps this worker's revocation list current"""
+
+    def __init__(self, interval: int = REVOCATION_SYNC_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        from app.database import SessionLocal
+        while not self._stop.is_set():
+            db = SessionLocal()
+            try:
+                revocations.sync(db)
+            except Exception:
+                logger.exception("Failed to sync token revocation list")
+            finally:
+                db.close()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="token-revocation-sync", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+revocation_syncer = RevocationSyncer()
+
+# ===============================
+# ISSUE & VERIFY
+# ===============================
+
+def _encode(user, token_type: str, lifetime: timedelta) -> tuple[str, dict]:
+    now = int(time.time())
+    claims = {
+        "iss": ISSUER,
+        "sub": str(user.id),
+        "typ": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + int(lifetime.total_seconds()),
+        "role": str(getattr(user, 'role', 'client')),
+        "email": getattr(user, 'email', None),
+        "active": bool(getattr(user, 'is_active', False)),
+        "setup": bool(getattr(user, 'account_setup_completed', False)),
+    }
+    return jwt.encode(claims, get_signing_key(), algorithm=ALGORITHM), claims
+
+def create_token_pair(user) -> dict:
+    """Issue an access token and a refresh token for a user"""
+    access_token, access_claims = _encode(user, ACCESS, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    refresh_token, _ = _encode(user, REFRESH, timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES))
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": access_claims["exp"] - access_claims["iat"],
+    }
+
+@lru_cache(maxsize=4096)
+def _verify_signature(token: str) -> dict:
+    """Signature and structure check, cached per token string (expiry is checked separately)"""
+    return jwt.decode(
+        token, get_signing_key(), algorithms=[ALGORITHM], issuer=ISSUER,
+        options={"verify_exp": False, "verify_aud": False}
+    )
+
+register_cache("token_signature", _verify_signature)
+
+def decode_token(token: str, expected_type: str = ACCESS) -> dict:
+    """Verify a token and return its claims; raises TokenError"""
+    try:
+        claims = _verify_signature(token)
+    except JWTError:
+        raise TokenError("Invalid token")
+    if claims.get("typ") != expected_type:
+        raise TokenError("Wrong token type")
+    if claims.get("exp", 0) <= time.time():
+        raise TokenError("Token has expired")
+    if revocations.is_revoked(claims["jti"], int(claims["sub"]), claims.get("iat", 0)):
+        raise TokenError("Token has been revoked")
+    return claims
+
+def principal_from_claims(claims: dict) -> TokenPrincipal:
+    return TokenPrincipal(
+        id=int(claims["sub"]),
+        role=claims.get("role", "client"),
+        email=claims.get("email"),
+        is_active=bool(claims.get("active")),
+        account_setup_completed=bool(claims.get("setup")),
+        token_id=claims["jti"],
+        issued_at=claims.get("iat", 0),
+        expires_at=claims["exp"],
+    )
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
 
 from . import crud, models, schemas
 from app.database import get_db
+from app.sync.tracking import sync_window
 
 router = APIRouter()
 
@@ -57,9 +58,9 @@ def create_worker(worker: schemas.WorkerCreate, db: Session = Depends(get_db)):
     return crud.create_worker(db=db, worker=worker)
 
 @router.get("/workers/", response_model=List[schemas.WorkerWithProfession])
-def read_workers(skip: int = 0, limit: Optional[int] = None, db: Session = Depends(get_db)):
+def read_workers(skip: int = 0, limit: Optional[int] = None, updated_since: Optional[datetime] = Depends(sync_window), db: Session = Depends(get_db)):
     """Get all workers with profession details (no limit by default, use limit parameter for pagination)"""
-    workers = crud.get_workers_with_profession(db, skip=skip, limit=limit)
+    workers = crud.get_workers_with_profession(db, skip=skip, limit=limit, updated_since=updated_since)
     return workers
 
 @router.get("/workers/{worker_id}", response_model=schemas.WorkerWithProfession)
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime
 
+from app.sync.tracking import changed_since
 from . import models, schemas
 
 # ===============================
@@ -79,9 +80,11 @@ def get_workers(db: Session, skip: int = 0, limit: Optional[int] = None):
         query = query.limit(limit)
     return query.all()
 
-def get_workers_with_profession(db: Session, skip: int = 0, limit: Optional[int] = None):
-    """Get list of all workers with profession details"""
-    query = db.query(models.Worker).options(joinedload(models.Worker.profession)).offset(skip)
+def get_workers_with_profession(db: Session, skip: int = 0, limit: Optional[int] = None,
+                                updated_since: Optional[datetime] = None):
+    """Get list of all workers with profession details (optionally only those changed since a sync watermark)"""
+    query = changed_since(db.query(models.Worker), models.Worker, updated_since)
+    query = query.options(joinedload(models.Worker.profession)).offset(skip)
     if limit is not None:
         query = query.limit(limit)
     return query.all()
@@ -50,7 +50,7 @@ class Worker(Base):
     project_history = relationship("WorkerProjectHistory", back_populates="worker")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
 
 class WorkerProjectHistory(Base):
     """
@@ -60,7 +60,7 @@ class WorkerProjectHistory(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     worker_id = Column(Integer, ForeignKey("workers.id"), nullable=False)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)  # Reference to project
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)  # Reference to project
     
     # Project assignment details
     start_date = Column(Date, nullable=False)
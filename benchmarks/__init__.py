@@ -0,0 +1 @@
+"""Performance benchmarks for the BuildBuzz API (run with `python -m benchmarks.<name>`)"""
@@ -0,0 +1,278 @@
+"""
+End-to-end HTTP load benchmark
+
+Starts the real app under uvicorn (or targets --url), logs in as the benchmark
+admin, then runs closed-loop concurrent clients over a weighted mix of hot
+endpoints. Reports per-endpoint p50/p95/p99 latency, throughput, error counts
+and SQL statements per request (from the X-DB-Queries / Server-Timing headers)
+as JSON, optionally compared against a previous report.
+
+    export DATABASE_URL=sqlite:///./bench.db
+    python -m benchmarks.datagen --scale 2
+    python -m benchmarks.load --concurrency 16 --duration 30 --output bench.json
+    python -m benchmarks.load --baseline bench.json          # after a change
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import httpx
+
+from .datagen import BENCHMARK_PASSWORD, WORDS
+
+ADMIN_EMAIL = "admin@bench.example"
+SERVER_TIMING_DB = re.compile(r"db;dur=([\d.]+)")
+
+@dataclass
+class Scenario:
+    name: str
+    weight: int
+    build: Callable  # (rng, context) -> (method, path, kwargs)
+    authenticated: bool = True
+
+def _project_id(rng, context):
+    return rng.randint(1, context["project_count"])
+
+SCENARIOS = [
+    Scenario("GET /projects/", 25, lambda rng, ctx: ("GET", "/projects/", {})),
+    Scenario("GET /projects/{id}/tasks", 10, lambda rng, ctx: ("GET", f"/projects/{_project_id(rng, ctx)}/tasks", {})),
+    Scenario("GET /finance/change-orders/", 15, lambda rng, ctx: ("GET", "/finance/change-orders/", {})),
+    Scenario("GET /finance/change-orders/by-status/{status}", 10,
+             lambda rng, ctx: ("GET", f"/finance/change-orders/by-status/{rng.choice(['Approved', 'Draft'])}", {})),
+    Scenario("GET /documents/", 20, lambda rng, ctx: ("GET", "/documents/", {"params": {"limit": 50}})),
+    Scenario("GET /documents/search", 10,
+             lambda rng, ctx: ("GET", "/documents/search", {"params": {"q": rng.choice(WORDS)}})),
+    Scenario("POST /users/login/", 5,
+             lambda rng, ctx: ("POST", "/users/login/", {"json": {"email": ADMIN_EMAIL, "password": BENCHMARK_PASSWORD}}),
+             authenticated=False),
+]
+
+@dataclass
+class EndpointResults:
+    latencies_ms: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+    db_ms: list = field(default_factory=list)
+    statuses: dict = field(default_factory=dict)
+    errors: int = 0
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def _rounded(value, digits: int = 2):
+    return None if value is None else round(value, digits)
+
+def summarize(results: dict, elapsed: float) -> dict:
+    endpoints = {}
+    for name, result in sorted(results.items()):
+        latencies = result.latencies_ms
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": result.errors,
+            "statuses": result.statuses,
+            "throughput_rps": _rounded(len(latencies) / elapsed) if elapsed else None,
+            "latency_ms": {
+                "mean": _rounded(sum(latencies) / len(latencies)) if latencies else None,
+                "p50": _rounded(percentile(latencies, 0.50)),
+                "p95": _rounded(percentile(latencies, 0.95)),
+                "p99": _rounded(percentile(latencies, 0.99)),
+                "max": _rounded(max(latencies)) if latencies else None,
+            },
+            "db_queries": {
+                "mean": _rounded(sum(result.queries) / len(result.queries)) if result.queries else None,
+                "max": max(result.queries) if result.queries else None,
+            },
+            "db_ms_mean": _rounded(sum(result.db_ms) / len(result.db_ms)) if result.db_ms else None,
+        }
+    all_latencies = [value for result in results.values() for value in result.latencies_ms]
+    return {
+        "total": {
+            "requests": len(all_latencies),
+            "errors": sum(result.errors for result in results.values()),
+            "throughput_rps": _rounded(len(all_latencies) / elapsed) if elapsed else None,
+            "latency_ms": {
+                "p50": _rounded(percentile(all_latencies, 0.50)),
+                "p95": _rounded(percentile(all_latencies, 0.95)),
+                "p99": _rounded(percentile(all_latencies, 0.99)),
+            },
+        },
+        "endpoints": endpoints,
+    }
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Percentage change of p95 latency, throughput and queries versus a baseline report"""
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    comparison = {}
+    for name, current in report["results"]["endpoints"].items():
+        previous = baseline.get("results", {}).get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        comparison[name] = {
+            "p95_latency_change_pct": change(current["latency_ms"]["p95"], previous["latency_ms"]["p95"]),
+            "p99_latency_change_pct": change(current["latency_ms"]["p99"], previous["latency_ms"]["p99"]),
+            "throughput_change_pct": change(current["throughput_rps"], previous["throughput_rps"]),
+            "db_queries_change_pct": change(current["db_queries"]["mean"], previous["db_queries"]["mean"]),
+        }
+    return comparison
+
+async def run_load(base_url: str, concurrency: int, duration: float, warmup: float, seed: int, project_count: int) -> tuple[dict, float]:
+    rng = random.Random(seed)
+    weights = [scenario.weight for scenario in SCENARIOS]
+    context = {"project_count": project_count}
+    results = {scenario.name: EndpointResults() for scenario in SCENARIOS}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/users/login/", json={"email": ADMIN_EMAIL, "password": BENCHMARK_PASSWORD})
+        login.raise_for_status()
+        auth_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        measure_from = time.perf_counter() + warmup
+        stop_at = measure_from + duration
+
+        async def worker(worker_rng: random.Random):
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                scenario = worker_rng.choices(SCENARIOS, weights=weights)[0]
+                method, path, kwargs = scenario.build(worker_rng, context)
+                headers = auth_headers if scenario.authenticated else {}
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, headers=headers, **kwargs)
+                except httpx.HTTPError:
+                    response = None
+                finished = time.perf_counter()
+                if started < measure_from:
+                    continue  # Warm-up request
+                result = results[scenario.name]
+                if response is None or response.status_code >= 400:
+                    result.errors += 1
+                status = str(response.status_code) if response is not None else "error"
+                result.statuses[status] = result.statuses.get(status, 0) + 1
+                if response is None:
+                    continue
+                result.latencies_ms.append((finished - started) * 1000)
+                if "x-db-queries" in response.headers:
+                    result.queries.append(int(response.headers["x-db-queries"]))
+                match = SERVER_TIMING_DB.search(response.headers.get("server-timing", ""))
+                if match:
+                    result.db_ms.append(float(match.group(1)))
+
+        await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(concurrency)))
+    return results, duration
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(workers: int) -> tuple[subprocess.Popen, str]:
+    """Run the app under uvicorn with the current environment (DATABASE_URL etc.)"""
+    port = _free_port()
+    env = {**os.environ, "SCHEDULER_ENABLED": os.getenv("SCHEDULER_ENABLED", "false")}
+    if not (env.get("JWT_SECRET_KEY") or env.get("SECRET_KEY")):
+        env["SECRET_KEY"] = secrets.token_urlsafe(32)  # Shared by all server workers
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("Server did not become healthy within 60s")
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _project_count() -> int:
+    from sqlalchemy import text
+    from app.database import engine
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM projects")).scalar() or 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the BuildBuzz API over a mix of hot endpoints")
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn workers when starting the server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--projects", type=int, help="Number of projects in the dataset (default: count from DATABASE_URL)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if not base_url:
+        if not os.getenv("DATABASE_URL"):
+            parser.error("Set DATABASE_URL (see benchmarks.datagen) or pass --url")
+        process, base_url = start_server(args.server_workers)
+    try:
+        project_count = args.projects or _project_count()
+        results, elapsed = asyncio.run(run_load(base_url, args.concurrency, args.duration, args.warmup, args.seed, project_count))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "target": base_url,
+            "server_workers": None if args.url else args.server_workers,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "seed": args.seed,
+            "database": (os.getenv("DATABASE_URL") or "").split("://")[0] or None,
+            "mix": {scenario.name: scenario.weight for scenario in SCENARIOS},
+        },
+        "results": summarize(results, elapsed),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+if __name__ == "__main__":
+    main()
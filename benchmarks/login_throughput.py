@@ -0,0 +1,136 @@
+"""
+Login throughput benchmark for one API worker
+
+Two modes:
+
+* `hasher` (default, no database needed): drives `PasswordHasher.verify_and_update`
+  with N concurrent "logins" on one event loop and reports logins/sec, latency
+  percentiles and event-loop lag. `--compare-inline` also runs the same load with
+  verification done directly on the loop, which is what a blocking hash inside an
+  async handler would do.
+* `http`: sends concurrent POST /users/login/ requests to a running server.
+  Start a single worker (`uvicorn app.main:app --workers 1`) to get a per-worker
+  number.
+
+Examples:
+    python -m benchmarks.login_throughput --concurrency 32 --duration 10
+    python -m benchmarks.login_throughput --mode http --url http://localhost:8000 \\
+        --email user@example.com --password 'Secret123!'
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.users import password as password_module
+
+LAG_TICK_SECONDS = 0.01
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+def summarize(name: str, latencies: list, errors: int, elapsed: float, lags: list) -> dict:
+    ms = [value * 1000 for value in latencies]
+    return {
+        "mode": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(ms), 2) if ms else None,
+            "p50": round(percentile(ms, 0.50), 2) if ms else None,
+            "p95": round(percentile(ms, 0.95), 2) if ms else None,
+            "p99": round(percentile(ms, 0.99), 2) if ms else None,
+        },
+        "event_loop_lag_ms": {
+            "p99": round(percentile(lags, 0.99) * 1000, 2) if lags else None,
+            "max": round(max(lags) * 1000, 2) if lags else None,
+        },
+    }
+
+async def _measure_loop_lag(stop: asyncio.Event, lags: list):
+    """Record how late a fixed-interval timer fires; large values mean a blocked loop"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_TICK_SECONDS
+        await asyncio.sleep(LAG_TICK_SECONDS)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def _run_load(name: str, login, concurrency: int, duration: float) -> dict:
+    latencies, lags = [], []
+    errors = 0
+    stop = asyncio.Event()
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = await login()
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    lag_task = asyncio.create_task(_measure_loop_lag(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    return summarize(name, latencies, errors, elapsed, lags)
+
+async def bench_hasher(args) -> list:
+    hasher = password_module.PasswordHasher(max_workers=args.workers)
+    stored_hash = password_module.pwd_context.hash(args.password)
+
+    async def pooled_login():
+        valid, _ = await hasher.verify_and_update(args.password, stored_hash)
+        return valid
+
+    async def inline_login():
+        return password_module._verify(args.password, stored_hash)
+
+    results = [await _run_load(f"pool[{hasher.max_workers} workers]", pooled_login, args.concurrency, args.duration)]
+    if args.compare_inline:
+        results.append(await _run_load("inline (blocking the loop)", inline_login, args.concurrency, args.duration))
+    hasher.shutdown()
+    return results
+
+async def bench_http(args) -> list:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        async def http_login():
+            response = await client.post("/users/login/", json={"email": args.email, "password": args.password})
+            return response.status_code == 200
+
+        return [await _run_load(f"http {args.url}", http_login, args.concurrency, args.duration)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput per worker")
+    parser.add_argument("--mode", choices=["hasher", "http"], default="hasher")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent login clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per run")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing pool size (default: PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--compare-inline", action="store_true", help="Also run with hashing on the event loop")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="benchmark@example.com")
+    parser.add_argument("--password", default="Benchmark123!")
+    args = parser.parse_args()
+
+    runner = bench_hasher if args.mode == "hasher" else bench_http
+    results = asyncio.run(runner(args))
+    print(json.dumps({"schemes": password_module.PASSWORD_SCHEMES, "results": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
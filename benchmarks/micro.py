@@ -0,0 +1,316 @@
+"""
+Micro-benchmarks for CPU-side hot functions
+
+Runs the serialization and aggregation code behind the hot endpoints against
+fixed in-memory fixtures (seeded, no database): each case is calibrated to a
+minimum runtime per sample, sampled --repeat times with the GC disabled, then
+run once more under tracemalloc to record peak and retained allocations.
+DB-backed aggregations get a fixture session that returns pre-built rows, so
+only their Python loops are timed.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --baseline micro.json --fail-over 15   # exit 1 on a regression
+    python -m benchmarks.micro --filter project
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")  # app.database builds an engine on import; never used here
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Callable
+
+from app.users import models as user_models
+from app.projects import models as project_models
+from app.documents import models as document_models  # noqa: F401  (registers mappers)
+from app.finance import models as finance_models
+from app.workforce import models as workforce_models  # noqa: F401
+from app.jobs import models as job_models  # noqa: F401
+from app.projects import crud as project_crud
+from app.projects.schemas import ProjectWithDetails
+from app.finance import crud as finance_crud
+from app.finance.schemas import ChangeOrderExtended
+from app.users.password import is_strong_password
+from app.users.roles import RolePermissions, UserRole
+
+from .load import _git_revision, percentile
+
+MIN_SAMPLE_SECONDS = 0.05
+BASE_TIME = datetime(2025, 1, 6, 9, 0, tzinfo=timezone.utc)
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], object]
+    items: int  # Objects processed per call, for per-item timings
+
+# ===============================
+# FIXTURES
+# ===============================
+
+class FixtureQuery:
+    """Query stand-in returning fixed rows; filter/join/order chains are no-ops"""
+
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def join(self, *args, **kwargs):
+        return self
+
+    filter = order_by = options = join
+
+    def all(self):
+        return list(self.rows)
+
+class FixtureSession:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def query(self, *entities):
+        return FixtureQuery(self.rows)
+
+def _user(rng: random.Random, user_id: int, role: str) -> user_models.User:
+    first, last = rng.choice(["Ana", "Ben", "Chen", "Dara", "Eli"]), rng.choice(["Ortiz", "Kim", "Patel", "Nguyen"])
+    return user_models.User(
+        id=user_id, first_name=first, last_name=last, email=f"user{user_id}@bench.example",
+        role=role, is_active=True, created_at=BASE_TIME
+    )
+
+def build_projects(rng: random.Random, count: int) -> list:
+    """Transient projects with client, PM, accountant and type loaded (as joinedload leaves them)"""
+    project_type = project_models.ProjectType(id=1, category="Commercial", type_name="Office", created_at=BASE_TIME)
+    projects = []
+    for index in range(1, count + 1):
+        projects.append(project_models.Project(
+            id=index, name=f"Project {index}", description="Mixed-use build", status="in_progress",
+            start_date=BASE_TIME.date(), end_date=(BASE_TIME + timedelta(days=365)).date(),
+            planned_budget=Decimal(rng.randint(100_000, 5_000_000)), actual_budget=Decimal(rng.randint(50_000, 4_000_000)),
+            created_at=BASE_TIME, updated_at=BASE_TIME,
+            client=_user(rng, 1000 + index, "client"),
+            project_manager=_user(rng, 2000 + index, "project_manager"),
+            accountant=_user(rng, 3000 + index, "accountant") if index % 4 else None,
+            project_type=project_type,
+        ))
+    return projects
+
+def build_change_orders(rng: random.Random, count: int) -> list:
+    return [
+        finance_models.ChangeOrder(
+            id=index, co_number=f"CO-2025-{index:04d}", task_id=rng.randint(1, 500), title="Scope change",
+            description="Additional framing on level 2", reason="Client Request",
+            status=rng.choice(["Draft", "Approved", "Implemented"]), notes=None, created_by=1,
+            approved_by=2 if index % 2 else None, approved_date=BASE_TIME if index % 2 else None,
+            created_at=BASE_TIME, updated_at=None,
+        )
+        for index in range(1, count + 1)
+    ]
+
+def build_change_order_items(rng: random.Random, count: int) -> list:
+    return [
+        finance_models.ChangeOrderItem(
+            id=index, change_order_id=1, item_name=f"Item {index}", impact_type=rng.choice("+-"),
+            amount=Decimal(rng.randint(100, 50_000)) / 100,
+        )
+        for index in range(1, count + 1)
+    ]
+
+def change_order_extended(co, project_name, component_name, pm_name) -> ChangeOrderExtended:
+    """Same construction as the finance change-order list endpoints"""
+    return ChangeOrderExtended(
+        id=co.__dict__["id"],
+        co_number=co.__dict__["co_number"],
+        task_id=co.__dict__["task_id"],
+        title=co.__dict__["title"],
+        description=co.__dict__["description"],
+        reason=co.__dict__["reason"],
+        status=co.__dict__["status"],
+        notes=co.__dict__["notes"],
+        created_by=co.__dict__["created_by"],
+        approved_by=co.__dict__["approved_by"],
+        approved_date=co.__dict__["approved_date"],
+        created_at=co.__dict__["created_at"],
+        updated_at=co.__dict__["updated_at"],
+        project_name=project_name,
+        component_name=component_name,
+        pm_name=pm_name
+    )
+
+PASSWORDS = ["short", "alllowercase1!", "NoDigits!!", "Benchmark123!", "Tr0ub4dor&3", "correct horse battery staple",
+             "P@ssw0rd2025", "UPPER123$", "x" * 64, "Mixed1Case!" * 4]
+
+def build_cases(seed: int) -> list[Case]:
+    rng = random.Random(seed)
+    projects = build_projects(rng, 100)
+    summaries = [{"purchase_orders_sum": 1234.5, "change_orders_sum": -200.0}] * len(projects)
+    change_orders = build_change_orders(rng, 100)
+    impact_session = FixtureSession(build_change_order_items(rng, 50))
+    co_sum_session = FixtureSession([(item.amount, item.impact_type) for item in build_change_order_items(rng, 500)])
+    roles = [role.value for role in UserRole]
+    role_pairs = [(a, b) for a in roles for b in roles]
+
+    def project_details():
+        return [ProjectWithDetails.from_orm_with_names(project, summary) for project, summary in zip(projects, summaries)]
+
+    def change_orders_extended():
+        return [change_order_extended(co, "Project 1", "Level 2", "Ana Kim") for co in change_orders]
+
+    def role_checks():
+        results = []
+        for inviter, target in role_pairs:
+            results.append(RolePermissions.can_invite_role(inviter, target))
+            results.append(RolePermissions.has_higher_or_equal_permission(inviter, target))
+        for role in roles:
+            results.append(RolePermissions.get_navigation_route(role))
+        return results
+
+    return [
+        Case("ProjectWithDetails.from_orm_with_names", project_details, len(projects)),
+        Case("ChangeOrderExtended construction", change_orders_extended, len(change_orders)),
+        Case("calculate_co_total_impact", lambda: finance_crud.calculate_co_total_impact(impact_session, 1), len(impact_session.rows)),
+        Case("get_project_change_orders_sum", lambda: project_crud.get_project_change_orders_sum(co_sum_session, 1), len(co_sum_session.rows)),
+        Case("RolePermissions checks", role_checks, len(role_pairs) * 2 + len(roles)),
+        Case("is_strong_password", lambda: [is_strong_password(p) for p in PASSWORDS], len(PASSWORDS)),
+    ]
+
+# ===============================
+# MEASUREMENT
+# ===============================
+
+def _time_loops(func: Callable, loops: int) -> float:
+    started = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - started
+
+def _calibrate(func: Callable, min_seconds: float) -> int:
+    """Smallest power-of-two loop count whose sample takes at least `min_seconds`"""
+    loops = 1
+    while _time_loops(func, loops) < min_seconds and loops < 1 << 20:
+        loops *= 2
+    return loops
+
+def measure_allocations(func: Callable) -> dict:
+    """Peak and retained (result) memory for one call, plus the number of new allocations"""
+    func()  # Warm caches so one-time imports/compilation are not counted
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        base_current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    del result
+    return {
+        "peak_kib": round((peak - base_current) / 1024, 2),
+        "retained_kib": round((current - base_current) / 1024, 2),
+        "retained_blocks": blocks,
+    }
+
+def run_case(case: Case, repeat: int, min_seconds: float) -> dict:
+    loops = _calibrate(case.func, min_seconds)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = [_time_loops(case.func, loops) / loops * 1e6 for _ in range(repeat)]  # us per call
+    finally:
+        if gc_enabled:
+            gc.enable()
+    median = statistics.median(samples)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "items_per_call": case.items,
+        "us_per_call": {
+            "min": round(min(samples), 3),
+            "median": round(median, 3),
+            "mean": round(statistics.mean(samples), 3),
+            "stdev": round(statistics.stdev(samples), 3) if len(samples) > 1 else 0.0,
+            "p95": round(percentile(samples, 0.95), 3),
+        },
+        "ns_per_item": round(median * 1000 / case.items, 1) if case.items else None,
+        "memory": measure_allocations(case.func),
+    }
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Percentage change of median time and peak memory versus a baseline report"""
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return round((new - old) / old * 100, 1)
+
+    comparison = {}
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        comparison[name] = {
+            "median_change_pct": change(current["us_per_call"]["median"], previous["us_per_call"]["median"]),
+            "peak_memory_change_pct": change(current["memory"]["peak_kib"], previous["memory"]["peak_kib"]),
+        }
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark CPU-side hot functions on fixed fixtures")
+    parser.add_argument("--repeat", type=int, default=7, help="Timed samples per case")
+    parser.add_argument("--min-sample-seconds", type=float, default=MIN_SAMPLE_SECONDS)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--filter", help="Only run cases whose name contains this text (case-insensitive)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--fail-over", type=float,
+                        help="With --baseline, exit 1 if any median time or peak memory grew by more than this percentage")
+    args = parser.parse_args()
+
+    cases = build_cases(args.seed)
+    if args.filter:
+        cases = [case for case in cases if args.filter.lower() in case.name.lower()]
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "min_sample_seconds": args.min_sample_seconds,
+            "seed": args.seed,
+        },
+        "results": {case.name: run_case(case, args.repeat, args.min_sample_seconds) for case in cases},
+    }
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f))
+        if args.fail_over is not None:
+            regressions = [
+                name for name, changes in report["comparison"].items()
+                if any(value is not None and value > args.fail_over for value in changes.values())
+            ]
+            report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Gunicorn settings, loaded automatically when gunicorn starts in this directory
+(command-line options such as -w still take precedence).
+"""
+import os
+import shutil
+
+# Workers write Prometheus samples here and /metrics merges them. Must be set
+# in the master, before workers import prometheus_client.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/buildbuzz-metrics")
+
+def on_starting(server):
+    """Start from an empty metrics directory so old worker files are not counted"""
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-progress requests, pool checkouts)"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)